@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""
+AOT 编译三均线指标内核，消除新进程首次调用时的 JIT 预热
+
+用法: python build_ext.py  （在本目录生成 sma_signals.*.so / .pyd，fast_indicators 会优先加载）
+"""
+import os
+import numpy as np
+from numba.pycc import CC
+from fast_indicators import sma, crossover
+
+cc = CC('sma_signals')
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+@cc.export('sma_cross_signals', 'f4[:,:](f4[:], i8, i8, i8)')
+def sma_cross_signals(close, p5, p10, p15):
+    """返回 5 x N 矩阵：sma5, sma10, sma15, cross_5_10, cross_5_15"""
+    out = np.empty((5, close.shape[0]), dtype=np.float32)
+    out[0] = sma(close, p5)
+    out[1] = sma(close, p10)
+    out[2] = sma(close, p15)
+    out[3] = crossover(out[0], out[1])
+    out[4] = crossover(out[0], out[2])
+    return out
+
+
+if __name__ == '__main__':
+    cc.compile()
+    print(f"已生成 AOT 模块: {cc.output_dir}")
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+行情数据磁盘缓存：以 (symbol, start, end, adjust) 为键缓存 akshare 日线数据，
+参数不变的重复回测直接读取本地 parquet，避免重复网络请求
+"""
+import os
+import time
+import hashlib
+import numpy as np
+import pandas as pd
+
+# akshare 列名 -> 回测数据源列名
+RAW_COLUMNS = ['开盘', '最高', '最低', '收盘', '成交额']
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache')
+CACHE_TTL = 24 * 3600  # 缓存有效期（秒），按文件修改时间判断
+
+
+def _cache_path(symbol, start, end, adjust):
+    key = hashlib.sha256(f"{symbol}|{start}|{end}|{adjust}".encode()).hexdigest()
+    return os.path.join(CACHE_DIR, f"{key}.parquet")
+
+
+def fetch_hist(symbol, start, end, adjust="qfq"):
+    """获取 A 股日线行情（带磁盘缓存），接口与 ak.stock_zh_a_hist 返回值一致"""
+    path = _cache_path(symbol, start, end, adjust)
+    if os.path.exists(path) and time.time() - os.path.getmtime(path) < CACHE_TTL:
+        try:
+            return pd.read_parquet(path)
+        except Exception as e:
+            print(f"读取缓存失败，重新下载: {e}")
+
+    import akshare as ak  # 延迟导入：缓存命中时无需加载 akshare
+    df = ak.stock_zh_a_hist(symbol=symbol, period="daily", start_date=start, end_date=end, adjust=adjust)
+    if df is not None and not df.empty:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            df.to_parquet(tmp_path, compression='zstd')
+            os.replace(tmp_path, path)  # 原子替换，避免并发读到半写文件
+        except Exception as e:
+            print(f"写入缓存失败: {e}")
+    return df
+
+
+def load_data(symbol, start_date, end_date):
+    """获取并整理回测数据：直接由 NumPy 数组一次构建目标 DataFrame"""
+    df = fetch_hist(symbol, start_date, end_date, adjust="qfq")
+    if df is None or df.empty:
+        return pd.DataFrame(columns=COLUMNS)
+    index = pd.DatetimeIndex(pd.to_datetime(df['日期'].to_numpy()), name='datetime')
+    values = df[RAW_COLUMNS].to_numpy(dtype=np.float64)
+    # akshare 通常已按日期升序返回，仅在乱序时排序
+    if not index.is_monotonic_increasing:
+        order = np.argsort(index.values, kind='stable')
+        index, values = index[order], values[order]
+    return pd.DataFrame(values, index=index, columns=COLUMNS)
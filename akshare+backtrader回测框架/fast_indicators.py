@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+快速指标模块：在 Cerebro 运行前一次性预计算均线与交叉信号，
+替代 bt.ind.SMA / bt.ind.CrossOver 的逐 bar Python 计算
+
+指标计算使用 float32 收盘价（日线均线精度足够，内存带宽减半、SIMD 宽度加倍），
+账户与资产计算仍保持 float64
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from numba import njit
+except ImportError:
+    # 未安装 numba 时退化为普通 Python 函数（结果一致，只是更慢）
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+INDICATOR_DTYPE = np.float32
+
+
+@njit(cache=True)
+def sma(close, period):
+    """计算简单移动均线（滚动求和），前 period-1 个值为 NaN"""
+    n = close.shape[0]
+    out = np.empty_like(close)
+    out[:] = np.nan
+    if period <= 0:
+        return out
+    total = 0.0  # float64 累加，避免 float32 滚动求和的误差累积
+    for i in range(n):
+        total += close[i]
+        if i >= period:
+            total -= close[i - period]
+        if i >= period - 1:
+            out[i] = total / period
+    return out
+
+
+@njit(cache=True)
+def crossover(fast, slow):
+    """计算交叉信号，语义同 bt.ind.CrossOver：上穿为 1，下穿为 -1，否则为 0"""
+    n = fast.shape[0]
+    out = np.zeros(n, dtype=np.int8)
+    prev_diff = 0.0  # 最近一次非零差值
+    for i in range(n):
+        diff = fast[i] - slow[i]
+        if np.isnan(diff):
+            continue
+        if prev_diff < 0.0 and diff > 0.0:
+            out[i] = 1
+        elif prev_diff > 0.0 and diff < 0.0:
+            out[i] = -1
+        if diff != 0.0:
+            prev_diff = diff
+    return out
+
+
+@njit(cache=True)
+def _sma_cross_signals_jit(close, p5, p10, p15):
+    sma5 = sma(close, p5)
+    sma10 = sma(close, p10)
+    sma15 = sma(close, p15)
+    return sma5, sma10, sma15, crossover(sma5, sma10), crossover(sma5, sma15)
+
+
+try:
+    # build_ext.py 生成的 AOT 模块，免去新进程的 JIT 预热
+    import sma_signals as _aot
+except ImportError:
+    _aot = None
+
+
+def sma_cross_signals(close, p5, p10, p15):
+    """三均线策略所需的全部指标：(sma5, sma10, sma15, cross_5_10, cross_5_15)"""
+    close = np.ascontiguousarray(close, dtype=INDICATOR_DTYPE)
+    if _aot is not None:
+        out = _aot.sma_cross_signals(close, p5, p10, p15)
+        return out[0], out[1], out[2], out[3].astype(np.int8), out[4].astype(np.int8)
+    return _sma_cross_signals_jit(close, p5, p10, p15)
+
+
+def rolling_mean(values, period):
+    """用 sliding_window_view 计算简单移动均线，前 period-1 个值为 NaN"""
+    ma = np.full(values.shape[0], np.nan, dtype=values.dtype)
+    if 0 < period <= values.shape[0]:
+        ma[period - 1:] = sliding_window_view(values, period).mean(axis=-1)
+    return ma
+
+
+def precompute_ma(df, periods=(5, 10, 15), column='Close'):
+    """一次性计算多条均线，写入 df 的 ma{period} 列"""
+    close = df[column].to_numpy(dtype=INDICATOR_DTYPE)
+    for period in periods:
+        df[f'ma{period}'] = rolling_mean(close, period)
+    return df
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""
+均线交叉策略回测：单/双均线 (SimpleCrossSMA) 与三均线 (SimpleCrossTriMA) 的统一入口
+
+用法:
+    python strategy.py --strategy sma --fast 5 --slow 10
+    python strategy.py --strategy trima --ma5 5 --ma10 10 --ma15 15 --interactive
+"""
+import os
+import sys
+import logging
+import argparse
+from datetime import datetime, timedelta
+import backtrader as bt
+from data_cache import COLUMNS, load_data
+from fast_indicators import INDICATOR_DTYPE, rolling_mean, crossover, sma_cross_signals
+
+logger = logging.getLogger(__name__)
+
+TRIMA_LINES = ('sma5', 'sma10', 'sma15', 'x510', 'x515')
+
+
+class SMASignalData(bt.feeds.PandasData):
+    lines = ('fast', 'slow', 'cross')
+    params = (('fast', -1), ('slow', -1), ('cross', -1))
+
+
+class TriMASignalData(bt.feeds.PandasData):
+    lines = TRIMA_LINES
+    params = tuple((line, -1) for line in TRIMA_LINES)
+
+
+def add_sma_signals(df, fast, slow):
+    """预计算快/慢均线及其交叉信号（fast=1 时快线即收盘价）"""
+    close = df['Close'].to_numpy(dtype=INDICATOR_DTYPE)
+    df['fast'] = rolling_mean(close, fast)
+    df['slow'] = rolling_mean(close, slow)
+    df['cross'] = crossover(df['fast'].to_numpy(), df['slow'].to_numpy())
+    return df
+
+
+def add_trima_signals(df, ma5, ma10, ma15):
+    """预计算三条均线及交叉信号"""
+    signals = sma_cross_signals(df['Close'].to_numpy(dtype=INDICATOR_DTYPE), ma5, ma10, ma15)
+    for line, values in zip(TRIMA_LINES, signals):
+        df[line] = values
+    return df
+
+
+class SimpleCrossSMA(bt.Strategy):
+    """快线上穿慢线买入，下穿卖出"""
+
+    def __init__(self):
+        self.crossover = self.data.cross
+
+    def next(self):
+        if not self.position:
+            if self.crossover > 0:
+                self.buy()
+        elif self.crossover < 0:
+            self.close()
+
+
+class SimpleCrossTriMA(bt.Strategy):
+    """三均线策略：均线空头排列后 MA5 上穿 MA10 买入，MA5 下穿 MA10 或 MA15 卖出"""
+    params = dict(
+        ma5=5,  # 短期均线
+        ma10=10,  # 中期均线
+        ma15=15,  # 长期均线
+        current_shares=0,  # 用户当前持仓
+        avg_cost=0,  # 用户持仓成本
+        symbol="",  # 股票代码
+        report=True,  # 是否输出交易记录与最新市场状态分析
+    )
+
+    def __init__(self):
+        # 三条移动平均线与交叉信号（已在数据源中预计算）
+        self.sma5 = self.data.sma5
+        self.sma10 = self.data.sma10
+        self.sma15 = self.data.sma15
+        self.cross_5_10 = self.data.x510  # MA5上穿/下穿MA10
+        self.cross_5_15 = self.data.x515  # MA5上穿/下穿MA15
+
+    def next(self):
+        # 检查均线排列条件：MA5 < MA10 < MA15
+        ma_aligned = (self.sma5[-1] < self.sma10[-1] < self.sma15[-1])
+
+        if not self.position:
+            # 买入条件：均线排列正确且MA5上穿MA10
+            if ma_aligned and self.cross_5_10 > 0:
+                self.buy()
+                if self.p.report:
+                    logger.info('%s: 买入 - 价格: %.2f', self.data.datetime.date(), self.data.close[0])
+        else:
+            # 卖出条件：MA5下穿MA10 或 MA5下穿MA15
+            if (self.cross_5_10 < 0) or (self.cross_5_15 < 0):
+                self.close()
+                if self.p.report:
+                    logger.info('%s: 卖出 - 价格: %.2f', self.data.datetime.date(), self.data.close[0])
+
+    def stop(self):
+        if not self.p.report:
+            return
+
+        print("\n=== 最新市场状态分析 ===")
+        last_date = self.data.datetime.date(0)
+        last_price = self.data.close[0]
+        ma5_val = self.sma5[0]
+        ma10_val = self.sma10[0]
+        ma15_val = self.sma15[0]
+
+        print(f"日期: {last_date}")
+        print(f"收盘价: {last_price:.2f}")
+        print(f"MA{self.p.ma5}: {ma5_val:.2f}")
+        print(f"MA{self.p.ma10}: {ma10_val:.2f}")
+        print(f"MA{self.p.ma15}: {ma15_val:.2f}")
+
+        # 分析信号
+        ma_aligned = (ma5_val < ma10_val < ma15_val)
+
+
+        # 简单分析当前状态
+        print("\n--- 策略信号分析 ---")
+        if self.position:
+            print("【策略回测状态】: 当前持有仓位。")
+            # 卖出逻辑检查
+            sell_condition = (self.cross_5_10[0] < 0) or (self.cross_5_15[0] < 0)
+            if sell_condition:
+                 print("【策略信号】: 卖出信号触发 (MA5下穿MA10 或 MA5下穿MA15)")
+            else:
+                 print("【策略信号】: 继续持有")
+        else:
+            print("【策略回测状态】: 当前无仓位。")
+            # 买入逻辑检查
+            prev_ma_aligned = (self.sma5[-1] < self.sma10[-1] < self.sma15[-1])
+            if prev_ma_aligned and self.cross_5_10[0] > 0:
+                print("【策略信号】: 买入信号触发 (均线排列良好且MA5上穿MA10)")
+            else:
+                print("【策略信号】: 无买入信号")
+
+        # 基于用户实际持仓的建议
+        print("\n--- 用户持仓分析建议 ---")
+        user_shares = self.p.current_shares
+        user_cost = self.p.avg_cost
+
+        print(f"用户当前持仓: {user_shares} 股")
+        if user_shares > 0:
+            profit_pct = (last_price - user_cost) / user_cost * 100 if user_cost > 0 else 0
+            print(f"持仓成本: {user_cost:.2f}, 当前盈亏: {profit_pct:.2f}%")
+
+        # 综合建议逻辑
+        # 1. 卖出信号：死叉 (MA5 下穿 MA10 或 MA15)
+        is_sell_signal = (self.cross_5_10[0] < 0) or (self.cross_5_15[0] < 0)
+        # 2. 买入信号：金叉且均线排列 (MA5上穿MA10 且 昨日MA5<MA10<MA15)
+        prev_ma_aligned = (self.sma5[-1] < self.sma10[-1] < self.sma15[-1])
+        is_buy_signal = prev_ma_aligned and (self.cross_5_10[0] > 0)
+        # 3. 持有信号：均线多头排列 (MA5 > MA10 > MA15) - 简单的多头判断
+        is_bullish = (ma5_val > ma10_val > ma15_val)
+
+        if user_shares > 0:
+            if is_sell_signal:
+                print(">>> 建议: 卖出。当前出现死叉信号，建议止盈或止损。")
+            elif is_buy_signal:
+                print(">>> 建议: 加仓。当前出现金叉信号，且均线排列良好，可考虑加仓。")
+            elif is_bullish:
+                print(">>> 建议: 持有。当前均线呈多头排列，趋势向上。")
+            else:
+                print(">>> 建议: 观望/减仓。当前无明确买入信号，且趋势不明朗，若盈利可考虑减仓。")
+        else:
+            if is_buy_signal:
+                print(">>> 建议: 买入。出现金叉买点，建议建仓。")
+            elif is_sell_signal:
+                print(">>> 建议: 空仓观望。当前处于下跌趋势或卖出信号中。")
+            elif is_bullish:
+                 print(">>> 建议: 谨慎追高/等待回调。当前趋势向上但已错过最佳买点。")
+            else:
+                print(">>> 建议: 空仓观望。当前无明确机会。")
+
+        # === ⚡️ 实时行情校验 ⚡️ ===
+        print("\n=== ⚡️ 实时行情校验 ⚡️ ===")
+        try:
+            print(f"正在获取 {self.p.symbol} 的实时行情 (请稍候)...")
+            # 使用 ak.stock_zh_a_spot_em 获取实时行情
+            import akshare as ak  # 延迟导入：仅实时行情校验时需要
+            spot_df = ak.stock_zh_a_spot_em()
+            stock_row = spot_df[spot_df['代码'] == self.p.symbol]
+
+            if not stock_row.empty:
+                real_price = float(stock_row.iloc[0]['最新价'])
+                change_pct = float(stock_row.iloc[0]['涨跌幅'])
+
+                print(f"股票: {self.p.symbol}")
+                print(f"当前最新价: {real_price} (涨跌: {change_pct}%)")
+
+                # Re-calculate user profit with real price
+                user_shares = self.p.current_shares
+                user_cost = self.p.avg_cost
+
+                if user_shares > 0:
+                    real_profit_pct = (real_price - user_cost) / user_cost * 100
+                    diff_price = real_price - last_price # Difference from backtest end data
+
+                    print(f"基于实时价盈亏: {real_profit_pct:.2f}%")
+                    if abs(diff_price) / last_price > 0.01:
+                        print(f"⚠️ 注意: 实时价格与回测数据(昨日收盘 {last_price:.2f}) 偏差 {(diff_price/last_price)*100:.2f}%")
+                        print("建议以实时价格对应的盈亏为准。")
+            else:
+                print("未查询到实时行情，可能代码有误或停牌。")
+
+        except Exception as e:
+            print(f"实时行情获取失败: {e}")
+
+        print("========================\n")
+
+
+def _prompt_args(args):
+    """交互模式：逐项询问参数，直接回车使用默认值"""
+    args.symbol = input(f"请输入股票代码 (默认: {args.symbol}): ").strip() or args.symbol
+    args.start = input(f"请输入开始日期 (默认: {args.start}): ").strip() or args.start
+    args.end = input(f"请输入结束日期 (默认: {args.end}): ").strip() or args.end
+    defaults = vars(args).copy()
+    try:
+        args.cash = float(input(f"请输入起始资金 (默认: {args.cash}): ").strip() or args.cash)
+        args.stake = float(input(f"请输入每笔交易资金百分比 (默认: {args.stake}): ").strip() or args.stake)
+        args.ma5 = int(input(f"请输入短期均线周期 (默认: {args.ma5}): ").strip() or args.ma5)
+        args.ma10 = int(input(f"请输入中期均线周期 (默认: {args.ma10}): ").strip() or args.ma10)
+        args.ma15 = int(input(f"请输入长期均线周期 (默认: {args.ma15}): ").strip() or args.ma15)
+        args.current_shares = float(input(f"请输入当前持仓数量 (默认: {args.current_shares}): ").strip() or args.current_shares)
+        args.avg_cost = float(input(f"请输入持仓成本价 (默认: {args.avg_cost}, 仅供参考): ").strip() or args.avg_cost)
+    except ValueError:
+        print("输入数值无效，将使用默认值。")
+        for key in ('cash', 'stake', 'ma5', 'ma10', 'ma15', 'current_shares', 'avg_cost'):
+            setattr(args, key, defaults[key])
+    return args
+
+
+def build_parser():
+    today = datetime.now()
+    parser = argparse.ArgumentParser(description='均线交叉策略回测')
+    parser.add_argument('--strategy', choices=['sma', 'trima'], default='trima',
+                        help='sma: 快/慢均线交叉; trima: 三均线策略')
+    parser.add_argument('--symbol', default='000001', help='股票代码')
+    parser.add_argument('--start', default=(today - timedelta(days=365)).strftime("%Y%m%d"), help='开始日期 YYYYMMDD')
+    parser.add_argument('--end', default=today.strftime("%Y%m%d"), help='结束日期 YYYYMMDD')
+    parser.add_argument('--cash', type=float, default=100000.0, help='起始资金')
+    parser.add_argument('--stake', type=float, default=20, help='每笔交易资金百分比')
+    parser.add_argument('--fast', type=int, default=5, help='sma 策略快线周期（1 表示收盘价）')
+    parser.add_argument('--slow', type=int, default=10, help='sma 策略慢线周期')
+    parser.add_argument('--ma5', type=int, default=5, help='trima 策略短期均线周期')
+    parser.add_argument('--ma10', type=int, default=10, help='trima 策略中期均线周期')
+    parser.add_argument('--ma15', type=int, default=15, help='trima 策略长期均线周期')
+    parser.add_argument('--current-shares', type=float, default=0, help='当前持仓数量')
+    parser.add_argument('--avg-cost', type=float, default=0, help='持仓成本价')
+    parser.add_argument('--interactive', action='store_true', help='逐项交互输入参数')
+    parser.add_argument('--plot', action='store_true', help='回测结束后将K线图保存为 PNG')
+    return parser
+
+
+def main(argv=None):
+    # 逐笔交易记录为 INFO，原始行情数据为 DEBUG；可通过 LOG_LEVEL 环境变量调整
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'), format='%(message)s')
+    args = build_parser().parse_args(argv)
+    if args.interactive:
+        args = _prompt_args(args)
+
+    print(f"正在获取 {args.symbol} 从 {args.start} 到 {args.end} 的数据...")
+    try:
+        df = load_data(args.symbol, args.start, args.end)
+    except Exception as e:
+        print(f"获取数据出错: {e}")
+        return
+    if df.empty:
+        print("未获取到数据，请检查输入参数。")
+        return
+    logger.debug("data:\n%s", df)
+
+    cerebro = bt.Cerebro()
+    if args.strategy == 'sma':
+        cerebro.adddata(SMASignalData(dataname=add_sma_signals(df, args.fast, args.slow)))
+        cerebro.addstrategy(SimpleCrossSMA)
+    else:
+        cerebro.adddata(TriMASignalData(dataname=add_trima_signals(df, args.ma5, args.ma10, args.ma15)))
+        cerebro.addstrategy(SimpleCrossTriMA, ma5=args.ma5, ma10=args.ma10, ma15=args.ma15,
+                            current_shares=args.current_shares, avg_cost=args.avg_cost, symbol=args.symbol)
+    cerebro.broker.setcash(args.cash)
+    cerebro.broker.setcommission(commission=0.005)
+    cerebro.addsizer(bt.sizers.PercentSizer, percents=args.stake)
+    cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name='sharpe')
+    cerebro.addanalyzer(bt.analyzers.Returns, _name='returns')
+
+    print('Starting Portfolio Value: %.2f' % cerebro.broker.getvalue())
+    results = cerebro.run()
+    print('Final Portfolio Value: %.2f' % cerebro.broker.getvalue())
+    strat = results[0]
+    print('Sharpe Ratio:', strat.analyzers.sharpe.get_analysis()['sharperatio'])
+    print('Return:', strat.analyzers.returns.get_analysis()['rnorm100'], '%')
+
+    # 仅在 --plot 时绘图，避免默认加载 matplotlib；使用 Agg 后端直接输出 PNG
+    if args.plot:
+        import matplotlib
+        import backtrader.plot  # 导入时会将后端切换为 TkAgg，需在其后改回 Agg
+        matplotlib.use('Agg')
+        figs = cerebro.plot(style='candlestick', iplot=False)
+        png_path = f'{args.symbol}_{args.start}_{args.end}.png'
+        figs[0][0].savefig(png_path, dpi=100)
+        print(f'K线图已保存: {png_path}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+三均线策略参数扫描：多进程并行回测 (ma5, ma10, ma15) 参数组合
+
+用法: python sweep.py --symbol 000001 --short 3 5 8 --medium 10 13 --long 15 20 30
+"""
+import os
+import argparse
+import itertools
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from data_cache import COLUMNS, load_data
+from vector_bt import run_sma_cross
+
+# 工作进程内的共享数据（由 _init_worker 填充）
+_worker_state = {}
+
+
+def build_cerebro(df, ma5, ma10, ma15, cash=100000.0, pct=20):
+    """构建三均线策略的 Cerebro（延迟导入 backtrader，向量化引擎无需加载）"""
+    import backtrader as bt
+    from strategy import TriMASignalData, SimpleCrossTriMA, add_trima_signals
+
+    df = add_trima_signals(df.copy(), ma5, ma10, ma15)
+    cerebro = bt.Cerebro()
+    cerebro.adddata(TriMASignalData(dataname=df))
+    cerebro.addstrategy(SimpleCrossTriMA, ma5=ma5, ma10=ma10, ma15=ma15, report=False)
+    cerebro.broker.setcash(cash)
+    cerebro.broker.setcommission(commission=0.005)
+    cerebro.addsizer(bt.sizers.PercentSizer, percents=pct)
+    # 夏普比率按日收益年化、无风险利率取 0，与向量化引擎 run_sma_cross 口径一致
+    cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name='sharpe', timeframe=bt.TimeFrame.Days,
+                        annualize=True, riskfreerate=0.0)
+    cerebro.addanalyzer(bt.analyzers.Returns, _name='returns')
+    return cerebro
+
+
+def run_backtest(df, ma5, ma10, ma15, cash=100000.0, pct=20):
+    """对单组参数运行回测，返回期末资产、夏普比率与年化收益"""
+    cerebro = build_cerebro(df, ma5, ma10, ma15, cash, pct)
+    strat = cerebro.run()[0]
+
+    return {
+        'ma5': ma5,
+        'ma10': ma10,
+        'ma15': ma15,
+        'final_value': cerebro.broker.getvalue(),
+        'sharpe': strat.analyzers.sharpe.get_analysis().get('sharperatio'),
+        'return_pct': strat.analyzers.returns.get_analysis().get('rnorm100'),
+    }
+
+
+def run_vector_backtest(df, ma5, ma10, ma15, cash=100000.0, pct=20):
+    """同 run_backtest，但使用 NumPy 向量化回测引擎"""
+    result = run_sma_cross(df['Open'].to_numpy(), df['Close'].to_numpy(), ma5, ma10, ma15, cash, pct)
+    return {
+        'ma5': ma5,
+        'ma10': ma10,
+        'ma15': ma15,
+        'final_value': result.final_value,
+        'sharpe': result.sharpe,
+        'return_pct': result.return_pct,
+    }
+
+
+def _init_worker(shm_name, shape, index):
+    """工作进程初始化：挂载共享内存中的行情数据，避免每个任务重复序列化 DataFrame"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    values = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    _worker_state['shm'] = shm  # 保持引用，防止共享内存被提前释放
+    _worker_state['df'] = pd.DataFrame(values, index=index, columns=COLUMNS)
+
+
+def _run_combo(ma5, ma10, ma15, cash, pct):
+    return run_backtest(_worker_state['df'], ma5, ma10, ma15, cash, pct)
+
+
+def sweep(df, combos, cash=100000.0, pct=20, max_workers=None, engine='vector'):
+    """回测所有参数组合，按期末资产降序返回结果
+
+    engine='vector' 在当前进程内用 NumPy 引擎逐组计算（单组仅需毫秒级）；
+    engine='bt' 使用 Backtrader 引擎并通过进程池并行
+    """
+    if engine == 'vector':
+        results = [run_vector_backtest(df, *combo, cash, pct) for combo in combos]
+        results.sort(key=lambda r: r['final_value'], reverse=True)
+        return results
+
+    values = np.ascontiguousarray(df[COLUMNS].to_numpy(dtype=np.float64))
+    shm = shared_memory.SharedMemory(create=True, size=values.nbytes)
+    try:
+        np.ndarray(values.shape, dtype=np.float64, buffer=shm.buf)[:] = values
+        results = []
+        with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(),
+                                 initializer=_init_worker,
+                                 initargs=(shm.name, values.shape, df.index)) as executor:
+            futures = {executor.submit(_run_combo, *combo, cash, pct): combo for combo in combos}
+            for future in as_completed(futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    print(f"参数 {futures[future]} 回测失败: {e}")
+    finally:
+        shm.close()
+        shm.unlink()
+
+    results.sort(key=lambda r: r['final_value'], reverse=True)
+    return results
+
+
+def main(argv=None):
+    today = datetime.now()
+    parser = argparse.ArgumentParser(description='三均线策略参数扫描')
+    parser.add_argument('--symbol', default='000001')
+    parser.add_argument('--start', default=(today - timedelta(days=365)).strftime("%Y%m%d"))
+    parser.add_argument('--end', default=today.strftime("%Y%m%d"))
+    parser.add_argument('--cash', type=float, default=100000.0)
+    parser.add_argument('--pct', type=float, default=20)
+    parser.add_argument('--short', type=int, nargs='+', default=[3, 5, 8])
+    parser.add_argument('--medium', type=int, nargs='+', default=[10, 13, 20])
+    parser.add_argument('--long', type=int, nargs='+', default=[15, 30, 60])
+    parser.add_argument('--engine', choices=['vector', 'bt'], default='vector',
+                        help='回测引擎：vector 为 NumPy 向量化引擎，bt 为 Backtrader')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    df = load_data(args.symbol, args.start, args.end)
+    if df.empty:
+        print("未获取到数据，请检查输入参数。")
+        return
+
+    combos = [c for c in itertools.product(args.short, args.medium, args.long) if c[0] < c[1] < c[2]]
+    print(f"共 {len(combos)} 组参数，开始回测 (引擎: {args.engine})...")
+    results = sweep(df, combos, args.cash, args.pct, args.workers, args.engine)
+
+    print(f"\n{'MA组合':<14}{'期末资产':>14}{'夏普':>10}{'年化收益%':>12}")
+    for r in results[:args.top]:
+        sharpe = f"{r['sharpe']:.2f}" if r['sharpe'] is not None else 'N/A'
+        ret = f"{r['return_pct']:.2f}" if r['return_pct'] is not None else 'N/A'
+        label = f"{r['ma5']}/{r['ma10']}/{r['ma15']}"
+        print(f"{label:<14}{r['final_value']:>14.2f}{sharpe:>10}{ret:>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,53 +1,33 @@
+import os
+import re
 import json
+import time
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Tuple, Callable
 try:
-    from .ai_client import UnifiedAIClient
+    import orjson
 except ImportError:
-    from ai_client import UnifiedAIClient
-
+    orjson = None
 logger = logging.getLogger(__name__)
 
-class AIAnalyzer:
-    def __init__(self, ai_config: Optional[Dict[str, Any]] = None):
-        self.client = UnifiedAIClient(ai_config=ai_config)
+# 匹配 markdown 代码块中的 JSON（允许前后有说明文字，或缺少结尾的 ```）
+_JSON_FENCE = re.compile(r'```(?:json)?\s*(.*?)\s*(?:```|$)', re.DOTALL)
 
-    def generate_report(self, stock_data: Dict[str, Any], industry_avg: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """
-        基于股票数据生成 AI 分析报告
-        """
-        prompt = self._build_prompt(stock_data, industry_avg)
-        system_prompt = self._build_system_prompt()
-        
-        try:
-            response_text = self.client.analyze(prompt, system_prompt=system_prompt)
-            # Try to extract JSON from the response if it contains markdown code blocks
-            json_text = self._extract_json(response_text)
-            return json.loads(json_text)
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse AI response as JSON: {e}")
-            logger.debug(f"Raw response: {response_text}")
-            return {
-                "error": "Failed to parse AI response",
-                "raw_response": response_text
-            }
-        except Exception as e:
-            logger.error(f"AI analysis failed: {e}")
-            return {"error": str(e)}
+if orjson is not None:
+    _json_loads = orjson.loads  # orjson.JSONDecodeError 是 json.JSONDecodeError 的子类
 
-    def _extract_json(self, text: str) -> str:
-        """从文本中提取 JSON"""
-        text = text.strip()
-        if text.startswith("```json"):
-            text = text[7:]
-        if text.startswith("```"):
-            text = text[3:]
-        if text.endswith("```"):
-            text = text[:-3]
-        return text.strip()
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode('utf-8')
+else:
+    _json_loads = json.loads
 
-    def _build_system_prompt(self) -> str:
-        return """你是拥有20年经验的资深金融分析师，精通基本面分析、估值建模、财报解读。
+    def _json_dumps(obj) -> str:
+        return json.dumps(obj, ensure_ascii=False)
+
+# 系统提示词为常量，只构建一次
+_SYSTEM_PROMPT = """你是拥有20年经验的资深金融分析师，精通基本面分析、估值建模、财报解读。
 
 分析框架:
 1. 读取财务数据（营收、利润、现金流、ROE等）
@@ -62,36 +42,29 @@ class AIAnalyzer:
 - 预测需包含乐观/中性/悲观三个区间
 """
 
-    def _build_prompt(self, data: Dict[str, Any], industry_avg: Optional[Dict[str, Any]]) -> str:
-        # Extract key metrics safely
-        meta = data.get('meta', {})
-        fundamentals = data.get('fundamentals', {})
-        valuation = data.get('valuation', {})
-        
-        industry_avg_json = json.dumps(industry_avg, ensure_ascii=False) if industry_avg else "暂无行业平均数据"
-
-        return f"""
+# 用户提示词模板：导入时绑定 str.format，每次调用只做一次格式化
+_format_user_prompt = """
 作为资深金融分析师，请分析以下股票数据：
 
 ## 股票基本信息
-- 代码: {meta.get('code', 'Unknown')}
-- 名称: {meta.get('stock_name', 'Unknown')}
-- 行业: {meta.get('industry', 'Unknown')}
+- 代码: {code}
+- 名称: {stock_name}
+- 行业: {industry}
 
 ## 核心财务指标
-- 营收: {fundamentals.get('revenue_yi', 0)}亿元
-- 净利润: {fundamentals.get('net_profit_yi', 0)}亿元
-- ROE: {fundamentals.get('roe_pct', 0)}%
-- 毛利率: {fundamentals.get('gross_margin_pct', 0)}%
-- 净利率: {fundamentals.get('net_margin_pct', 0)}%
-- 负债率: {fundamentals.get('debt_ratio_pct', 0)}%
+- 营收: {revenue_yi}亿元
+- 净利润: {net_profit_yi}亿元
+- ROE: {roe_pct}%
+- 毛利率: {gross_margin_pct}%
+- 净利率: {net_margin_pct}%
+- 负债率: {debt_ratio_pct}%
 
 ## 估值数据
-- 当前价格: ¥{valuation.get('price', 0)}
-- PE(TTM): {valuation.get('pe_ttm', 0)}
-- PB: {valuation.get('pb', 0)}
-- DCF估值: ¥{valuation.get('dcf_per_share', 0)}
-- DCF安全边际: {valuation.get('dcf_margin_of_safety', 0)}%
+- 当前价格: ¥{price}
+- PE(TTM): {pe_ttm}
+- PB: {pb}
+- DCF估值: ¥{dcf_per_share}
+- DCF安全边际: {dcf_margin_of_safety}%
 
 ## 行业平均（对比基准）
 {industry_avg_json}
@@ -117,4 +90,158 @@ class AIAnalyzer:
     "key_drivers": ["..."]
   }}
 }}
-"""
+""".format
+
+AI_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'ai')
+
+class AIAnalyzer:
+    def __init__(self, ai_config: Optional[Dict[str, Any]] = None, cache_ttl: int = 86400):
+        # 延迟导入：仅构造分析器时才加载 anthropic/httpx，使用提示词/解析工具无需这些依赖
+        try:
+            from .ai_client import UnifiedAIClient
+        except ImportError:
+            from ai_client import UnifiedAIClient
+        self.client = UnifiedAIClient(ai_config=ai_config)
+        self.cache_ttl = cache_ttl  # 磁盘缓存有效期（秒）
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def generate_report(self, stock_data: Dict[str, Any], industry_avg: Optional[Dict[str, Any]] = None,
+                        use_cache: bool = True, on_text: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """
+        基于股票数据生成 AI 分析报告
+        相同的 (system_prompt, prompt, model) 直接返回磁盘缓存结果；
+        传入 on_text 时以流式方式调用，每收到一段文本即回调，便于界面/日志提前展示
+        """
+        prompt = self._build_prompt(stock_data, industry_avg)
+        system_prompt = self._build_system_prompt()
+
+        cache_key = self._cache_key(system_prompt, prompt)
+        if use_cache:
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                return cached
+        
+        try:
+            if on_text is None:
+                response_text = self.client.analyze(prompt, system_prompt=system_prompt)
+            else:
+                parts = []
+                for delta in self.client.analyze_stream(prompt, system_prompt=system_prompt):
+                    parts.append(delta)
+                    on_text(delta)
+                response_text = "".join(parts).strip()
+        except Exception as e:
+            logger.error(f"AI analysis failed: {e}")
+            return {"error": str(e)}
+        result = self._parse_response(response_text)
+        self._cache_set(cache_key, result)
+        return result
+
+    async def generate_reports_batch(self, items: List[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]],
+                                     concurrency: int = 8, use_cache: bool = True) -> List[Dict[str, Any]]:
+        """
+        并发生成多份 AI 分析报告，items 为 (stock_data, industry_avg) 列表。
+        单项失败不影响其他项，结果顺序与输入一致；与 generate_report 共用磁盘缓存，命中时不占用并发名额。
+        """
+        system_prompt = self._build_system_prompt()
+        sem = asyncio.Semaphore(concurrency)
+
+        async def run_one(stock_data, industry_avg):
+            prompt = self._build_prompt(stock_data, industry_avg)
+            cache_key = self._cache_key(system_prompt, prompt)
+            if use_cache:
+                cached = self._cache_get(cache_key)
+                if cached is not None:
+                    return cached
+            try:
+                async with sem:
+                    response_text = await self.client.aanalyze(prompt, system_prompt=system_prompt)
+            except Exception as e:
+                logger.error(f"AI analysis failed: {e}")
+                return {"error": str(e)}
+            result = self._parse_response(response_text)
+            self._cache_set(cache_key, result)
+            return result
+
+        # 异步连接池绑定当前事件循环，批次结束即关闭
+        async with self.client:
+            return await asyncio.gather(*(run_one(data, avg) for data, avg in items))
+
+    def _cache_key(self, system_prompt: str, prompt: str) -> str:
+        return hashlib.sha256((system_prompt + prompt + self.client.model).encode('utf-8')).hexdigest()
+
+    def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取未过期的缓存结果，未命中返回 None"""
+        path = os.path.join(AI_CACHE_DIR, f"{key}.json")
+        try:
+            if time.time() - os.path.getmtime(path) < self.cache_ttl:
+                with open(path, 'rb') as f:
+                    result = _json_loads(f.read())
+                self.stats['hits'] += 1
+                return result
+        except (OSError, ValueError):
+            pass
+        self.stats['misses'] += 1
+        return None
+
+    def _cache_set(self, key: str, result: Dict[str, Any]) -> None:
+        """写入缓存（仅缓存成功的结果），先写临时文件再原子替换"""
+        if "error" in result:
+            return
+        path = os.path.join(AI_CACHE_DIR, f"{key}.json")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(AI_CACHE_DIR, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(_json_dumps(result))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write AI cache: {e}")
+
+    def _parse_response(self, response_text: str) -> Dict[str, Any]:
+        """解析 AI 返回的 JSON 报告"""
+        try:
+            # Try to extract JSON from the response if it contains markdown code blocks
+            json_text = self._extract_json(response_text)
+            return _json_loads(json_text)
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse AI response as JSON: {e}")
+            logger.debug(f"Raw response: {response_text}")
+            return {
+                "error": "Failed to parse AI response",
+                "raw_response": response_text
+            }
+
+    def _extract_json(self, text: str) -> str:
+        """从文本中提取 JSON"""
+        m = _JSON_FENCE.search(text)
+        return (m.group(1) if m else text).strip()
+
+    def _build_system_prompt(self) -> str:
+        return _SYSTEM_PROMPT
+
+    def _build_prompt(self, data: Dict[str, Any], industry_avg: Optional[Dict[str, Any]]) -> str:
+        # Extract key metrics safely
+        meta = data.get('meta', {})
+        fundamentals = data.get('fundamentals', {})
+        valuation = data.get('valuation', {})
+        
+        industry_avg_json = _json_dumps(industry_avg) if industry_avg else "暂无行业平均数据"
+
+        return _format_user_prompt(
+            code=meta.get('code', 'Unknown'),
+            stock_name=meta.get('stock_name', 'Unknown'),
+            industry=meta.get('industry', 'Unknown'),
+            revenue_yi=fundamentals.get('revenue_yi', 0),
+            net_profit_yi=fundamentals.get('net_profit_yi', 0),
+            roe_pct=fundamentals.get('roe_pct', 0),
+            gross_margin_pct=fundamentals.get('gross_margin_pct', 0),
+            net_margin_pct=fundamentals.get('net_margin_pct', 0),
+            debt_ratio_pct=fundamentals.get('debt_ratio_pct', 0),
+            price=valuation.get('price', 0),
+            pe_ttm=valuation.get('pe_ttm', 0),
+            pb=valuation.get('pb', 0),
+            dcf_per_share=valuation.get('dcf_per_share', 0),
+            dcf_margin_of_safety=valuation.get('dcf_margin_of_safety', 0),
+            industry_avg_json=industry_avg_json
+        )
@@ -1,8 +1,8 @@
 import os
-import anthropic
-import httpx
-from typing import Optional, Dict, Any
-import time
+import functools
+import importlib.util
+import tenacity
+from typing import Optional, Dict, Any, Iterator
 try:
     from .config import AI_CONFIG
 except ImportError:
@@ -18,6 +18,91 @@ except ImportError:
         } if os.getenv('HTTP_PROXY') else None
     }
 
+# 参数/鉴权/资源类错误重试无意义，直接失败
+_FATAL_STATUS_CODES = (400, 401, 403, 404)
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    """连接错误、超时、429 与 5xx 可重试"""
+    import anthropic
+    if isinstance(exc, anthropic.APIStatusError):
+        return exc.status_code not in _FATAL_STATUS_CODES
+    return isinstance(exc, anthropic.APIConnectionError)
+
+
+def _log_retry(retry_state) -> None:
+    print(f"AI API Call Error (attempt {retry_state.attempt_number}): {retry_state.outcome.exception()}")
+
+
+# 安装了 h2 时启用 HTTP/2 多路复用
+_HTTP2_AVAILABLE = importlib.util.find_spec('h2') is not None
+
+# 同步/异步客户端共用的连接池参数
+_POOL_LIMITS = dict(max_connections=10, max_keepalive_connections=10, keepalive_expiry=60)
+
+
+def _proxy_mounts(transport_cls, proxy_items, **transport_kwargs):
+    """代理配置 (('http', url), ...) -> httpx 的 mounts；未配置代理时返回 None
+
+    httpx 0.28 已移除 proxies= 参数，按协议挂载带 proxy= 的 transport
+    """
+    if not proxy_items:
+        return None
+    return {
+        (scheme if scheme.endswith('://') else f'{scheme}://'): transport_cls(proxy=url, **transport_kwargs)
+        for scheme, url in proxy_items
+    }
+
+
+@functools.lru_cache(maxsize=4)
+def _get_anthropic_client(api_key, auth_token, base_url, timeout, proxy_items):
+    """按连接参数复用 Anthropic 客户端，使多次分析共享同一个长连接池"""
+    # 延迟导入：anthropic/httpx 较重，仅在真正创建客户端时加载
+    import anthropic
+    import httpx
+    limits = httpx.Limits(**_POOL_LIMITS)
+    http_client = httpx.Client(
+        http2=_HTTP2_AVAILABLE,
+        limits=limits,
+        # 代理 transport 不继承 Client 的连接参数，需单独传入
+        mounts=_proxy_mounts(httpx.HTTPTransport, proxy_items, http2=_HTTP2_AVAILABLE, limits=limits),
+        timeout=timeout
+    )
+    return anthropic.Anthropic(
+        api_key=api_key or None,
+        auth_token=auth_token,
+        base_url=base_url,
+        timeout=timeout,
+        max_retries=0,  # 重试由 UnifiedAIClient 统一处理
+        http_client=http_client
+    )
+
+
+def _get_async_anthropic_client(api_key, auth_token, base_url, timeout, proxy_items):
+    """创建异步 Anthropic 客户端，连接池配置同 _get_anthropic_client
+
+    httpx.AsyncClient 绑定创建时的事件循环，不能跨 asyncio.run 复用，故不做进程级缓存；
+    由 UnifiedAIClient 按批次创建并在 aclose 时关闭
+    """
+    import anthropic
+    import httpx
+    limits = httpx.Limits(**_POOL_LIMITS)
+    http_client = httpx.AsyncClient(
+        http2=_HTTP2_AVAILABLE,
+        limits=limits,
+        mounts=_proxy_mounts(httpx.AsyncHTTPTransport, proxy_items, http2=_HTTP2_AVAILABLE, limits=limits),
+        timeout=timeout
+    )
+    return anthropic.AsyncAnthropic(
+        api_key=api_key or None,
+        auth_token=auth_token,
+        base_url=base_url,
+        timeout=timeout,
+        max_retries=0,
+        http_client=http_client
+    )
+
+
 class UnifiedAIClient:
     """
     统一的 AI 客户端，支持多种 API 提供商
@@ -52,44 +137,75 @@ class UnifiedAIClient:
         if isinstance(self.proxies, str):
             self.proxies = {'http': self.proxies, 'https': self.proxies}
 
-        # Configure httpx client with proxy if available
-        http_client = None
-        if self.proxies:
-            http_client = httpx.Client(proxies=self.proxies)
+        # 相同配置的实例共享同一个客户端（及其 keep-alive 连接池）
+        proxy_items = tuple(sorted((k, v) for k, v in self.proxies.items() if v)) if self.proxies else None
+        self._client_args = (self.api_key, auth_token, self.base_url, self.timeout, proxy_items)
+        self.client = _get_anthropic_client(*self._client_args)
+        self._aclient = None
 
-        self.client = anthropic.Anthropic(
-            api_key=self.api_key or None,
-            auth_token=auth_token,
-            base_url=self.base_url,
-            timeout=self.timeout,
-            http_client=http_client
-        )
+    @property
+    def aclient(self):
+        """异步客户端，首次使用时创建；用完需 aclose（或 async with 本实例）释放连接池"""
+        if self._aclient is None:
+            self._aclient = _get_async_anthropic_client(*self._client_args)
+        return self._aclient
 
-    def analyze(self, prompt: str, system_prompt: str = "", max_tokens: int = 4096) -> str:
-        """调用 AI 分析"""
-        messages = [{"role": "user", "content": prompt}]
-        
+    async def aclose(self) -> None:
+        """关闭异步客户端的连接池（未创建时无操作）"""
+        if self._aclient is not None:
+            aclient, self._aclient = self._aclient, None
+            await aclient.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    def _build_request(self, prompt: str, system_prompt: str, max_tokens: int) -> Dict[str, Any]:
+        """构造 messages.create 参数"""
         kwargs = {
             "model": self.model,
             "max_tokens": max_tokens,
-            "messages": messages
+            "messages": [{"role": "user", "content": prompt}]
         }
-        
         if system_prompt:
             kwargs["system"] = system_prompt
+        return kwargs
 
-        last_error = None
-        for attempt in range(self.retry_count + 1):
-            try:
+    def _retry_policy(self) -> Dict[str, Any]:
+        """指数退避 + 随机抖动，避免并发请求在同一时刻集中重试"""
+        return {
+            'stop': tenacity.stop_after_attempt(self.retry_count + 1),
+            'wait': tenacity.wait_exponential_jitter(initial=self.retry_backoff, max=30),
+            'retry': tenacity.retry_if_exception(_is_retryable),
+            'before_sleep': _log_retry,
+            'reraise': True
+        }
+
+    def analyze(self, prompt: str, system_prompt: str = "", max_tokens: int = 4096) -> str:
+        """调用 AI 分析"""
+        kwargs = self._build_request(prompt, system_prompt, max_tokens)
+
+        for attempt in tenacity.Retrying(**self._retry_policy()):
+            with attempt:
                 response = self.client.messages.create(**kwargs)
-                return self._extract_text(response)
-            except Exception as e:
-                last_error = e
-                print(f"AI API Call Error (attempt {attempt + 1}): {e}")
-                if attempt < self.retry_count:
-                    time.sleep(self.retry_backoff * (2 ** attempt))
-
-        raise last_error
+        return self._extract_text(response)
+
+    def analyze_stream(self, prompt: str, system_prompt: str = "", max_tokens: int = 4096) -> Iterator[str]:
+        """流式调用 AI 分析，逐段产出文本增量（已输出部分无法重试，故不做重试）"""
+        kwargs = self._build_request(prompt, system_prompt, max_tokens)
+        with self.client.messages.stream(**kwargs) as stream:
+            yield from stream.text_stream
+
+    async def aanalyze(self, prompt: str, system_prompt: str = "", max_tokens: int = 4096) -> str:
+        """异步调用 AI 分析（重试策略同 analyze）"""
+        kwargs = self._build_request(prompt, system_prompt, max_tokens)
+
+        async for attempt in tenacity.AsyncRetrying(**self._retry_policy()):
+            with attempt:
+                response = await self.aclient.messages.create(**kwargs)
+        return self._extract_text(response)
 
     def _extract_text(self, response) -> str:
         """从 Anthropic 响应中提取文本内容"""
@@ -6,6 +6,15 @@ import pandas as pd
 import numpy as np
 from config import EVA_CONFIG
 
+try:
+    from numba import njit
+except ImportError:
+    # 未安装 numba 时退化为普通 Python 函数（结果一致，只是更慢）
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
 def _safe_float(value, default=0.0):
     """安全转换为浮点数"""
     try:
@@ -56,32 +65,174 @@ def calculate_single_quarter_data(df):
             
     return q_df
 
+# ==================== 技术指标内核（numba） ====================
+# 内核只接收 float64 ndarray；输入含 NaN 时 EWM 的语义较复杂，由外层函数退回 pandas 实现
+# （RSV 内核自行按 pandas 滚动窗口规则处理 NaN）。内核运行时释放 GIL（nogil），可在线程池中并行
+
+@njit(cache=True, nogil=True, error_model='numpy')
+def _ewm_mean(values, alpha):
+    """等价于 pandas ewm(alpha=alpha, adjust=False).mean()（输入不含 NaN）"""
+    n = values.shape[0]
+    out = np.empty(n)
+    if n == 0:
+        return out
+    old_wt = 1.0 - alpha
+    weighted = values[0]
+    out[0] = weighted
+    for i in range(1, n):
+        # 与 pandas 相同的递推写法（含相等时跳过），保证逐位一致
+        if weighted != values[i]:
+            weighted = (old_wt * weighted + alpha * values[i]) / (old_wt + alpha)
+        out[i] = weighted
+    return out
+
+@njit(cache=True, nogil=True, error_model='numpy')
+def _rsi_kernel(close, period):
+    """RSI：涨跌幅的 period 日简单均值之比，无法计算处为 50
+
+    单次遍历维护窗口内涨/跌幅之和；另记窗口内上涨/下跌天数，无涨或无跌的窗口精确取 0，
+    避免滑动相减的舍入残差改变 loss == 0 时取 50 的判断
+    """
+    n = close.shape[0]
+    out = np.full(n, 50.0)
+    gains = np.zeros(n)
+    losses = np.zeros(n)
+    for i in range(1, n):
+        d = close[i] - close[i - 1]
+        if d > 0:
+            gains[i] = d
+        elif d < 0:
+            losses[i] = -d
+    gain_sum = 0.0
+    loss_sum = 0.0
+    gain_days = 0
+    loss_days = 0
+    for i in range(n):
+        gain_sum += gains[i]
+        loss_sum += losses[i]
+        gain_days += gains[i] > 0
+        loss_days += losses[i] > 0
+        if i >= period:
+            gain_sum -= gains[i - period]
+            loss_sum -= losses[i - period]
+            gain_days -= gains[i - period] > 0
+            loss_days -= losses[i - period] > 0
+        if i >= period - 1 and loss_days > 0:
+            gain = gain_sum / period if gain_days > 0 else 0.0
+            loss = loss_sum / period
+            out[i] = 100 - (100 / (1 + gain / loss))
+    return out
+
+@njit(cache=True, nogil=True, error_model='numpy')
+def _macd_kernel(values, fast, slow, signal):
+    """MACD 三条线一次算出（输入不含 NaN），返回 (dif, dea, macd)"""
+    dif = _ewm_mean(values, 2.0 / (fast + 1.0)) - _ewm_mean(values, 2.0 / (slow + 1.0))
+    dea = _ewm_mean(dif, 2.0 / (signal + 1.0))
+    return dif, dea, 2 * (dif - dea)
+
+@njit(cache=True, nogil=True, error_model='numpy')
+def _rsv_kernel(high, low, close, n):
+    """KDJ 的 RSV：收盘价在 n 日高低区间中的位置，窗口不足或窗口内含 NaN 处为 50
+
+    与 pandas rolling(n).min()/max() 后 fillna(50) 的结果一致
+    """
+    size = close.shape[0]
+    out = np.full(size, 50.0)
+    # 距上一个 NaN（最高/最低价）的天数，不足 n 天说明窗口内含 NaN
+    since_nan = 0
+    for i in range(size):
+        if np.isnan(high[i]) or np.isnan(low[i]):
+            since_nan = 0
+            continue
+        since_nan += 1
+        if since_nan < n:
+            continue
+        low_n = low[i]
+        high_n = high[i]
+        for j in range(i - n + 1, i):
+            if low[j] < low_n:
+                low_n = low[j]
+            if high[j] > high_n:
+                high_n = high[j]
+        rsv = (close[i] - low_n) / (high_n - low_n) * 100
+        if not np.isnan(rsv):
+            out[i] = rsv
+    return out
+
+@njit(cache=True, nogil=True)
+def _linear_slope(y):
+    """最小二乘直线拟合 y ~ x (x = 0..n-1) 的斜率"""
+    n = y.shape[0]
+    x_mean = (n - 1) / 2.0
+    y_mean = 0.0
+    for i in range(n):
+        y_mean += y[i]
+    y_mean /= n
+    cov = 0.0
+    var = 0.0
+    for i in range(n):
+        dx = i - x_mean
+        cov += dx * (y[i] - y_mean)
+        var += dx * dx
+    return cov / var
+
+@njit(cache=True, nogil=True, error_model='numpy')
+def _annual_growth_kernel(rev, profit):
+    """逐年增速与 3/5 年 CAGR
+
+    增速：上一年 > 0 时为 本年/上一年 - 1，否则（含首年）为 NaN；
+    CAGR：cagr[k, j] 为第 k 个序列（0 营收 / 1 净利）的 (3, 5)[j] 年 CAGR，首尾值均 > 0 时才有值
+    """
+    n = rev.shape[0]
+    rev_growth = np.full(n, np.nan)
+    profit_growth = np.full(n, np.nan)
+    for i in range(1, n):
+        if rev[i - 1] > 0:
+            rev_growth[i] = rev[i] / rev[i - 1] - 1
+        if profit[i - 1] > 0:
+            profit_growth[i] = profit[i] / profit[i - 1] - 1
+    cagr = np.full((2, 2), np.nan)
+    for j in range(2):
+        years = 3 if j == 0 else 5
+        if n <= years:
+            break
+        for k in range(2):
+            values = rev if k == 0 else profit
+            start = values[n - 1 - years]
+            latest = values[n - 1]
+            if start > 0 and latest > 0:
+                cagr[k, j] = (latest / start) ** (1.0 / years) - 1
+    return rev_growth, profit_growth, cagr
+
+def _as_float_array(series):
+    return series.to_numpy(dtype=np.float64, copy=False)
+
 def calculate_rsi(series, period=14):
     """计算RSI指标"""
-    delta = series.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    rs = gain / loss.replace(0, np.nan)
-    rsi = 100 - (100 / (1 + rs))
-    return rsi.fillna(50)
+    values = _as_float_array(series)
+    return pd.Series(_rsi_kernel(values, period), index=series.index)
 
 def calculate_macd(series, fast=12, slow=26, signal=9):
     """计算MACD指标"""
-    ema_fast = series.ewm(span=fast, adjust=False).mean()
-    ema_slow = series.ewm(span=slow, adjust=False).mean()
-    dif = ema_fast - ema_slow
-    dea = dif.ewm(span=signal, adjust=False).mean()
-    macd = 2 * (dif - dea)
-    return dif, dea, macd
+    values = _as_float_array(series)
+    if np.isnan(values).any():
+        ema_fast = series.ewm(span=fast, adjust=False).mean()
+        ema_slow = series.ewm(span=slow, adjust=False).mean()
+        dif = ema_fast - ema_slow
+        dea = dif.ewm(span=signal, adjust=False).mean()
+        macd = 2 * (dif - dea)
+        return dif, dea, macd
+    dif, dea, macd = _macd_kernel(values, fast, slow, signal)
+    index = series.index
+    return pd.Series(dif, index=index), pd.Series(dea, index=index), pd.Series(macd, index=index)
 
 def calculate_kdj(high, low, close, n=9, m1=3, m2=3):
     """计算KDJ指标"""
-    low_n = low.rolling(window=n).min()
-    high_n = high.rolling(window=n).max()
-    rsv = (close - low_n) / (high_n - low_n) * 100
-    rsv = rsv.fillna(50)
-    k = rsv.ewm(com=m1-1, adjust=False).mean()
-    d = k.ewm(com=m2-1, adjust=False).mean()
+    rsv = _rsv_kernel(_as_float_array(high), _as_float_array(low), _as_float_array(close), n)
+    k_values = _ewm_mean(rsv, 1.0 / m1)
+    d_values = _ewm_mean(k_values, 1.0 / m2)
+    k = pd.Series(k_values, index=close.index)
+    d = pd.Series(d_values, index=close.index)
     j = 3 * k - 2 * d
     return k, d, j
 
@@ -89,14 +240,28 @@ def calculate_ma_slope(series, period=120):
     """计算均线斜率"""
     if len(series) < period:
         return 0
-    y = series.tail(period).values
-    x = np.arange(period)
-    slope = np.polyfit(x, y, 1)[0]
+    y = _as_float_array(series.tail(period))
+    slope = np.polyfit(np.arange(period), y, 1)[0] if np.isnan(y).any() else _linear_slope(y)
     angle = np.degrees(np.arctan(slope / series.mean() * 100))
     return angle
 
+def calculate_annual_growth(revenues, profits):
+    """年度营收/净利的逐年增速与 CAGR（输入为等长、已去除 NaN 的一维数组）
+
+    返回 (营收增速数组, 净利增速数组, cagr)，cagr 键为 rev_3y/profit_3y/rev_5y/profit_5y，
+    无法计算的年份不出现在 cagr 中
+    """
+    rev_growth, profit_growth, cagr = _annual_growth_kernel(
+        np.asarray(revenues, dtype=np.float64), np.asarray(profits, dtype=np.float64))
+    cagr_dict = {}
+    for j, years in enumerate((3, 5)):
+        for k, key in enumerate(('rev', 'profit')):
+            if not np.isnan(cagr[k, j]):
+                cagr_dict[f'{key}_{years}y'] = float(cagr[k, j])
+    return rev_growth, profit_growth, cagr_dict
+
 def calculate_ttm_series(df, col_name):
-    """计算滚动(TTM)数据序列"""
+    """计算滚动(TTM)数据序列：年报取当年值，其余报告期为 本期 + 上年年报 - 上年同期"""
     if df is None or col_name not in df.columns:
         return pd.Series()
     
@@ -104,24 +269,27 @@ def calculate_ttm_series(df, col_name):
     if date_col not in df.columns:
         return pd.Series()
         
-    temp_df = df[[date_col, col_name]].copy().sort_values(date_col)
-    temp_df[col_name] = temp_df[col_name].apply(_safe_float)
-    ttm_series = {}
+    temp_df = df[[date_col, col_name]].sort_values(date_col)
+    dates = temp_df[date_col]
+    values = pd.to_numeric(temp_df[col_name], errors='coerce').fillna(0.0).to_numpy(dtype=np.float64)
+    periods = list(zip(dates.dt.year.tolist(), dates.dt.month.tolist()))
+    
+    # (年, 月) -> 第一条记录的位置，上年年报/同期按键直接查，不再逐行对整表做布尔筛选
+    period_pos = {}
+    for pos, period in enumerate(periods):
+        period_pos.setdefault(period, pos)
     
-    for idx, row in temp_df.iterrows():
-        curr_date, curr_val = row[date_col], row[col_name]
-        if curr_date.month == 12:
+    ttm_series = {}
+    for curr_date, (year, month), curr_val in zip(dates, periods, values):
+        if month == 12:
             ttm_series[curr_date] = curr_val
+            continue
+        annual_pos = period_pos.get((year - 1, 12))
+        same_pos = period_pos.get((year - 1, month))
+        if annual_pos is not None and same_pos is not None:
+            ttm_series[curr_date] = curr_val + values[annual_pos] - values[same_pos]
         else:
-            prev_annual = temp_df[(temp_df[date_col].dt.year == curr_date.year - 1) & (temp_df[date_col].dt.month == 12)]
-            prev_same = temp_df[(temp_df[date_col].dt.year == curr_date.year - 1) & (temp_df[date_col].dt.month == curr_date.month)]
-            
-            if not prev_annual.empty and not prev_same.empty:
-                val_annual = prev_annual.iloc[0][col_name]
-                val_same = prev_same.iloc[0][col_name]
-                ttm_series[curr_date] = curr_val + val_annual - val_same
-            else:
-                ttm_series[curr_date] = np.nan
+            ttm_series[curr_date] = np.nan
                 
     return pd.Series(ttm_series).sort_index()
 
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+分析任务执行器，同时供 server.py 的进程内线程池和 celery_tasks.py 的 Celery worker 使用
+
+两种执行方式（环境变量 ANALYSIS_MODE 选择）：
+- subprocess（默认）：每个任务启动子进程运行 stock_analysis_v2.py，逐行解析输出推进进度；
+  进程隔离、可超时终止，任务结束后内存完全释放
+- inprocess：首次使用时导入 stock_analysis_v2 并直接调用 run_analysis，免去每个任务的
+  解释器启动与 pandas/matplotlib 等重型模块导入；pyplot 全局状态非线程安全，
+  同一进程内的任务串行执行，且无法强制超时，适合 Celery worker 这类专用进程
+"""
+import os
+import re
+import sys
+import subprocess
+import threading
+from collections import deque
+
+WORKING_DIR = os.path.dirname(os.path.abspath(__file__))
+ANALYSIS_SCRIPT = os.path.join(WORKING_DIR, 'stock_analysis_v2.py')
+
+ANALYSIS_MODE = os.environ.get('ANALYSIS_MODE', 'subprocess')
+ANALYSIS_TIMEOUT = 3600  # 秒（仅 subprocess 模式）
+OUTPUT_TAIL_LINES = 50  # 失败时回传给前端的输出行数
+
+# 分析脚本输出中的阶段标志 -> (进度, 提示信息)，按出现顺序推进
+_PROGRESS_MARKERS = (
+    ('启动A股分析模式', 20, '正在获取数据...'),
+    ('启动期货分析模式', 20, '正在获取期货数据...'),
+    ('【增量分析】', 35, '正在进行增量分析...'),
+    ('【公司分析报告】', 50, '正在进行公司分析...'),
+    ('【财报深度解读】', 65, '正在解读财报...'),
+    ('【量化回测】', 75, '正在运行量化回测...'),
+    ('投资分析总结报告', 90, '正在生成总结报告...'),
+)
+
+# 分析脚本输出中的报告文件夹名（如 "结构化数据已保存: 分析报告_600519_20250101_0930/analysis_data.json"）
+_RE_STOCK_REPORT_OUTPUT = re.compile(r'分析报告_[^_\s/\\]+_\d{8}_\d{4}')
+
+
+# 进程内模式：分析模块只导入一次，任务串行执行
+_inprocess_lock = threading.Lock()
+
+
+def run_analysis(code, on_progress=None):
+    """运行一次分析，返回 (returncode, report_dir, output_tail)
+
+    on_progress(progress, message) 在每个分析阶段开始时回调；
+    subprocess 模式超时抛出 subprocess.TimeoutExpired
+    """
+    if ANALYSIS_MODE == 'inprocess':
+        return _run_inprocess(code, on_progress)
+    return _run_subprocess(code, on_progress)
+
+
+def _run_inprocess(code, on_progress=None):
+    with _inprocess_lock:
+        try:
+            # 分析脚本按相对路径写报告文件夹
+            if os.getcwd() != WORKING_DIR:
+                os.chdir(WORKING_DIR)
+            import stock_analysis_v2
+            output_dir = stock_analysis_v2.run_analysis(code, on_progress)
+        except BaseException:
+            # 导入失败时 stock_analysis_v2 会调用 sys.exit，这里一并转为任务失败
+            import traceback
+            return 1, None, traceback.format_exc()[-1500:]
+    return 0, os.path.basename(output_dir) if output_dir else None, ''
+
+
+def _run_subprocess(code, on_progress=None):
+    # 设置环境变量
+    env = os.environ.copy()
+    env['PYTHONIOENCODING'] = 'utf-8'
+    env['PYTHONUNBUFFERED'] = '1'
+
+    # 逐行读取输出，据此更新进度，只保留末尾若干行用于错误信息
+    cmd = [sys.executable, ANALYSIS_SCRIPT, code]
+    proc = subprocess.Popen(
+        cmd,
+        cwd=WORKING_DIR,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1,
+        env=env,
+        encoding='utf-8',
+        errors='replace'
+    )
+    timed_out = threading.Event()
+
+    def kill_on_timeout():
+        timed_out.set()
+        proc.kill()
+
+    timer = threading.Timer(ANALYSIS_TIMEOUT, kill_on_timeout)
+    timer.daemon = True
+    timer.start()
+    tail = deque(maxlen=OUTPUT_TAIL_LINES)
+    report_dir = None
+    try:
+        with proc.stdout:
+            for line in proc.stdout:
+                tail.append(line)
+                m = _RE_STOCK_REPORT_OUTPUT.search(line)
+                if m:
+                    report_dir = m.group()
+                if on_progress is not None:
+                    for marker, progress, message in _PROGRESS_MARKERS:
+                        if marker in line:
+                            on_progress(progress, message)
+                            break
+        returncode = proc.wait()
+    finally:
+        timer.cancel()
+
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(cmd, ANALYSIS_TIMEOUT)
+
+    return returncode, report_dir, ''.join(tail).strip()
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+可选的 Celery 任务队列：设置 CELERY_BROKER_URL（如 redis://localhost:6379/0）后，
+server.py 把分析任务投递到 Celery，任务状态保存在结果后端，可跨多个 Web 进程查询
+
+启动 worker: cd stock_analysis && celery -A celery_tasks worker --concurrency 4
+未安装 celery 或未配置 broker 时 celery_app 为 None，server.py 使用进程内线程池
+"""
+import os
+
+from analysis_runner import run_analysis
+
+try:
+    from celery import Celery
+except ImportError:
+    Celery = None
+
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL')
+CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', CELERY_BROKER_URL)
+
+celery_app = None
+run_analysis_job = None
+
+if Celery is not None and CELERY_BROKER_URL:
+    celery_app = Celery('blackoil', broker=CELERY_BROKER_URL, backend=CELERY_RESULT_BACKEND)
+    celery_app.conf.update(
+        task_track_started=True,  # 区分排队 (PENDING) 与执行中 (STARTED)
+        task_acks_late=True,
+        worker_prefetch_multiplier=1,  # 分析任务耗时长，不预取
+        result_expires=3600,
+    )
+
+    @celery_app.task(bind=True, name='blackoil.run_analysis')
+    def run_analysis_job(self, code):
+        """Celery 版分析任务：进度写入 PROGRESS 状态，失败时抛出异常进入 FAILURE"""
+        def on_progress(progress, message):
+            self.update_state(state='PROGRESS', meta={'progress': progress, 'message': message, 'code': code})
+
+        returncode, report_dir, output_tail = run_analysis(code, on_progress)
+        if returncode != 0:
+            raise RuntimeError((output_tail or f'Exit code: {returncode}')[-1500:])
+        return {'code': code, 'report_dir': report_dir}
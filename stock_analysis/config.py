@@ -32,28 +32,58 @@ COMPETITOR_CODES = ['601008', '601880', '603967']
 # ==================== 样式与颜色 ====================
 # Matplotlib 全局字体设置 - 跨平台自适应
 # 'Arial Unicode MS' (macOS), 'SimHei' (Windows), 'WenQuanYi Micro Hei' (Linux)
+import os
 import platform
-import matplotlib.font_manager as fm
-
-# 根据操作系统选择合适的字体
-_system = platform.system()
-if _system == 'Darwin':  # macOS
-    FONT_FAMILY = 'Arial Unicode MS'
-elif _system == 'Windows':
-    FONT_FAMILY = 'SimHei'
-else:  # Linux
-    FONT_FAMILY = 'WenQuanYi Micro Hei'
-
-# 如果首选字体不可用，尝试备选字体
-_fonts = [FONT_FAMILY, 'SimHei', 'Arial Unicode MS', 'WenQuanYi Micro Hei', 'DejaVu Sans']
-_available_fonts = {f.name for f in fm.fontManager.ttflist}
-for font in _fonts:
-    if font in _available_fonts:
-        FONT_FAMILY = font
-        break
-else:
+import matplotlib
+
+# 字体检测结果缓存：按 (操作系统, matplotlib 版本) 命中时跳过 font_manager 的导入与扫描
+_FONT_CACHE_FILE = os.path.join(os.path.expanduser('~'), '.cache', 'blackoil', 'font.txt')
+
+
+def _detect_font_family(system):
+    """扫描 matplotlib 字体列表，选出第一个可用的中文字体"""
+    import matplotlib.font_manager as fm
+
+    # 根据操作系统选择合适的字体
+    if system == 'Darwin':  # macOS
+        preferred = 'Arial Unicode MS'
+    elif system == 'Windows':
+        preferred = 'SimHei'
+    else:  # Linux
+        preferred = 'WenQuanYi Micro Hei'
+
+    # 如果首选字体不可用，尝试备选字体
+    fonts = [preferred, 'SimHei', 'Arial Unicode MS', 'WenQuanYi Micro Hei', 'DejaVu Sans']
+    available_fonts = {f.name for f in fm.fontManager.ttflist}
+    for font in fonts:
+        if font in available_fonts:
+            return font
     # 如果都不可用，使用系统默认
-    FONT_FAMILY = 'sans-serif' 
+    return 'sans-serif'
+
+
+def _load_font_family():
+    system = platform.system()
+    header = f"{system}\t{matplotlib.__version__}\t"
+    try:
+        with open(_FONT_CACHE_FILE, 'r', encoding='utf-8') as f:
+            line = f.readline().rstrip('\n')
+        if line.startswith(header) and len(line) > len(header):
+            return line[len(header):]
+    except OSError:
+        pass
+
+    font = _detect_font_family(system)
+    try:
+        os.makedirs(os.path.dirname(_FONT_CACHE_FILE), exist_ok=True)
+        with open(_FONT_CACHE_FILE, 'w', encoding='utf-8') as f:
+            f.write(header + font + '\n')
+    except OSError:
+        pass
+    return font
+
+
+FONT_FAMILY = _load_font_family()
 
 # 颜色主题
 COLORS = {
@@ -77,17 +107,23 @@ MAX_WORKERS = 8
 # 获取K线数据时的年限
 KLINE_YEARS = 10
 
+# 三大报表磁盘缓存目录：报表只在新报告期披露后才变化，按 (代码, 最新报告期) 缓存；
+# 环境变量 STATEMENT_CACHE_DIR 设为空字符串时关闭
+STATEMENT_CACHE_DIR = os.path.expanduser(os.environ.get(
+    'STATEMENT_CACHE_DIR', os.path.join('~', '.cache', 'blackoil', 'statements')))
+
 # ==================== AI 分析配置 ====================
-import os
 
-# AI API 配置
+# AI API 配置（环境变量只读取一次）
+_env = os.environ
+_http_proxy = _env.get('HTTP_PROXY')
 AI_CONFIG = {
-    'API_KEY': os.getenv('ANTHROPIC_API_KEY', ''),
-    'BASE_URL': os.getenv('ANTHROPIC_BASE_URL', 'https://api.minimaxi.com/anthropic'),
-    'MODEL': os.getenv('ANTHROPIC_MODEL', 'MiniMax-M2.1'),
-    'TIMEOUT': int(os.getenv('API_TIMEOUT_MS', '60000')),
+    'API_KEY': _env.get('ANTHROPIC_API_KEY', ''),
+    'BASE_URL': _env.get('ANTHROPIC_BASE_URL', 'https://api.minimaxi.com/anthropic'),
+    'MODEL': _env.get('ANTHROPIC_MODEL', 'MiniMax-M2.1'),
+    'TIMEOUT': int(_env.get('API_TIMEOUT_MS', '60000')),
     'PROXY': {
-        'http': os.getenv('HTTP_PROXY'),
-        'https': os.getenv('HTTPS_PROXY')
-    } if os.getenv('HTTP_PROXY') else None
+        'http': _http_proxy,
+        'https': _env.get('HTTPS_PROXY')
+    } if _http_proxy else None
 }
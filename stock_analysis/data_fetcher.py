@@ -5,10 +5,13 @@
 import akshare as ak
 import pandas as pd
 from datetime import datetime
+import hashlib
+import os
+import pickle
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import lru_cache
-from config import MAX_WORKERS, KLINE_YEARS
+from config import MAX_WORKERS, KLINE_YEARS, STATEMENT_CACHE_DIR
 
 try:
     import baostock as bs
@@ -17,7 +20,7 @@ except Exception:
     bs = None
     _HAS_BAOSTOCK = False
 
-# 全局线程池
+# 全局 I/O 线程池：数据接口请求为网络 I/O，等待期间释放 GIL，线程即可并发
 _EXECUTOR = ThreadPoolExecutor(max_workers=MAX_WORKERS)
 
 def _normalize_code(code):
@@ -309,6 +312,21 @@ def fetch_cash_flow(stock_code):
         print(f"  ⚠ 获取现金流量表失败: {e}")
         return None
 
+_KLINE_PRICE_COLUMNS = ('开盘', '收盘', '最高', '最低')
+
+def _normalize_kline(df):
+    """K线数值列转为数值类型（baostock 返回字符串）
+
+    价格列统一为 float64，技术指标取 ndarray 时零拷贝，不必每次重新转换
+    """
+    for col in _KLINE_PRICE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+    for col in ('成交量', '成交额'):
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
 def fetch_kline_data(stock_code):
     """获取K线数据"""
     try:
@@ -317,7 +335,7 @@ def fetch_kline_data(stock_code):
         if df is not None and not df.empty:
             df['日期'] = pd.to_datetime(df['日期'])
             print(f"  ✓ K线数据: {len(df)} 个交易日")
-            return df
+            return _normalize_kline(df)
     except Exception as e:
         print(f"  ⚠ 获取K线数据失败: {e}")
     return None
@@ -523,6 +541,75 @@ def fetch_current_valuation(stock_code, stock_kline, total_shares=None):
           f"Price={current_valuation['price']:.2f}, PE={current_valuation.get('pe_ttm',0):.1f}, PB={current_valuation.get('pb',0):.2f}")
     return current_valuation
 
+# 三大报表（新浪接口，请求最慢且只随报告期变化）：按最新报告期缓存到磁盘
+_STATEMENT_FETCHERS = {
+    'balance_sheet': fetch_balance_sheet,
+    'income_statement': fetch_income_statement,
+    'cash_flow': fetch_cash_flow,
+}
+
+
+def _compact_frame(df):
+    """压缩报表 DataFrame 的内存占用，取值不变
+
+    - 取值全为数字的 object 列转为数值列（每格 8 字节，免去逐个 Python 对象）
+    - 取值重复的文本列（币种、数据源等）转为 category
+    """
+    if df is None or df.empty or not df.columns.is_unique:
+        return df
+    converted = {}
+    for col, dtype in df.dtypes.items():
+        if dtype != object and not isinstance(dtype, pd.StringDtype):
+            continue
+        values = df[col].dropna()
+        if values.empty:
+            continue
+        if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+            converted[col] = pd.to_numeric(df[col])
+        elif all(isinstance(v, str) for v in values) and values.nunique() * 2 <= len(values):
+            converted[col] = df[col].astype('category')
+    return df.assign(**converted) if converted else df
+
+
+def _statement_cache_path(stock_code, financial_abstract):
+    """三大报表缓存文件路径：文件名为 (代码, 财务摘要最新报告期) 的哈希
+
+    未启用缓存或无法确定最新报告期时返回 (None, None)
+    """
+    if not STATEMENT_CACHE_DIR or financial_abstract is None or financial_abstract.empty:
+        return None, None
+    latest = financial_abstract['截止日期'].max()
+    key = hashlib.md5(f"{stock_code}:{latest:%Y%m%d}".encode()).hexdigest()
+    return os.path.join(STATEMENT_CACHE_DIR, f"{key}.pkl"), latest
+
+
+def _load_statements(path):
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        # 文件损坏或 pandas 版本不兼容时当作未命中，重新请求后覆盖
+        print(f"  ⚠ 报表缓存读取失败: {e}")
+        return None
+
+
+def _save_statements(path, latest, statements):
+    """三张报表都已包含最新报告期时才写缓存（新浪报表可能晚于财务摘要更新）"""
+    for df in statements.values():
+        if df is None or df.empty or '报告日' not in df.columns or not df['报告日'].max() >= latest:
+            return
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(statements, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"  ⚠ 报表缓存写入失败: {e}")
+
+
 def fetch_all_data(stock_code):
     """
     并行获取所有需要的数据
@@ -567,7 +654,7 @@ def fetch_all_data(stock_code):
                             'volume': '成交量',
                             'amount': '成交额'
                         })
-                        bs_kline_fallback = df
+                        bs_kline_fallback = _normalize_kline(df)
                         print(f"  ✓ K线数据(baostock): {len(df)} 个交易日")
         except Exception:
             pass
@@ -575,27 +662,45 @@ def fetch_all_data(stock_code):
     company_info = fetch_company_info(stock_code)
     
     fetch_tasks = {
-        'financial_abstract': (fetch_financial_abstract, stock_code),
         'financial_indicators': (fetch_financial_indicators, stock_code),
-        'balance_sheet': (fetch_balance_sheet, stock_code),
-        'income_statement': (fetch_income_statement, stock_code),
-        'cash_flow': (fetch_cash_flow, stock_code),
         'kline': (fetch_kline_data, stock_code),
         'dividend': (fetch_dividend_data, stock_code),
         'northbound': (fetch_northbound_data, stock_code),
     }
     
     results = {}
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        future_to_name = {executor.submit(fn, *args): name for name, (fn, *args) in fetch_tasks.items()}
-        
-        for future in as_completed(future_to_name):
-            name = future_to_name[future]
-            try:
-                results[name] = future.result()
-            except Exception as e:
-                print(f"  ⚠ {name} 获取失败: {e}")
-                results[name] = None
+    # 网络 I/O 任务提交到全局线程池（进程内多次分析时复用线程，不再每次新建）
+    abstract_future = _EXECUTOR.submit(fetch_financial_abstract, stock_code)
+    future_to_name = {_EXECUTOR.submit(fn, *args): name for name, (fn, *args) in fetch_tasks.items()}
+    
+    # 财务摘要确定最新报告期后，三大报表先查磁盘缓存，未命中再请求
+    try:
+        results['financial_abstract'] = _compact_frame(abstract_future.result())
+    except Exception as e:
+        print(f"  ⚠ financial_abstract 获取失败: {e}")
+        results['financial_abstract'] = None
+    cache_path, latest_period = _statement_cache_path(stock_code, results['financial_abstract'])
+    statements = _load_statements(cache_path) if cache_path else None
+    if statements is not None:
+        results.update(statements)
+        print(f"  ✓ 三大报表: 使用本地缓存 (最新报告期 {latest_period:%Y-%m-%d})")
+    else:
+        future_to_name.update(
+            (_EXECUTOR.submit(fn, stock_code), name) for name, fn in _STATEMENT_FETCHERS.items())
+    
+    for future in as_completed(future_to_name):
+        name = future_to_name[future]
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            print(f"  ⚠ {name} 获取失败: {e}")
+            results[name] = None
+    
+    if statements is None:
+        for name in _STATEMENT_FETCHERS:
+            results[name] = _compact_frame(results[name])
+        if cache_path:
+            _save_statements(cache_path, latest_period, {name: results[name] for name in _STATEMENT_FETCHERS})
     
     if results.get('financial_abstract') is not None:
         results['shareholder'] = fetch_shareholder_data(stock_code, results['financial_abstract'])
@@ -24,8 +24,9 @@ def diagnose():
     ]
     
     config = {}
+    env_snapshot = dict(os.environ)
     for var in env_vars:
-        value = os.getenv(var)
+        value = env_snapshot.get(var)
         config[var] = value
         status = "✅ Set" if value else "⚠️ Not Set"
         masked_value = value[:8] + "..." if value and "KEY" in var else value
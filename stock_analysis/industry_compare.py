@@ -6,6 +6,7 @@
 2. 对比同行业公司的关键指标（市盈率、市净率、涨跌幅等）
 """
 
+import time
 import akshare as ak
 import pandas as pd
 from functools import lru_cache
@@ -112,6 +113,18 @@ def find_stock_industry(stock_code, stock_name=None):
         print(f"⚠ 查找行业失败: {e}")
         return None
 
+# 成分股行情的缓存时长（秒）：同一行业的对比与统计共用一次下载，
+# 常驻进程（进程内模式/Celery worker）中过期后重新获取，避免长期使用旧行情
+INDUSTRY_CONS_TTL = 300
+
+@lru_cache(maxsize=128)
+def _industry_cons_cached(industry_name, ttl_bucket):
+    return ak.stock_board_industry_cons_em(symbol=industry_name)
+
+def _industry_cons(industry_name):
+    """行业成分股行情（按行业名缓存 INDUSTRY_CONS_TTL 秒，返回的 DataFrame 只读）"""
+    return _industry_cons_cached(industry_name, int(time.time() // INDUSTRY_CONS_TTL))
+
 def get_industry_comparison(industry_name, stock_code=None):
     """
     获取行业成分股对比数据
@@ -124,7 +137,7 @@ def get_industry_comparison(industry_name, stock_code=None):
         DataFrame: 包含成分股的关键指标
     """
     try:
-        df = ak.stock_board_industry_cons_em(symbol=industry_name)
+        df = _industry_cons(industry_name)
         
         if df is None or df.empty:
             return None
@@ -173,7 +186,7 @@ def get_industry_stats(industry_name):
         dict: 包含行业PE中位数、PB中位数、平均涨跌幅等
     """
     try:
-        df = ak.stock_board_industry_cons_em(symbol=industry_name)
+        df = _industry_cons(industry_name)
         
         if df is None or df.empty:
             return None
@@ -2,54 +2,136 @@
 BlackOil 分析服务器 - Flask API
 优化版：增强健壮性和性能
 """
-from flask import Flask, jsonify, send_file, request, Response
+from flask import Flask, jsonify, send_file, request
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from werkzeug.security import safe_join
 import os
-import glob
 import sys
 import platform
 from operator import itemgetter
 import datetime
 import json
+import re
 import subprocess
 import threading
-import hashlib
 import time
-from functools import wraps
-from collections import OrderedDict
+from functools import wraps, lru_cache
+from concurrent.futures import ThreadPoolExecutor
 import shutil
+import bisect
+import mimetypes
+from urllib.parse import quote
+
+from config import MAX_WORKERS
+from analysis_runner import run_analysis
+from celery_tasks import celery_app, run_analysis_job
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+
+def _json_loads(raw):
+    """解析 JSON（bytes/str）；优先 orjson，遇到 NaN/Infinity 等非标准字面量时回退到标准库"""
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(raw)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """jsonify / request.get_json 改用 orjson：直接输出 UTF-8 bytes，NaN 输出为 null"""
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY if orjson is not None else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._OPTIONS).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return _json_loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self._OPTIONS)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
 
 app = Flask(__name__)
+
+# 图片交给前置 Web 服务器发送（可选）：
+# SENDFILE_BACKEND=x-sendfile  -> Apache mod_xsendfile / lighttpd
+# SENDFILE_BACKEND=x-accel     -> Nginx，需配置 location <X_ACCEL_PREFIX> { internal; alias <WORKING_DIR>/; }
+SENDFILE_BACKEND = os.environ.get('SENDFILE_BACKEND', '').lower()
+X_ACCEL_PREFIX = os.environ.get('X_ACCEL_PREFIX', '/_internal/') if SENDFILE_BACKEND == 'x-accel' else None
+app.config['USE_X_SENDFILE'] = SENDFILE_BACKEND == 'x-sendfile'
+if orjson is not None:
+    app.json = OrjsonProvider(app)
+else:
+    # 标准库回退：中文直接输出 UTF-8（不转义为 \uXXXX，体积减半），且不对键排序
+    app.json.ensure_ascii = False
+    app.json.sort_keys = False
 CORS(app, resources={r"/api/*": {"origins": "*"}})
 
 WORKING_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# 常用路径预先拼好，请求中直接做字符串拼接（report_id 已校验不含 '..' 且不以 '/' 开头）
+_WD_PREFIX = WORKING_DIR + os.sep
+_DATA_JSON = os.sep + 'analysis_data.json'
+_TEXT_REPORT = os.sep + '分析报告.txt'
+
 # ==================== 缓存系统 ====================
 class LRUCache:
-    """线程安全的 LRU 缓存"""
+    """线程安全的 LRU 缓存（基于 dict 的插入顺序，最久未用的在最前）"""
     def __init__(self, maxsize=100, ttl=300):
-        self.cache = OrderedDict()
+        self.cache = {}
         self.maxsize = maxsize
         self.ttl = ttl  # 秒
         self.lock = threading.Lock()
     
     def get(self, key):
-        with self.lock:
-            if key in self.cache:
-                value, timestamp = self.cache[key]
-                if time.time() - timestamp < self.ttl:
-                    self.cache.move_to_end(key)
-                    return value
-                else:
+        # 读路径不加锁：GIL 下 dict.get 是原子操作
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        value, timestamp = entry
+        if time.time() - timestamp >= self.ttl:
+            with self.lock:
+                if self.cache.get(key) is entry:
                     del self.cache[key]
             return None
+        # 仅在锁空闲时更新最近使用顺序，读请求永不阻塞
+        if self.lock.acquire(blocking=False):
+            try:
+                if self.cache.get(key) is entry:
+                    self.cache[key] = self.cache.pop(key)
+            finally:
+                self.lock.release()
+        return value
     
     def set(self, key, value):
         with self.lock:
-            if key in self.cache:
-                del self.cache[key]
-            elif len(self.cache) >= self.maxsize:
-                self.cache.popitem(last=False)
+            if self.cache.pop(key, None) is None and len(self.cache) >= self.maxsize:
+                self.cache.pop(next(iter(self.cache)))
             self.cache[key] = (value, time.time())
     
     def invalidate(self, pattern=None):
@@ -63,19 +145,48 @@ class LRUCache:
                 self.cache.clear()
 
 # 全局缓存实例
-report_cache = LRUCache(maxsize=50, ttl=60)  # 报告列表缓存 60 秒
-summary_cache = LRUCache(maxsize=100, ttl=300)  # 摘要数据缓存 5 分钟
-file_etag_cache = LRUCache(maxsize=500, ttl=3600)  # 文件 ETag 缓存 1 小时
+summary_cache = LRUCache(maxsize=100, ttl=300)  # 摘要响应体缓存 5 分钟
 ai_report_cache = LRUCache(maxsize=100, ttl=3600)  # AI 报告缓存 1 小时
+json_file_cache = LRUCache(maxsize=200, ttl=3600)  # JSON 文件解析结果缓存 1 小时，键含 mtime_ns
+
+# /api/images 只提供图片，避免通过该接口读取源码或数据文件
+_IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp')
+
+# 摘要接口只需要的顶层字段
+_SUMMARY_SECTIONS = ('meta', 'valuation', 'fundamentals')
+
+# 报告文件名格式：分析报告_<代码>_<YYYYMMDD>_<HHMM>（文件夹）、期货报告_<品种>_<YYYYMMDD>.png
+_RE_STOCK_REPORT = re.compile(r'^分析报告_(?P<code>[^_]+)_(?P<date>\d{8})_(?P<time>\d{4})$')
+_RE_FUTURES_REPORT = re.compile(r'^期货报告_(?P<code>[^_]+)_(?P<date>\d{8})\.png$')
+
+# 图片自然排序用：按数字段切分文件名
+_RE_DIGITS = re.compile(r'(\d+)')
+
+# 股票名称缓存：analysis_data.json 路径 -> (mtime_ns, 大小, 股票名称)，条目很小，删除报告时移除
+_stock_name_cache = {}
+
+# 报告列表索引（安装 watchdog 时由目录监听推送更新，见 ReportsWatcher；否则轮询判断）：
+# WORKING_DIR 的 mtime 变化（新增/删除报告）时重新扫描；
+# 报告文件夹内部的改动（如 analysis_data.json 晚于文件夹写入）不会改变该 mtime，
+# 因此另设短 TTL 兜底复核，复核时未变化的股票名称直接取自 _stock_name_cache
+REPORTS_INDEX_TTL = 5  # 秒
+_reports_index = {'mtime': 0, 'data': [], 'ts': 0.0}
+_reports_index_lock = threading.Lock()
 
 # ==================== 任务管理 ====================
 class TaskManager:
-    """线程安全的任务管理器"""
-    def __init__(self, max_tasks=100, cleanup_interval=3600):
+    """线程安全的任务管理器
+
+    任务在有界线程池中执行，避免同时启动过多分析子进程；
+    每个任务的 Future 单独保存，查询排队/完成状态时无需加锁
+    """
+    def __init__(self, max_tasks=100, cleanup_interval=3600, max_running=4):
         self.tasks = {}
+        self.futures = {}
         self.lock = threading.Lock()
         self.max_tasks = max_tasks
         self.cleanup_interval = cleanup_interval
+        self.executor = ThreadPoolExecutor(max_workers=max_running, thread_name_prefix='analysis')
         self._start_cleanup_thread()
     
     def _start_cleanup_thread(self):
@@ -99,24 +210,29 @@ class TaskManager:
                         to_delete.append(task_id)
             for task_id in to_delete:
                 del self.tasks[task_id]
+                self.futures.pop(task_id, None)
             if to_delete:
                 print(f"[CLEANUP] Removed {len(to_delete)} old tasks")
     
     def create(self, task_id, initial_status):
+        """登记新任务；任务数已满且全部未结束时返回 False，由调用方拒绝提交"""
         with self.lock:
-            # 如果任务数超限，清理最老的已完成任务
+            # 如果任务数超限，清理最早创建的已结束任务（dict 保持插入顺序，无需排序）
             if len(self.tasks) >= self.max_tasks:
-                completed = [(k, v.get('updated_at', 0)) for k, v in self.tasks.items() 
-                            if v.get('status') in ('completed', 'error')]
-                if completed:
-                    completed.sort(key=lambda x: x[1])
-                    del self.tasks[completed[0][0]]
+                oldest = next((k for k, v in self.tasks.items()
+                               if v.get('status') in ('completed', 'error')), None)
+                if oldest is None:
+                    return False
+                del self.tasks[oldest]
+                self.futures.pop(oldest, None)
             
+            now = time.time()
             self.tasks[task_id] = {
                 **initial_status,
-                'created_at': time.time(),
-                'updated_at': time.time()
+                'created_at': now,
+                'updated_at': now
             }
+            return True
     
     def update(self, task_id, status_dict):
         with self.lock:
@@ -128,12 +244,89 @@ class TaskManager:
         with self.lock:
             return self.tasks.get(task_id)
     
+    def snapshot(self, task_id, fields=('status', 'progress', 'message', 'code')):
+        """在一次加锁内读取任务的指定字段，返回一致的元组；任务不存在时返回 None"""
+        with self.lock:
+            task = self.tasks.get(task_id)
+            return tuple(task.get(f) for f in fields) if task else None
+    
     def exists(self, task_id):
         with self.lock:
             return task_id in self.tasks
+    
+    def submit(self, task_id, fn, *args):
+        """提交任务到线程池，并保存其 Future"""
+        future = self.executor.submit(fn, *args)
+        self.futures[task_id] = future
+        return future
+    
+    def is_queued(self, task_id):
+        """任务是否仍在排队等待空闲线程（只读 Future 状态，不加锁）"""
+        future = self.futures.get(task_id)
+        return future is not None and not future.running() and not future.done()
+
+class RedisTaskManager(TaskManager):
+    """任务状态保存在 Redis 的 TaskManager，多个 gunicorn worker 进程共享同一份状态
+
+    每个任务一个键 task:<id>，写入时刷新 TTL，过期即自动清理；
+    Future 仍保存在提交任务的进程内，只有该进程能区分排队中与运行中
+    """
+    KEY_PREFIX = 'task:'
+    TTL = 7200  # 秒
+
+    def __init__(self, client, max_tasks=100, max_running=4):
+        self.redis = client
+        self.futures = {}
+        self.lock = threading.Lock()
+        self.max_tasks = max_tasks
+        self.executor = ThreadPoolExecutor(max_workers=max_running, thread_name_prefix='analysis')
+
+    def _write(self, task_id, task):
+        self.redis.setex(self.KEY_PREFIX + task_id, self.TTL, _json_bytes(task))
+
+    def create(self, task_id, initial_status):
+        """登记新任务；本进程未结束的任务数已满时返回 False"""
+        with self.lock:
+            for k in [k for k, f in self.futures.items() if f.done()]:
+                del self.futures[k]
+            if len(self.futures) >= self.max_tasks:
+                return False
+        now = time.time()
+        self._write(task_id, {**initial_status, 'created_at': now, 'updated_at': now})
+        return True
+
+    def update(self, task_id, status_dict):
+        # 同一任务只由执行它的线程更新，读-改-写无需跨进程加锁
+        task = self.get(task_id)
+        if task is not None:
+            task.update(status_dict)
+            task['updated_at'] = time.time()
+            self._write(task_id, task)
+
+    def get(self, task_id):
+        raw = self.redis.get(self.KEY_PREFIX + task_id)
+        return _json_loads(raw) if raw else None
 
-# 全局任务管理器
-task_manager = TaskManager()
+    def snapshot(self, task_id, fields=('status', 'progress', 'message', 'code')):
+        task = self.get(task_id)
+        return tuple(task.get(f) for f in fields) if task else None
+
+    def exists(self, task_id):
+        return bool(self.redis.exists(self.KEY_PREFIX + task_id))
+
+    def submit(self, task_id, fn, *args):
+        future = self.executor.submit(fn, *args)
+        with self.lock:
+            self.futures[task_id] = future
+        return future
+
+
+# 全局任务管理器：设置 REDIS_URL 且已安装 redis 时状态保存在 Redis，否则保存在进程内
+REDIS_URL = os.environ.get('REDIS_URL')
+if redis is not None and REDIS_URL:
+    task_manager = RedisTaskManager(redis.Redis.from_url(REDIS_URL))
+else:
+    task_manager = TaskManager()
 
 # ==================== 工具函数 ====================
 def get_python_executable():
@@ -141,24 +334,22 @@ def get_python_executable():
     return sys.executable
 
 def compute_file_etag(filepath):
-    """计算文件 ETag（基于修改时间和大小）"""
-    cached = file_etag_cache.get(filepath)
-    if cached:
-        return cached
-    
+    """计算文件 ETag（基于纳秒级修改时间和大小，一次 stat 即可，无需缓存）"""
     try:
-        stat = os.stat(filepath)
-        etag = hashlib.md5(f"{stat.st_mtime}-{stat.st_size}".encode()).hexdigest()
-        file_etag_cache.set(filepath, etag)
-        return etag
-    except:
+        st = os.stat(filepath)
+    except OSError:
         return None
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
 
 def validate_stock_code(code):
     """验证股票/期货代码格式"""
     if not code:
         return False, "代码不能为空"
-    
+    return _validate_stock_code(code)
+
+@lru_cache(maxsize=1024)
+def _validate_stock_code(code):
+    """validate_stock_code 的纯函数部分，结果按输入缓存（重复提交同一代码时直接命中）"""
     code = code.strip().upper()
     
     # 股票代码：6位数字
@@ -178,14 +369,68 @@ def validate_stock_code(code):
     return False, f"无效的代码格式: {code}"
 
 def safe_json_load(filepath, default=None):
-    """安全加载 JSON 文件"""
+    """安全加载 JSON 文件（按 (路径, mtime_ns, 大小) 缓存解析结果，调用方不应修改返回值）"""
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        st = os.stat(filepath)
+        key = (filepath, st.st_mtime_ns, st.st_size)
+        cached = json_file_cache.get(key)
+        if cached is not None:
+            return cached
+        with open(filepath, 'rb') as f:
+            data = _json_loads(f.read())
+        json_file_cache.set(key, data)
+        return data
     except (json.JSONDecodeError, FileNotFoundError, IOError) as e:
         print(f"[WARN] Failed to load JSON {filepath}: {e}")
         return default
 
+def _load_json_sections(filepath, keys):
+    """只解析 JSON 文件中指定的顶层字段
+
+    完整解析结果已在缓存中时直接取用；否则用 ijson 流式读取，
+    收齐所需字段即停止，不构建其余（可能很大的）字段。
+    未安装 ijson 或流式解析失败（如文件含 NaN）时退回完整解析
+    """
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        return None
+    cached = json_file_cache.get((filepath, st.st_mtime_ns, st.st_size))
+    if cached is not None:
+        return cached
+    if ijson is None:
+        return safe_json_load(filepath)
+    
+    sections = {}
+    builders = {}
+    try:
+        with open(filepath, 'rb') as f:
+            for prefix, event, value in ijson.parse(f, use_float=True):
+                top = prefix.partition('.')[0]
+                if top not in keys:
+                    continue
+                builder = builders.get(top)
+                if builder is None:
+                    builder = builders[top] = ijson.ObjectBuilder()
+                builder.event(event, value)
+                if prefix == top and event in ('end_map', 'end_array', 'string', 'number', 'boolean', 'null'):
+                    sections[top] = builder.value
+                    if len(sections) == len(keys):
+                        break
+    except Exception:
+        return safe_json_load(filepath)
+    return sections
+
+def _json_bytes(obj):
+    """序列化为 UTF-8 JSON bytes（与 jsonify 使用同一 JSON provider）"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=app.json.default, option=OrjsonProvider._OPTIONS)
+    return app.json.dumps(obj).encode('utf-8')
+
+def _json_body_response(body):
+    """直接用已序列化的 JSON bytes 构造响应，跳过重复序列化"""
+    return app.response_class(body, mimetype='application/json')
+
 def log_request(func):
     """请求日志装饰器"""
     @wraps(func)
@@ -197,6 +442,202 @@ def log_request(func):
         return result
     return wrapper
 
+def _cached_stock_name(json_path):
+    """只查股票名称缓存：返回 (是否命中, 股票名称)，文件不存在视为命中且名称为 None"""
+    try:
+        st = os.stat(json_path)
+    except OSError:
+        return True, None
+    cached = _stock_name_cache.get(json_path)
+    if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return True, cached[2]
+    return False, None
+
+def _read_stock_name(json_path):
+    """从报告的 analysis_data.json 中读取股票名称（按 mtime_ns/大小缓存，文件未变时不再打开）"""
+    hit, name = _cached_stock_name(json_path)
+    if hit:
+        return name
+    try:
+        st = os.stat(json_path)
+    except OSError:
+        return None
+    # meta 位于文件开头，流式解析读到它即停止
+    data = _load_json_sections(json_path, ('meta',))
+    name = (data.get('meta') or {}).get('stock_name') if data else None
+    _stock_name_cache[json_path] = (st.st_mtime_ns, st.st_size, name)
+    return name
+
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+def _wall_timestamp(d, t='0000'):
+    """由 YYYYMMDD / HHMM 计算排序用时间戳（按挂钟时间计秒，不做时区换算），日期非法时抛出 ValueError
+
+    正则已保证为数字，直接整数运算，避免 strptime 解析格式串与 timestamp() 的本地时区查询；
+    股票与期货报告使用同一算法，二者的相对顺序不受时区影响
+    """
+    days = datetime.date(int(d[0:4]), int(d[4:6]), int(d[6:8])).toordinal() - _EPOCH_ORDINAL
+    return days * 86400 + int(t[0:2]) * 3600 + int(t[2:4]) * 60
+
+def _stock_report_entry(name, m):
+    """由股票报告文件夹名及其正则匹配结果构建报告条目（name 待补全），日期非法时返回 None"""
+    d, t = m['date'], m['time']
+    try:
+        timestamp = _wall_timestamp(d, t)
+    except ValueError:
+        return None
+    return {
+        "id": name,
+        "type": "stock",
+        "code": m['code'],
+        "name": None,
+        "date": f"{d[0:4]}-{d[4:6]}-{d[6:8]} {t[0:2]}:{t[2:4]}",
+        "timestamp": timestamp,
+        "path": name
+    }
+
+def _futures_report_entry(name, m):
+    """由期货报告文件名及其正则匹配结果构建报告条目，日期非法时返回 None"""
+    d = m['date']
+    try:
+        timestamp = _wall_timestamp(d)
+    except ValueError:
+        return None
+    return {
+        "id": name,
+        "type": "futures",
+        "code": m['code'],
+        "name": None,
+        "date": f"{d[0:4]}-{d[4:6]}-{d[6:8]}",
+        "timestamp": timestamp,
+        "path": name
+    }
+
+def _scan_reports():
+    """单次 scandir 扫描工作目录，构建按时间降序排列的报告列表"""
+    reports = []
+    pending_names = []  # 股票名称缓存未命中的 (report, json_path)，扫描结束后并行读取
+    with os.scandir(WORKING_DIR) as it:
+        for entry in it:
+            name = entry.name
+            # 先按前缀分派，工作目录中的其他文件不进入正则匹配；
+            # is_dir/is_file 不跟随符号链接时直接使用 scandir 返回的类型信息，无额外 stat
+            if name.startswith('分析报告_'):
+                # 1. 股票分析文件夹
+                m = _RE_STOCK_REPORT.match(name)
+                if not m or not entry.is_dir(follow_symlinks=False):
+                    continue
+                report = _stock_report_entry(name, m)
+                if report is None:
+                    continue
+                reports.append(report)
+                json_path = entry.path + _DATA_JSON
+                hit, report['name'] = _cached_stock_name(json_path)
+                if not hit:
+                    pending_names.append((report, json_path))
+            elif name.startswith('期货报告_'):
+                # 2. 期货报告
+                m = _RE_FUTURES_REPORT.match(name)
+                if not m or not entry.is_file(follow_symlinks=False):
+                    continue
+                report = _futures_report_entry(name, m)
+                if report is not None:
+                    reports.append(report)
+
+    # 并行读取缓存未命中报告的 analysis_data.json 以获取股票名称（I/O 期间释放 GIL）；
+    # 全部命中时不创建线程池
+    if pending_names:
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(pending_names))) as executor:
+            names = executor.map(_read_stock_name, [json_path for _, json_path in pending_names])
+            for (report, _), stock_name in zip(pending_names, names):
+                report['name'] = stock_name
+
+    # 按时间降序排序
+    reports.sort(key=itemgetter('timestamp'), reverse=True)
+    return reports
+
+def invalidate_reports_index():
+    """强制下一次 list_reports 重新扫描"""
+    with _reports_index_lock:
+        _reports_index['mtime'] = 0
+
+def add_report_to_index(dirname):
+    """把新生成的股票报告直接插入索引，避免整目录重扫；无法增量更新时退回到失效重建"""
+    m = _RE_STOCK_REPORT.match(dirname)
+    path = _WD_PREFIX + dirname
+    report = _stock_report_entry(dirname, m) if m and os.path.isdir(path) else None
+    if report is None:
+        invalidate_reports_index()
+        return
+    report['name'] = _read_stock_name(path + _DATA_JSON)
+    mtime = os.stat(WORKING_DIR).st_mtime_ns
+
+    with _reports_index_lock:
+        if _reports_index['mtime'] == 0:
+            # 索引尚未构建或已失效，交给下一次请求完整扫描
+            return
+        # 新建列表而非原地修改，其他线程可能正在序列化旧列表；
+        # 按时间戳插入到有序位置（并发任务可能乱序完成），无需整体重排
+        data = [r for r in _reports_index['data'] if r['id'] != dirname]
+        ts = report['timestamp']
+        pos = bisect.bisect_left([-r['timestamp'] for r in data], -ts)
+        data.insert(pos, report)
+        _reports_index['data'] = data
+        _reports_index['mtime'] = mtime
+        _reports_index['ts'] = time.monotonic()
+
+def refresh_reports_index():
+    """重新扫描并写入报告索引，返回新的报告列表"""
+    mtime = os.stat(WORKING_DIR).st_mtime_ns
+    reports = _scan_reports()
+    with _reports_index_lock:
+        _reports_index['mtime'] = mtime
+        _reports_index['data'] = reports
+        _reports_index['ts'] = time.monotonic()
+    return reports
+
+class ReportsWatcher(FileSystemEventHandler):
+    """watchdog 事件处理：顶层报告文件夹/期货报告增删改名，或 analysis_data.json 写入时重建索引
+
+    重建在 observer 线程内串行执行；报告文件夹内图片等其他文件的写入不触发重建
+    """
+    def on_any_event(self, event):
+        if event.event_type in ('opened', 'closed_no_write'):
+            return
+        for path in (event.src_path, getattr(event, 'dest_path', '')):
+            if path and self._affects_index(path):
+                try:
+                    refresh_reports_index()
+                except Exception as e:
+                    print(f"[WARN] Failed to refresh reports index: {e}")
+                    invalidate_reports_index()
+                return
+
+    @staticmethod
+    def _affects_index(path):
+        parent, name = os.path.split(path)
+        if parent == WORKING_DIR:
+            return name.startswith(('分析报告_', '期货报告_'))
+        return name == 'analysis_data.json' and os.path.dirname(parent) == WORKING_DIR
+
+def start_reports_watcher():
+    """启动报告目录监听（需安装 watchdog），成功时返回 Observer，否则返回 None"""
+    if Observer is None or os.environ.get('REPORTS_WATCH', '1') == '0':
+        return None
+    try:
+        observer = Observer()
+        observer.schedule(ReportsWatcher(), WORKING_DIR, recursive=True)
+        observer.daemon = True
+        observer.start()
+        refresh_reports_index()
+    except Exception as e:
+        print(f"[WARN] Reports watcher disabled: {e}")
+        return None
+    return observer
+
+# 报告目录监听：有监听时索引由文件系统事件推送更新，list_reports 命中时不再 stat 目录
+reports_watcher = start_reports_watcher()
+
 # ==================== 分析任务 ====================
 def run_analysis_task(code, task_id):
     """后台分析任务"""
@@ -207,37 +648,26 @@ def run_analysis_task(code, task_id):
             'message': '正在初始化分析环境...'
         })
         
-        script_path = os.path.join(WORKING_DIR, 'stock_analysis_v2.py')
-        python_exe = get_python_executable()
-        
         print(f"[TASK] {task_id}: Starting analysis for {code}")
-        print(f"[TASK] Python: {python_exe}")
-        
-        # 设置环境变量
-        env = os.environ.copy()
-        env['PYTHONIOENCODING'] = 'utf-8'
-        env['PYTHONUNBUFFERED'] = '1'
+        print(f"[TASK] Python: {get_python_executable()}")
         
         task_manager.update(task_id, {
             'progress': 20,
             'message': '正在获取数据...'
         })
         
-        # 运行分析脚本
-        result = subprocess.run(
-            [python_exe, script_path, code],
-            cwd=WORKING_DIR,
-            capture_output=True,
-            text=True,
-            timeout=3600,
-            env=env,
-            encoding='utf-8',
-            errors='replace'
-        )
+        # 运行分析脚本（子进程），按输出中的阶段标志更新进度
+        def on_progress(progress, message):
+            task_manager.update(task_id, {'progress': progress, 'message': message})
         
-        if result.returncode == 0:
-            # 清除报告缓存，让新报告能被发现
-            report_cache.invalidate()
+        returncode, report_dir, output_tail = run_analysis(code, on_progress)
+
+        if returncode == 0:
+            # 从脚本输出中找到新报告文件夹并增量加入报告索引
+            if report_dir:
+                add_report_to_index(report_dir)
+            else:
+                invalidate_reports_index()
             
             task_manager.update(task_id, {
                 'status': 'completed',
@@ -247,13 +677,13 @@ def run_analysis_task(code, task_id):
             })
             print(f"[TASK] {task_id}: Completed successfully")
         else:
-            error_msg = result.stderr or result.stdout or f'Exit code: {result.returncode}'
+            error_msg = output_tail or f'Exit code: {returncode}'
             task_manager.update(task_id, {
                 'status': 'error',
                 'progress': 0,
-                'message': f'分析失败: {error_msg[:1500]}'
+                'message': f'分析失败: {error_msg[-1500:]}'
             })
-            print(f"[TASK] {task_id}: Failed - {error_msg[:200]}")
+            print(f"[TASK] {task_id}: Failed - {error_msg[-200:]}")
             
     except subprocess.TimeoutExpired:
         task_manager.update(task_id, {
@@ -300,18 +730,26 @@ def start_analysis():
         # 生成任务 ID
         task_id = f"{code}_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}"
         
-        # 初始化任务
-        task_manager.create(task_id, {
+        if celery_app is not None:
+            # 投递到 Celery 队列，状态由结果后端保存
+            run_analysis_job.apply_async(args=(code,), task_id=task_id)
+            return jsonify({
+                'task_id': task_id,
+                'status': 'started',
+                'message': f'已提交 {code} 的分析任务'
+            })
+        
+        # 初始化任务（排队与运行中的任务总数有上限，避免无限堆积）
+        if not task_manager.create(task_id, {
             'status': 'starting',
             'progress': 0,
             'message': '任务已创建，正在启动...',
             'code': code
-        })
+        }):
+            return jsonify({'error': '当前分析任务过多，请稍后再试'}), 429
         
-        # 启动后台线程
-        thread = threading.Thread(target=run_analysis_task, args=(code, task_id))
-        thread.daemon = True
-        thread.start()
+        # 提交到后台线程池
+        task_manager.submit(task_id, run_analysis_task, code, task_id)
         
         return jsonify({
             'task_id': task_id,
@@ -322,106 +760,103 @@ def start_analysis():
     except Exception as e:
         return jsonify({'error': f'启动失败: {str(e)}'}), 500
 
+def _celery_task_status(task_id):
+    """把 Celery 任务状态映射为与 TaskManager 相同的响应结构"""
+    result = celery_app.AsyncResult(task_id)
+    state = result.state
+    code = task_id.rsplit('_', 1)[0]
+    if state == 'PENDING':
+        # Celery 无法区分排队中与未知任务 ID
+        return {'status': 'queued', 'progress': 0, 'message': '排队中，等待分析 worker...', 'code': code}
+    if state == 'STARTED':
+        return {'status': 'running', 'progress': 10, 'message': '正在初始化分析环境...', 'code': code}
+    if state == 'PROGRESS':
+        info = result.info or {}
+        return {'status': 'running', 'progress': info.get('progress', 0), 'message': info.get('message', ''), 'code': code}
+    if state == 'SUCCESS':
+        return {'status': 'completed', 'progress': 100, 'message': '分析完成！', 'code': code}
+    if state == 'FAILURE':
+        return {'status': 'error', 'progress': 0, 'message': f'分析失败: {str(result.info)[-1500:]}', 'code': code}
+    return {'status': state.lower(), 'progress': 0, 'message': '', 'code': code}
+
 @app.route('/api/analyze/<task_id>', methods=['GET'])
 def get_analysis_status(task_id):
     """获取分析任务状态"""
-    task = task_manager.get(task_id)
-    if not task:
+    if celery_app is not None:
+        return jsonify(_celery_task_status(task_id))
+    
+    snap = task_manager.snapshot(task_id)
+    if snap is None:
         return jsonify({'error': '任务不存在'}), 404
+    status, progress, message, code = snap
+    
+    if task_manager.is_queued(task_id):
+        return jsonify({
+            'status': 'queued',
+            'progress': 0,
+            'message': '排队中，等待其他分析任务完成...',
+            'code': code
+        })
     
     # 返回状态（不包含内部时间戳）
     return jsonify({
-        'status': task.get('status'),
-        'progress': task.get('progress', 0),
-        'message': task.get('message', ''),
-        'code': task.get('code')
+        'status': status,
+        'progress': progress or 0,
+        'message': message or '',
+        'code': code
     })
 
 @app.route('/api/reports', methods=['GET'])
 @log_request
 def list_reports():
-    """获取报告列表（带缓存）"""
-    # 检查缓存
-    cached = report_cache.get('all_reports')
-    if cached:
-        return jsonify(cached)
-    
-    reports = []
-    
+    """获取报告列表
+
+    有目录监听时索引由事件推送更新，未失效即直接返回；
+    否则按 WORKING_DIR 的 mtime 与短 TTL 判断是否需要重新扫描
+    """
     try:
-        # 1. 扫描股票分析文件夹
-        stock_dirs = glob.glob(os.path.join(WORKING_DIR, "分析报告_*"))
-        for d in stock_dirs:
-            if not os.path.isdir(d):
-                continue
-                
-            dirname = os.path.basename(d)
-            parts = dirname.split('_')
-            
-            if len(parts) >= 4:
-                code = parts[1]
-                date_str = parts[2]
-                time_str = parts[3]
-                
-                try:
-                    dt = datetime.datetime.strptime(f"{date_str}{time_str}", "%Y%m%d%H%M")
-                    
-                    # 尝试获取股票名称
-                    stock_name = None
-                    json_path = os.path.join(d, 'analysis_data.json')
-                    if os.path.exists(json_path):
-                        data = safe_json_load(json_path)
-                        if data:
-                            stock_name = data.get('meta', {}).get('stock_name')
-                    
-                    reports.append({
-                        "id": dirname,
-                        "type": "stock",
-                        "code": code,
-                        "name": stock_name,
-                        "date": dt.strftime("%Y-%m-%d %H:%M"),
-                        "timestamp": dt.timestamp(),
-                        "path": dirname
-                    })
-                except ValueError:
-                    continue
+        if reports_watcher is not None:
+            with _reports_index_lock:
+                if _reports_index['mtime']:
+                    return jsonify(_reports_index['data'])
+        else:
+            mtime = os.stat(WORKING_DIR).st_mtime_ns
+            with _reports_index_lock:
+                if (_reports_index['mtime'] == mtime
+                        and time.monotonic() - _reports_index['ts'] < REPORTS_INDEX_TTL):
+                    return jsonify(_reports_index['data'])
+
+        reports = refresh_reports_index()
 
-        # 2. 扫描期货报告
-        futures_files = glob.glob(os.path.join(WORKING_DIR, "期货报告_*.png"))
-        for f in futures_files:
-            filename = os.path.basename(f)
-            parts = filename.replace('.png', '').split('_')
-            
-            if len(parts) >= 3:
-                symbol = parts[1]
-                date_str = parts[2]
-                
-                try:
-                    dt = datetime.datetime.strptime(date_str, "%Y%m%d")
-                    reports.append({
-                        "id": filename,
-                        "type": "futures",
-                        "code": symbol,
-                        "name": None,
-                        "date": dt.strftime("%Y-%m-%d"),
-                        "timestamp": dt.timestamp(),
-                        "path": filename
-                    })
-                except ValueError:
-                    continue
-        
-        # 按时间降序排序
-        reports.sort(key=itemgetter('timestamp'), reverse=True)
-        
-        # 缓存结果
-        report_cache.set('all_reports', reports)
-        
     except Exception as e:
         print(f"[ERROR] list_reports: {e}")
         return jsonify({'error': '获取报告列表失败'}), 500
-    
+
     return jsonify(reports)
 
+def _natural_key(name):
+    """自然排序键：数字段按数值比较（如 2_x.png 排在 10_x.png 之前）"""
+    parts = _RE_DIGITS.split(name)
+    parts[1::2] = map(int, parts[1::2])
+    return parts
+
+def _iter_pngs(root, prefix):
+    """按自然顺序递归列出 root 下的 PNG（同层先图片后子目录），直接产出相对 WORKING_DIR 的路径"""
+    pngs = []
+    subdirs = []
+    with os.scandir(root) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry)
+            elif entry.name.lower().endswith('.png'):
+                pngs.append(entry.name)
+    pngs.sort(key=_natural_key)
+    for name in pngs:
+        yield f"{prefix}/{name}"
+    subdirs.sort(key=lambda e: _natural_key(e.name))
+    for entry in subdirs:
+        yield from _iter_pngs(entry.path, f"{prefix}/{entry.name}")
+
 @app.route('/api/reports/<report_id>', methods=['GET'])
 @log_request
 def get_report_details(report_id):
@@ -430,7 +865,7 @@ def get_report_details(report_id):
     if '..' in report_id or report_id.startswith('/'):
         return jsonify({"error": "Invalid report ID"}), 400
     
-    path = os.path.join(WORKING_DIR, report_id)
+    path = _WD_PREFIX + report_id
     
     if report_id.endswith(".png"):
         # 期货单文件报告
@@ -444,16 +879,10 @@ def get_report_details(report_id):
         })
     else:
         # 股票文件夹报告
-        if not os.path.exists(path) or not os.path.isdir(path):
-            return jsonify({"error": "报告不存在"}), 404
-        
-        images = []
         try:
-            for root, dirs, files in os.walk(path):
-                for file in sorted(files):
-                    if file.lower().endswith('.png'):
-                        rel_path = os.path.relpath(os.path.join(root, file), WORKING_DIR)
-                        images.append(f"/api/images/{rel_path}")
+            images = [f"/api/images/{rel_path}" for rel_path in _iter_pngs(path, report_id)]
+        except (FileNotFoundError, NotADirectoryError):
+            return jsonify({"error": "报告不存在"}), 404
         except Exception as e:
             print(f"[ERROR] get_report_details: {e}")
             return jsonify({"error": "读取报告失败"}), 500
@@ -468,117 +897,137 @@ def get_report_details(report_id):
 @log_request
 def delete_report(report_id):
     """删除报告"""
-    if '..' in report_id or report_id.startswith('/'):
+    # 只接受报告列表中可能出现的名称（与扫描时相同的前缀与正则），同时排除路径穿越
+    if report_id.startswith('期货报告_') and _RE_FUTURES_REPORT.match(report_id):
+        remove = os.remove
+    elif report_id.startswith('分析报告_') and _RE_STOCK_REPORT.match(report_id):
+        remove = shutil.rmtree
+    else:
         return jsonify({"error": "Invalid report ID"}), 400
 
-    path = os.path.join(WORKING_DIR, report_id)
-
-    if report_id.endswith('.png'):
-        if not os.path.exists(path):
-            return jsonify({"error": "报告不存在"}), 404
-        try:
-            os.remove(path)
-        except Exception as e:
-            print(f"[ERROR] delete_report: {e}")
-            return jsonify({"error": "删除失败"}), 500
-    else:
-        if not os.path.exists(path) or not os.path.isdir(path):
-            return jsonify({"error": "报告不存在"}), 404
-        try:
-            shutil.rmtree(path)
-        except Exception as e:
-            print(f"[ERROR] delete_report: {e}")
-            return jsonify({"error": "删除失败"}), 500
+    # 直接删除，不存在时由异常判断，省去 exists/isdir 的额外 stat
+    try:
+        remove(_WD_PREFIX + report_id)
+    except FileNotFoundError:
+        return jsonify({"error": "报告不存在"}), 404
+    except Exception as e:
+        print(f"[ERROR] delete_report: {e}")
+        return jsonify({"error": "删除失败"}), 500
 
-    report_cache.invalidate()
+    invalidate_reports_index()
+    _stock_name_cache.pop(_WD_PREFIX + report_id + _DATA_JSON, None)
     summary_cache.invalidate(f"summary_{report_id}")
     ai_report_cache.invalidate(f"ai_{report_id}")
     return jsonify({"ok": True})
 
+@lru_cache(maxsize=1024)
+def _resolve_image_path(filename):
+    """校验图片请求路径并解析为绝对路径，非法（越出 WORKING_DIR 或非图片扩展名）时返回 None"""
+    if not filename.lower().endswith(_IMAGE_EXTENSIONS):
+        return None
+    return safe_join(WORKING_DIR, filename)
+
 @app.route('/api/images/<path:filename>', methods=['GET'])
 def serve_image(filename):
-    """提供图片文件（带缓存控制）"""
-    # 安全检查
-    if '..' in filename:
+    """提供图片文件（ETag/304/Range 由 Werkzeug 处理，或交给前置 Web 服务器发送）"""
+    file_path = _resolve_image_path(filename)
+    if file_path is None:
         return jsonify({"error": "Invalid path"}), 400
     
-    file_path = os.path.join(WORKING_DIR, filename)
+    if X_ACCEL_PREFIX:
+        # Nginx 内部重定向：由 Nginx 以 sendfile 直接发送文件，worker 立即返回
+        response = app.response_class(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = X_ACCEL_PREFIX + quote(filename)
+        response.headers['Cache-Control'] = 'public, max-age=3600'
+        return response
     
-    if not os.path.exists(file_path):
+    # send_file 负责 ETag、If-None-Match/If-Modified-Since 与 Range 请求，
+    # 并在 WSGI 服务器支持时通过 wsgi.file_wrapper 零拷贝发送；
+    # USE_X_SENDFILE 开启时只返回 X-Sendfile 头，由 Apache/lighttpd 发送文件
+    try:
+        return send_file(file_path, conditional=True, max_age=3600)
+    except FileNotFoundError:
         return jsonify({"error": "文件不存在"}), 404
+
+def _build_summary(data):
+    """从报告数据中提取摘要字段"""
+    meta = data.get('meta', {})
+    valuation = data.get('valuation', {})
+    fundamentals = data.get('fundamentals', {})
+    return {
+        'stock_name': meta.get('stock_name'),
+        'industry': meta.get('industry'),
+        'total_shares': meta.get('total_shares_yi', 0) * 1e8,
+        'analysis_date': meta.get('analysis_date'),
+        'market_cap': valuation.get('total_mv_yi', 0) * 1e8,
+        'pe_ttm': valuation.get('pe_ttm'),
+        'pb': valuation.get('pb'),
+        'dividend_yield': valuation.get('dividend_yield'),
+        'price': valuation.get('price'),
+        'roe': fundamentals.get('roe_pct'),
+        'gross_margin': fundamentals.get('gross_margin_pct'),
+        'net_margin': fundamentals.get('net_margin_pct'),
+        'debt_ratio': fundamentals.get('debt_ratio_pct'),
+        'revenue': fundamentals.get('revenue_yi'),
+        'net_profit': fundamentals.get('net_profit_yi'),
+    }
+
+@app.route('/api/reports/<report_id>/data', methods=['GET'])
+@log_request
+def get_report_data(report_id):
+    """获取报告完整数据（analysis_data.json）"""
+    if '..' in report_id or report_id.startswith('/'):
+        return jsonify({"error": "Invalid report ID"}), 400
     
-    # 计算 ETag
-    etag = compute_file_etag(file_path)
-    
-    # 检查客户端缓存
-    if_none_match = request.headers.get('If-None-Match')
-    if if_none_match and if_none_match == etag:
-        return Response(status=304)
-    
-    # 返回文件
-    response = send_file(file_path)
-    
-    # 设置缓存头
-    if etag:
-        response.headers['ETag'] = etag
-    response.headers['Cache-Control'] = 'public, max-age=3600'  # 1 小时缓存
-    
-    return response
+    data = safe_json_load(_WD_PREFIX + report_id + _DATA_JSON)
+    if data is None:
+        return jsonify({"error": "无报告数据"}), 404
+    return jsonify(data)
 
 @app.route('/api/reports/<report_id>/summary', methods=['GET'])
 @log_request
 def get_report_summary(report_id):
-    """获取报告摘要数据（带缓存）"""
+    """获取报告摘要数据（带缓存）
+
+    默认只解析摘要所需的顶层字段，响应中 full_data 为 None；
+    ?include=full 时附带完整数据，也可另行通过 /api/reports/<report_id>/data 获取
+    """
     # 安全检查
     if '..' in report_id or report_id.startswith('/'):
         return jsonify({"error": "Invalid report ID"}), 400
     
-    # 检查缓存
-    cache_key = f"summary_{report_id}"
-    cached = summary_cache.get(cache_key)
-    if cached:
-        return jsonify(cached)
-    
-    path = os.path.join(WORKING_DIR, report_id)
-    json_path = os.path.join(path, 'analysis_data.json')
+    path = _WD_PREFIX + report_id
+    json_path = path + _DATA_JSON
+    include_full = request.args.get('include') == 'full'
     
-    if os.path.exists(json_path):
-        data = safe_json_load(json_path)
+    # 检查缓存：缓存的是序列化好的响应体，键含文件 ETag，文件重写后自动失效
+    etag = compute_file_etag(json_path)
+    if etag:
+        cache_key = f"summary_{report_id}_{etag}" + ('' if include_full else '_lite')
+        cached = summary_cache.get(cache_key)
+        if cached:
+            return _json_body_response(cached)
+        
+        if include_full:
+            data = safe_json_load(json_path)
+        else:
+            data = _load_json_sections(json_path, _SUMMARY_SECTIONS)
         if data:
             try:
-                meta = data.get('meta', {})
-                valuation = data.get('valuation', {})
-                fundamentals = data.get('fundamentals', {})
-                
-                summary = {
-                    'stock_name': meta.get('stock_name'),
-                    'industry': meta.get('industry'),
-                    'total_shares': meta.get('total_shares_yi', 0) * 1e8,
-                    'analysis_date': meta.get('analysis_date'),
-                    'market_cap': valuation.get('total_mv_yi', 0) * 1e8,
-                    'pe_ttm': valuation.get('pe_ttm'),
-                    'pb': valuation.get('pb'),
-                    'dividend_yield': valuation.get('dividend_yield'),
-                    'price': valuation.get('price'),
-                    'roe': fundamentals.get('roe_pct'),
-                    'gross_margin': fundamentals.get('gross_margin_pct'),
-                    'net_margin': fundamentals.get('net_margin_pct'),
-                    'debt_ratio': fundamentals.get('debt_ratio_pct'),
-                    'revenue': fundamentals.get('revenue_yi'),
-                    'net_profit': fundamentals.get('net_profit_yi'),
-                    'full_data': data
-                }
+                summary = _build_summary(data)
+                summary['full_data'] = data if include_full else None
+                body = _json_bytes(summary)
                 
                 # 缓存结果
-                summary_cache.set(cache_key, summary)
+                summary_cache.set(cache_key, body)
                 
-                return jsonify(summary)
+                return _json_body_response(body)
             except Exception as e:
                 print(f"[ERROR] get_report_summary: {e}")
                 return jsonify({"error": f"解析数据失败: {str(e)}"}), 500
     
     # 尝试读取文本报告
-    txt_path = os.path.join(path, '分析报告.txt')
+    txt_path = path + _TEXT_REPORT
     if os.path.exists(txt_path):
         try:
             with open(txt_path, 'r', encoding='utf-8') as f:
@@ -612,8 +1061,8 @@ def ai_analyze():
         if '..' in report_id or report_id.startswith('/'):
             return jsonify({"error": "Invalid report ID"}), 400
 
-        path = os.path.join(WORKING_DIR, report_id)
-        json_path = os.path.join(path, 'analysis_data.json')
+        path = _WD_PREFIX + report_id
+        json_path = path + _DATA_JSON
         
         if not os.path.exists(json_path):
             return jsonify({"error": "Report data not found"}), 404
@@ -656,7 +1105,7 @@ def ai_analyze():
 
         ai_config = data.get('ai_config') if isinstance(data, dict) else None
         analyzer = AIAnalyzer(ai_config=ai_config)
-        result = analyzer.generate_report(stock_data, industry_avg)
+        result = analyzer.generate_report(stock_data, industry_avg, use_cache=not force)
         
         if "error" in result:
             return jsonify(result), 500
@@ -691,5 +1140,22 @@ if __name__ == '__main__':
     print(f"   URL: http://localhost:5001")
     print(f"   Python: {sys.version.split()[0]}")
     print(f"   Platform: {platform.system()}")
-    print("=" * 50)
-    app.run(host='0.0.0.0', port=5001, debug=True, threaded=True)
+    gunicorn = shutil.which('gunicorn')
+    if '--dev' in sys.argv or platform.system() == 'Windows' or not gunicorn:
+        # 开发模式 / Windows / 未安装 gunicorn：使用 Werkzeug 开发服务器
+        print("   Server: werkzeug (dev)")
+        print("=" * 50)
+        app.run(host='0.0.0.0', port=5001, debug=True, threaded=True)
+    else:
+        # 生产模式：gunicorn gthread。任务状态保存在进程内时只能用 1 个 worker 进程
+        # （否则轮询可能落到别的进程而查不到任务）；配置 Celery 或 Redis 后
+        # 任务状态在进程间共享，可按 CPU 数开多个 worker
+        shared_state = celery_app is not None or isinstance(task_manager, RedisTaskManager)
+        default_workers = min(4, os.cpu_count() or 1) if shared_state else 1
+        workers = os.environ.get('GUNICORN_WORKERS', str(default_workers))
+        threads = os.environ.get('GUNICORN_THREADS', '8')
+        print(f"   Server: gunicorn (gthread, {workers} worker x {threads} threads)")
+        print("=" * 50)
+        sys.stdout.flush()
+        os.execv(gunicorn, [gunicorn, '-k', 'gthread', '-w', workers, '--threads', threads,
+                            '-b', '0.0.0.0:5001', '--chdir', WORKING_DIR, 'server:app'])
@@ -10,6 +10,7 @@ A股公司分析与财报解读工具 v2.0
 
 import sys
 import os
+from types import MappingProxyType
 
 # 设置编码和路径 - Windows兼容处理
 try:
@@ -33,19 +34,9 @@ if SCRIPT_DIR not in sys.path:
 try:
     print("[DEBUG] Importing akshare...")
     import akshare as ak
-    print("[DEBUG] Importing backtrader...")
-    import backtrader as bt
     print("[DEBUG] Importing pandas, numpy...")
     import pandas as pd
     import numpy as np
-    print("[DEBUG] Importing matplotlib...")
-    import matplotlib
-    matplotlib.use('Agg')  # 无头模式，避免GUI问题
-    import matplotlib.pyplot as plt
-    import matplotlib.patches as mpatches
-    from matplotlib.patches import Wedge
-    print("[DEBUG] Importing seaborn...")
-    import seaborn as sns
     import json
     from datetime import datetime
     import time
@@ -74,15 +65,52 @@ except Exception as e:
     traceback.print_exc()
     sys.exit(1)
 
-# 全局线程池（复用，避免频繁创建销毁）
-_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_WORKERS)
-
 # ==================== 样式设置 ====================
-sns.set_theme(style="whitegrid")
-# 使用从配置中导入的字体
-plt.rcParams['font.sans-serif'] = [FONT_FAMILY, 'PingFang SC', 'SimHei']
-plt.rcParams['axes.unicode_minus'] = False
-plt.rcParams['figure.dpi'] = 150
+# matplotlib/seaborn/backtrader 导入耗时约 1 秒，改为首次绘图/回测时再导入；
+# 只取数据或只做文本分析时不付出这部分启动开销
+@lru_cache(maxsize=None)
+def _plotting():
+    """首次使用时导入并配置绘图库，返回 (pyplot, seaborn)"""
+    print("[DEBUG] Importing matplotlib, seaborn...")
+    import matplotlib
+    matplotlib.use('Agg')  # 无头模式，避免GUI问题
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    sns.set_theme(style="whitegrid")
+    # 使用从配置中导入的字体
+    plt.rcParams['font.sans-serif'] = [FONT_FAMILY, 'PingFang SC', 'SimHei']
+    plt.rcParams['axes.unicode_minus'] = False
+    plt.rcParams['figure.dpi'] = 150
+    # 长K线折线分块渲染，减少 Agg 单条路径的绘制开销
+    plt.rcParams['agg.path.chunksize'] = 10000
+    return plt, sns
+
+
+@lru_cache(maxsize=None)
+def _growth_figure():
+    """增量分析图的画布（2x2），进程内复用：进程内模式下连续分析多只股票时免去重复创建 Figure
+
+    不经 pyplot 创建，不会成为其他图表的"当前画布"，也不必 close
+    """
+    _plotting()  # 先应用字体与样式
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(14, 10))
+    return fig, fig.subplots(2, 2)
+
+
+class _LazyModule:
+    """模块占位对象：首次访问属性时才调用 loader 真正导入"""
+
+    def __init__(self, loader):
+        self._loader = loader
+
+    def __getattr__(self, name):
+        return getattr(self._loader(), name)
+
+
+plt = _LazyModule(lambda: _plotting()[0])
+sns = _LazyModule(lambda: _plotting()[1])
 
 # 导入本地模块
 try:
@@ -92,9 +120,6 @@ except ImportError as e:
     print(f"ERROR: 缺少本地模块: {e}", file=sys.stderr)
     sys.exit(1)
 
-import platform
-from matplotlib import font_manager
-
 # ==================== 期货配置 ====================
 FUTURES_MAPPING = {
     # 贵金属
@@ -142,54 +167,79 @@ INVENTORY_MAPPING = {
     '锡': '沪锡', '黄金': '沪金', '白银': '沪银', '螺纹钢': '螺纹钢', '豆粕': '豆粕',
 }
 
+# 映射表运行期不修改：包装为只读视图，并预建 代码 -> 中文名 的反查表
+FUTURES_MAPPING = MappingProxyType(FUTURES_MAPPING)
+INVENTORY_MAPPING = MappingProxyType(INVENTORY_MAPPING)
+FUTURES_BY_SYMBOL = MappingProxyType({v['symbol']: k for k, v in FUTURES_MAPPING.items()})
+
+
+
+# ==================== 数字格式化 ====================
+@lru_cache(maxsize=4096)
+def _format_number(num, unit='亿'):
+    """格式化已转换为 float 的数值；报告中同一数值常被多处引用，按 (数值, 单位) 缓存结果"""
+    if unit == '亿':
+        return f"{num/1e8:.2f}亿"
+    elif unit == '%':
+        return f"{num:.2f}%"
+    else:
+        return f"{num:.2f}"
+
 
 # ==================== 量化回测模块 ====================
-# 定义 Backtrader 数据源
-class AkShareData(bt.feeds.PandasData):
-    """
-    自定义数据源，适配 akshare 数据格式
-    """
-    params = (
-        ('datetime', None),
-        ('open', -1),
-        ('high', -1),
-        ('low', -1),
-        ('close', -1),
-        ('volume', -1),
-        ('openinterest', -1)
-    )
-
-# 定义量化交易策略：简单的SMA交叉策略
-class SmaCross(bt.Strategy):
-    params = (
-        ('short_period', 50),
-        ('long_period', 200),
-        ('printlog', False),
-    )
+@lru_cache(maxsize=None)
+def _backtest_classes():
+    """首次回测时导入 backtrader 并定义数据源与策略类，返回 (bt, AkShareData, SmaCross)"""
+    import backtrader as bt
+
+    # 定义 Backtrader 数据源
+    class AkShareData(bt.feeds.PandasData):
+        """
+        自定义数据源，适配 akshare 数据格式
+        """
+        params = (
+            ('datetime', None),
+            ('open', -1),
+            ('high', -1),
+            ('low', -1),
+            ('close', -1),
+            ('volume', -1),
+            ('openinterest', -1)
+        )
+
+    # 定义量化交易策略：简单的SMA交叉策略
+    class SmaCross(bt.Strategy):
+        params = (
+            ('short_period', 50),
+            ('long_period', 200),
+            ('printlog', False),
+        )
     
-    def __init__(self):
-        # 定义两个简单移动平均线
-        self.short_sma = bt.indicators.SimpleMovingAverage(self.data.close, period=self.params.short_period)
-        self.long_sma = bt.indicators.SimpleMovingAverage(self.data.close, period=self.params.long_period)
-        self.crossover = bt.indicators.CrossOver(self.short_sma, self.long_sma)
-
-    def log(self, txt, dt=None):
-        ''' Logging function for this strategy'''
-        if self.params.printlog:
-            dt = dt or self.datas[0].datetime.date(0)
-            print('%s, %s' % (dt.isoformat(), txt))
-
-    def next(self):
-        # 当短期SMA上穿长期SMA时买入
-        if self.crossover > 0:
-            if not self.position:
-                self.log("金叉出现，买入！")
-                self.buy(size=100) # 买入100股
-        # 当短期SMA下穿长期SMA时卖出
-        elif self.crossover < 0:
-            if self.position:
-                self.log("死叉出现，卖出！")
-                self.close() # 全部卖出
+        def __init__(self):
+            # 定义两个简单移动平均线
+            self.short_sma = bt.indicators.SimpleMovingAverage(self.data.close, period=self.params.short_period)
+            self.long_sma = bt.indicators.SimpleMovingAverage(self.data.close, period=self.params.long_period)
+            self.crossover = bt.indicators.CrossOver(self.short_sma, self.long_sma)
+
+        def log(self, txt, dt=None):
+            ''' Logging function for this strategy'''
+            if self.params.printlog:
+                dt = dt or self.datas[0].datetime.date(0)
+                print('%s, %s' % (dt.isoformat(), txt))
+
+        def next(self):
+            # 当短期SMA上穿长期SMA时买入
+            if self.crossover > 0:
+                if not self.position:
+                    self.log("金叉出现，买入！")
+                    self.buy(size=100) # 买入100股
+            # 当短期SMA下穿长期SMA时卖出
+            elif self.crossover < 0:
+                if self.position:
+                    self.log("死叉出现，卖出！")
+                    self.close() # 全部卖出
+
+    return bt, AkShareData, SmaCross
 
 class StockAnalyzer:
     def __init__(self, stock_code):
@@ -227,6 +277,8 @@ class StockAnalyzer:
         
         # 报告文本收集器
         self.report_lines = []
+        # 待写出到控制台的报告文本（见 _log / flush_log）
+        self._print_buf = []
         
         # 关键数据收集（用于结构化输出）
         self.report_data = {
@@ -240,8 +292,13 @@ class StockAnalyzer:
             'scores': {}
         }
         
-        # 缓存：避免重复计算
+        # 缓存：避免重复计算（fetch_data 重新赋值 financial_data 时清空）
         self._annual_df_cache = None
+        self._annual_values_cache = None
+        self._quarterly_df_cache = None
+        self._fin_cols_cache = None
+        # 年度趋势中算出的 CAGR（rev_3y/profit_3y/rev_5y/profit_5y），供预期判断复用
+        self._cagr = {}
         
     @property
     def annual_df(self):
@@ -250,10 +307,82 @@ class StockAnalyzer:
             self._annual_df_cache = self.financial_data[self.financial_data['截止日期'].dt.month == 12]
         return self._annual_df_cache
     
+    # 年度数据中预先转换为数值数组的关键列（键同 _FIN_COLUMN_RULES）
+    _ANNUAL_METRICS = ('rev', 'profit', 'deducted', 'cfo', 'gross', 'roe')
+    
+    @property
+    def annual_values(self):
+        """缓存的年度关键指标数组 {'rev': ndarray, ...}，与 annual_df 行对齐，缺失的列为 None
+        
+        按 _safe_float 规则（无法转换取 0）一次转为 float64 数组，各子分析直接按位置切片
+        """
+        if self._annual_values_cache is None and self.annual_df is not None:
+            annual_df = self.annual_df
+            fin_cols = self.fin_cols
+            self._annual_values_cache = {
+                key: self._safe_float_series(annual_df[fin_cols[key]]).to_numpy() if fin_cols[key] else None
+                for key in self._ANNUAL_METRICS
+            }
+        return self._annual_values_cache
+    
+    @property
+    def quarterly_df(self):
+        """缓存的单季度财务数据（只读），每份报告只从累计数据换算一次"""
+        if self._quarterly_df_cache is None and self.financial_data is not None:
+            self._quarterly_df_cache = self._calculate_single_quarter_data(self.financial_data)
+        return self._quarterly_df_cache
+    
+    # 财务摘要关键列的匹配规则：按列顺序取第一个满足条件的列
+    _FIN_COLUMN_RULES = {
+        'rev': lambda c: '营业总收入' in c or '营业收入' in c,
+        'profit': lambda c: c == '净利润',
+        'deducted': lambda c: '扣非' in c and '净利' in c,
+        'cfo': lambda c: '经营' in c and '现金' in c and '净' in c,
+        # 总结报告沿用的宽松匹配：不要求含"净"字
+        'cfo_loose': lambda c: '经营' in c and '现金' in c,
+        'gross': lambda c: '毛利率' in c,
+        'net_margin': lambda c: '净利率' in c,
+        'roe': lambda c: '净资产收益率' in c,
+        'debt': lambda c: '资产负债率' in c,
+    }
+    
+    @property
+    def fin_cols(self):
+        """缓存的财务摘要关键列名（一次扫描解析全部规则，缺失的列为 None）
+        
+        年度数据、单季度数据及其副本与 financial_data 列相同，共用同一份结果
+        """
+        if self._fin_cols_cache is None:
+            cols = dict.fromkeys(self._FIN_COLUMN_RULES)
+            if self.financial_data is None:
+                return cols
+            for c in self.financial_data.columns:
+                for key, rule in self._FIN_COLUMN_RULES.items():
+                    if cols[key] is None and rule(c):
+                        cols[key] = c
+            self._fin_cols_cache = cols
+        return self._fin_cols_cache
+    
     def _log(self, text):
-        """同时打印并收集报告文本"""
-        print(text)
+        """收集报告文本；控制台输出先缓冲，遇到阶段标题（含"【"）或 flush_log() 时一次写出
+
+        阶段标题立即写出，子进程模式下 analysis_runner 据此推进进度
+        """
         self.report_lines.append(text)
+        self._print_buf.append(text)
+        if '【' in text:
+            self.flush_log()
+
+    def _echo(self, text):
+        """只输出到控制台、不写入报告的提示（图表生成等），与报告文本共用缓冲以保持先后顺序"""
+        self._print_buf.append(text)
+
+    def flush_log(self):
+        """把缓冲的报告文本一次写到标准输出"""
+        if self._print_buf:
+            sys.stdout.write('\n'.join(self._print_buf) + '\n')
+            sys.stdout.flush()
+            self._print_buf.clear()
 
     def _safe_float(self, value, default=0.0):
         """安全转换为浮点数"""
@@ -264,20 +393,20 @@ class StockAnalyzer:
         except (ValueError, TypeError):
             return default
 
+    def _safe_float_series(self, series, default=0.0):
+        """_safe_float 的整列版本：无法转换的值（NaN、'--'、空串等）取默认值"""
+        return pd.to_numeric(series, errors='coerce').fillna(default).astype(float)
+
     def _format_number(self, num, unit='亿'):
         """格式化数字"""
         if pd.isna(num) or num == '':
             return "--"
         try:
             num = float(num)
-            if unit == '亿':
-                return f"{num/1e8:.2f}亿"
-            elif unit == '%':
-                return f"{num:.2f}%"
-            else:
-                return f"{num:.2f}"
         except:
             return str(num)
+        # 缓存只接受可哈希的基本类型：统一转为 float 后再查
+        return _format_number(num, unit)
 
     def _calculate_single_quarter_data(self, df):
         return analysis.calculate_single_quarter_data(df)
@@ -318,6 +447,10 @@ class StockAnalyzer:
         self.northbound_data = all_data.get('northbound')
         self.shareholder_data = all_data.get('shareholder')
         self.current_valuation = all_data.get('current_valuation') or {}
+        self._annual_df_cache = None
+        self._annual_values_cache = None
+        self._quarterly_df_cache = None
+        self._fin_cols_cache = None
 
 
 
@@ -336,8 +469,8 @@ class StockAnalyzer:
         df = self.financial_data
         annual_df = self.annual_df  # 使用缓存
         
-        # 计算单季度数据
-        quarterly_df = self._calculate_single_quarter_data(df)
+        # 单季度数据（缓存）
+        quarterly_df = self.quarterly_df
         
         # 初始化增量数据收集
         self.report_data['growth_momentum'] = {
@@ -347,6 +480,7 @@ class StockAnalyzer:
             'growth_quality': '',
             'expectation': ''
         }
+        self._cagr = {}
         
         self._log("\n" + "="*60)
         self._log("  📈 一、增量核心指标")
@@ -372,104 +506,53 @@ class StockAnalyzer:
         self._log("\n📊 1. 季度增量变化（关键！）")
         self._log("-" * 75)
         
-        rev_col = next((c for c in df.columns if '营业总收入' in c or '营业收入' in c), None)
-        profit_col = '净利润' if '净利润' in df.columns else None
-        deducted_col = next((c for c in df.columns if '扣非' in c and '净利' in c), None)
+        rev_col = self.fin_cols['rev']
+        profit_col = self.fin_cols['profit']
+        deducted_col = self.fin_cols['deducted']
         
         if not rev_col or not profit_col:
             self._log("  ⚠️ 数据不足")
             return
         
         # 获取最近12期数据（约3年季度），确保有足够数据计算同比环比
-        recent = df.tail(12).copy()
-        
-        quarterly_data = []
-        for idx, row in recent.iterrows():
-            date = row['截止日期']
-            quarter = f"{date.year}Q{(date.month-1)//3 + 1}"
-            rev = self._safe_float(row[rev_col])
-            profit = self._safe_float(row[profit_col])
-            deducted = self._safe_float(row[deducted_col]) if deducted_col else 0
-            quarterly_data.append({
-                'quarter': quarter,
-                'date': date,
-                'revenue': rev,
-                'profit': profit,
-                'deducted': deducted
-            })
+        recent = df.tail(12)
         
-        if len(quarterly_data) < 5:
+        if len(recent) < 5:
             self._log("  ⚠️ 季度数据不足5期")
             return
         
+        dates = recent['截止日期']
+        quarters = [f"{y}Q{q}" for y, q in zip(dates.dt.year, dates.dt.quarter)]
+        revenue = self._safe_float_series(recent[rev_col]).reset_index(drop=True)
+        profit = self._safe_float_series(recent[profit_col]).reset_index(drop=True)
+        
+        # 同比（向前 4 期）/ 环比（向前 1 期）整列计算；基数不可用时为 NaN：
+        # 营收要求基数 > 0，净利以基数绝对值为分母（亏损基数也可比较）
+        rev_yoy = revenue.pct_change(4).where(revenue.shift(4) > 0)
+        rev_qoq = revenue.pct_change().where(revenue.shift(1) > 0)
+        profit_yoy = profit.sub(profit.shift(4)).div(profit.shift(4).abs().where(lambda x: x > 0))
+        profit_qoq = profit.sub(profit.shift(1)).div(profit.shift(1).abs().where(lambda x: x > 0))
+        net_margin = profit.div(revenue.where(lambda x: x > 0)).mul(100).fillna(0)
+        
         # 表头
         self._log(f"  {'季度':<8} {'营收(亿)':<10} {'同比':<9} {'环比':<9} {'净利(亿)':<10} {'同比':<9} {'环比':<9} {'净利率':<8}")
         self._log("  " + "-" * 73)
         
-        yoy_revenues = []
-        yoy_profits = []
-        qoq_revenues = []
-        qoq_profits = []
+        def pct(value):
+            return f"{value:+.1%}" if value == value else "-"  # NaN 显示为 -
         
         # 只展示最近8个季度
-        display_data = quarterly_data[-8:]
-        
-        for i, q in enumerate(display_data):
-            # 找同期数据（去年同季度）
-            yoy_q = None
-            # 找上期数据（上个季度）
-            qoq_q = None
-            
-            # 在完整列表中查找
-            current_idx = quarterly_data.index(q)
-            
-            # 查找同比 (向前找4个季度)
-            if current_idx >= 4:
-                yoy_q = quarterly_data[current_idx - 4]
-            
-            # 查找环比 (向前找1个季度)
-            if current_idx >= 1:
-                qoq_q = quarterly_data[current_idx - 1]
-            
-            rev_yi = q['revenue'] / 1e8
-            profit_yi = q['profit'] / 1e8
-            net_margin = (q['profit'] / q['revenue'] * 100) if q['revenue'] > 0 else 0
-            
-            # 计算营收同比
-            if yoy_q and yoy_q['revenue'] > 0:
-                rev_yoy = (q['revenue'] - yoy_q['revenue']) / yoy_q['revenue']
-                yoy_revenues.append(rev_yoy)
-            else:
-                rev_yoy = None
-                
-            # 计算营收环比
-            if qoq_q and qoq_q['revenue'] > 0:
-                rev_qoq = (q['revenue'] - qoq_q['revenue']) / qoq_q['revenue']
-                qoq_revenues.append(rev_qoq)
-            else:
-                rev_qoq = None
-            
-            # 计算净利同比
-            if yoy_q and abs(yoy_q['profit']) > 0:
-                profit_yoy = (q['profit'] - yoy_q['profit']) / abs(yoy_q['profit'])
-                yoy_profits.append(profit_yoy)
-            else:
-                profit_yoy = None
-                
-            # 计算净利环比
-            if qoq_q and abs(qoq_q['profit']) > 0:
-                profit_qoq = (q['profit'] - qoq_q['profit']) / abs(qoq_q['profit'])
-                qoq_profits.append(profit_qoq)
-            else:
-                profit_qoq = None
-            
-            rev_yoy_str = f"{rev_yoy:+.1%}" if rev_yoy is not None else "-"
-            rev_qoq_str = f"{rev_qoq:+.1%}" if rev_qoq is not None else "-"
-            profit_yoy_str = f"{profit_yoy:+.1%}" if profit_yoy is not None else "-"
-            profit_qoq_str = f"{profit_qoq:+.1%}" if profit_qoq is not None else "-"
-            margin_str = f"{net_margin:.1f}%"
-            
-            self._log(f"  {q['quarter']:<8} {rev_yi:<10.2f} {rev_yoy_str:<9} {rev_qoq_str:<9} {profit_yi:<10.2f} {profit_yoy_str:<9} {profit_qoq_str:<9} {margin_str:<8}")
+        display = slice(-8, None)
+        for quarter, rev, r_yoy, r_qoq, prof, p_yoy, p_qoq, margin in zip(
+                quarters[display], revenue.to_numpy()[display], rev_yoy.to_numpy()[display],
+                rev_qoq.to_numpy()[display], profit.to_numpy()[display], profit_yoy.to_numpy()[display],
+                profit_qoq.to_numpy()[display], net_margin.to_numpy()[display]):
+            margin_str = f"{margin:.1f}%"
+            self._log(f"  {quarter:<8} {rev / 1e8:<10.2f} {pct(r_yoy):<9} {pct(r_qoq):<9} {prof / 1e8:<10.2f} {pct(p_yoy):<9} {pct(p_qoq):<9} {margin_str:<8}")
+        
+        # 展示区间内可计算的同比序列，供趋势判断
+        yoy_revenues = rev_yoy.iloc[display].dropna().tolist()
+        yoy_profits = profit_yoy.iloc[display].dropna().tolist()
         
         # 分析趋势
         self._log("\n  📋 增量趋势判断:")
@@ -521,11 +604,12 @@ class StockAnalyzer:
         # 保存数据（转换日期为字符串以便JSON序列化）
         quarterly_data_json = [
             {
-                'quarter': q['quarter'],
-                'date': q['date'].strftime('%Y-%m-%d'),
-                'revenue_yi': round(q['revenue'] / 1e8, 2),
-                'profit_yi': round(q['profit'] / 1e8, 2),
-            } for q in quarterly_data
+                'quarter': quarter,
+                'date': date,
+                'revenue_yi': round(rev / 1e8, 2),
+                'profit_yi': round(prof / 1e8, 2),
+            } for quarter, date, rev, prof in zip(
+                quarters, dates.dt.strftime('%Y-%m-%d'), revenue.tolist(), profit.tolist())
         ]
         self.report_data['growth_momentum']['quarterly_trend'] = quarterly_data_json
     
@@ -538,31 +622,31 @@ class StockAnalyzer:
             self._log("  ⚠️ 年度数据不足3年")
             return
         
-        rev_col = next((c for c in annual_df.columns if '营业总收入' in c or '营业收入' in c), None)
-        profit_col = '净利润' if '净利润' in annual_df.columns else None
+        rev_col = self.fin_cols['rev']
+        profit_col = self.fin_cols['profit']
         
         recent = annual_df.tail(5)
         
         self._log(f"  {'年份':<8} {'营收(亿)':<12} {'增速':<10} {'净利(亿)':<12} {'增速':<10}")
         self._log("  " + "-" * 52)
         
-        prev_rev, prev_profit = None, None
-        growth_rates = []
-        
-        for idx, row in recent.iterrows():
-            year = row['截止日期'].year
-            rev = self._safe_float(row[rev_col]) / 1e8
-            profit = self._safe_float(row[profit_col]) / 1e8
-            
-            if prev_rev and prev_rev > 0:
-                rev_growth = (rev * 1e8 - prev_rev * 1e8) / (prev_rev * 1e8)
-            else:
-                rev_growth = None
-            
-            if prev_profit and prev_profit > 0:
-                profit_growth = (profit * 1e8 - prev_profit * 1e8) / (prev_profit * 1e8)
-            else:
-                profit_growth = None
+        # 逐年增速与 CAGR 由 numba 内核在全部年度数据上一次算出；
+        # 增速在上一年值 <= 0 时为 NaN，表格首年不与窗口外的年份比较
+        years = recent['截止日期'].dt.year.tolist()
+        values = self.annual_values
+        rev_growth_all, profit_growth_all, cagr = analysis.calculate_annual_growth(values['rev'], values['profit'])
+        window = len(years)
+        # 内核输出为本次新建的数组，窗口直接取视图，首年置空不影响其他数据
+        rev_growths = rev_growth_all[-window:]
+        profit_growths = profit_growth_all[-window:]
+        rev_growths[0] = profit_growths[0] = np.nan
+        revs = values['rev'][-window:] / 1e8
+        profits = values['profit'][-window:] / 1e8
+        
+        for year, rev, profit, rev_growth, profit_growth in zip(
+                years, revs.tolist(), profits.tolist(), rev_growths.tolist(), profit_growths.tolist()):
+            rev_growth = None if rev_growth != rev_growth else rev_growth  # NaN -> None
+            profit_growth = None if profit_growth != profit_growth else profit_growth
             
             rev_g_str = f"{rev_growth:+.1%}" if rev_growth is not None else "-"
             profit_g_str = f"{profit_growth:+.1%}" if profit_growth is not None else "-"
@@ -577,70 +661,35 @@ class StockAnalyzer:
                 'rev_growth': round(rev_growth, 4) if rev_growth else None,
                 'profit_growth': round(profit_growth, 4) if profit_growth else None,
             })
-            
-            if rev_growth is not None and profit_growth is not None:
-                growth_rates.append({'year': year, 'rev_growth': rev_growth, 'profit_growth': profit_growth})
-            
-            prev_rev, prev_profit = rev, profit
         
-        # 计算CAGR (复合年均增长率)
+        # 营收、净利增速都可计算的年份参与持续性判断
+        valid_rev_growths = rev_growths[~np.isnan(rev_growths) & ~np.isnan(profit_growths)]
+        
+        # 长期增长能力 (CAGR, 复合年均增长率)
         if len(annual_df) >= 4:
-            try:
-                latest = annual_df.iloc[-1]
-                three_years_ago = annual_df.iloc[-4] # 3年前 (例如 2024, 2023, 2022, 2021)
-                
-                rev_latest = self._safe_float(latest[rev_col])
-                rev_start = self._safe_float(three_years_ago[rev_col])
-                
-                profit_latest = self._safe_float(latest[profit_col])
-                profit_start = self._safe_float(three_years_ago[profit_col])
-                
-                self._log("\n  📈 长期增长能力 (CAGR):")
-                
-                rev_cagr_3, profit_cagr_3 = None, None
-                rev_cagr_5, profit_cagr_5 = None, None
-                
-                if rev_start > 0 and rev_latest > 0:
-                    rev_cagr_3 = (rev_latest / rev_start) ** (1/3) - 1
-                    self._log(f"    • 3年营收CAGR: {rev_cagr_3:.1%}")
-                
-                if profit_start > 0 and profit_latest > 0:
-                    profit_cagr_3 = (profit_latest / profit_start) ** (1/3) - 1
-                    self._log(f"    • 3年净利CAGR: {profit_cagr_3:.1%}")
-                    
-                # 5年CAGR
-                if len(annual_df) >= 6:
-                    five_years_ago = annual_df.iloc[-6]
-                    rev_start_5 = self._safe_float(five_years_ago[rev_col])
-                    profit_start_5 = self._safe_float(five_years_ago[profit_col])
-                    
-                    if rev_start_5 > 0 and rev_latest > 0:
-                        rev_cagr_5 = (rev_latest / rev_start_5) ** (1/5) - 1
-                        self._log(f"    • 5年营收CAGR: {rev_cagr_5:.1%}")
-                    
-                    if profit_start_5 > 0 and profit_latest > 0:
-                        profit_cagr_5 = (profit_latest / profit_start_5) ** (1/5) - 1
-                        self._log(f"    • 5年净利CAGR: {profit_cagr_5:.1%}")
-                
-                # 记录CAGR到report_data
-                self.report_data['growth_momentum']['cagr'] = {
-                    'rev_3y': round(rev_cagr_3, 4) if rev_cagr_3 else None,
-                    'profit_3y': round(profit_cagr_3, 4) if profit_cagr_3 else None,
-                    'rev_5y': round(rev_cagr_5, 4) if rev_cagr_5 else None,
-                    'profit_5y': round(profit_cagr_5, 4) if profit_cagr_5 else None,
-                }
-            except Exception as e:
-                pass
+            self._log("\n  📈 长期增长能力 (CAGR):")
+            labels = {'rev': '营收', 'profit': '净利'}
+            for key, value in cagr.items():
+                metric, years = key.split('_')
+                self._log(f"    • {years[:-1]}年{labels[metric]}CAGR: {value:.1%}")
+            self._cagr = cagr
+            
+            # 记录CAGR到report_data
+            self.report_data['growth_momentum']['cagr'] = {
+                key: round(cagr[key], 4) if cagr.get(key) else None
+                for key in ('rev_3y', 'profit_3y', 'rev_5y', 'profit_5y')
+            }
 
         # 增长持续性分析
-        if len(growth_rates) >= 3:
+        n_growth = len(valid_rev_growths)
+        if n_growth >= 3:
             self._log("\n  📋 增长持续性:")
-            consecutive_growth = sum(1 for g in growth_rates if g['rev_growth'] > 0)
-            if consecutive_growth == len(growth_rates):
-                self._log(f"  ✅ 连续{len(growth_rates)}年营收正增长，增长持续性强！")
+            consecutive_growth = int((valid_rev_growths > 0).sum())
+            if consecutive_growth == n_growth:
+                self._log(f"  ✅ 连续{n_growth}年营收正增长，增长持续性强！")
                 self.report_data['growth_momentum']['summary'] = '持续增长型'
-            elif consecutive_growth >= len(growth_rates) - 1:
-                self._log(f"  🔶 近{len(growth_rates)}年中{consecutive_growth}年正增长")
+            elif consecutive_growth >= n_growth - 1:
+                self._log(f"  🔶 近{n_growth}年中{consecutive_growth}年正增长")
                 self.report_data['growth_momentum']['summary'] = '波动增长型'
             else:
                 self._log(f"  ⚠️ 增长不稳定，需关注业务周期性")
@@ -651,10 +700,10 @@ class StockAnalyzer:
         self._log("\n📊 3. 增长质量评估")
         self._log("-" * 40)
         
-        rev_col = next((c for c in df.columns if '营业总收入' in c or '营业收入' in c), None)
-        profit_col = '净利润' if '净利润' in df.columns else None
-        deducted_col = next((c for c in df.columns if '扣非' in c and '净利' in c), None)
-        cfo_col = next((c for c in df.columns if '经营' in c and '现金' in c and '净' in c), None)
+        rev_col = self.fin_cols['rev']
+        profit_col = self.fin_cols['profit']
+        deducted_col = self.fin_cols['deducted']
+        cfo_col = self.fin_cols['cfo']
         
         latest = df.iloc[-1]
         
@@ -698,10 +747,10 @@ class StockAnalyzer:
                     quality_notes.append("现金流弱")
         
         # 3. 毛利率趋势
-        gross_col = next((c for c in df.columns if '毛利率' in c), None)
+        gross_col = self.fin_cols['gross']
         if gross_col and len(df) >= 4:
-            recent_gross = df.tail(4)[gross_col].apply(self._safe_float)
-            gross_trend = recent_gross.iloc[-1] - recent_gross.iloc[0]
+            recent_gross = self._safe_float_series(df[gross_col].tail(4)).to_numpy()
+            gross_trend = recent_gross[-1] - recent_gross[0]
             
             if gross_trend > 2:
                 self._log(f"  ✅ 毛利率上升 {gross_trend:.1f}pp，定价权增强")
@@ -742,12 +791,13 @@ class StockAnalyzer:
         # ------------------------------------------------------
         self._log("\n  [1] 基本面预期 (长期核心)")
         
-        # (1) EPS增长率 (用净利润替代近似)
-        profit_col = '净利润' if '净利润' in df.columns else None
+        # (1) EPS增长率 (用净利润替代近似)：复用年度趋势中算好的 3 年净利 CAGR，
+        # 首尾净利均为正时才有值
+        profit_col = self.fin_cols['profit']
+        cagr = None
         if len(annual_df) >= 4 and profit_col:
-            profits = annual_df.tail(4)[profit_col].apply(self._safe_float)
-            if profits.iloc[0] > 0 and profits.iloc[-1] > 0:
-                cagr = (profits.iloc[-1] / profits.iloc[0]) ** (1/3) - 1
+            cagr = self._cagr.get('profit_3y')
+            if cagr is not None:
                 if cagr > 0.15:
                     signals_positive.append(f"近3年净利CAGR {cagr:.1%} (>15%)")
                     self._log(f"    • 成长性: 强劲 (CAGR={cagr:.1%})")
@@ -758,7 +808,7 @@ class StockAnalyzer:
                     self._log(f"    • 成长性: 停滞 (CAGR={cagr:.1%})")
         
         # (2) ROE (净资产收益率)
-        roe_col = next((c for c in df.columns if '净资产收益率' in c), None)
+        roe_col = self.fin_cols['roe']
         if roe_col:
             latest_roe = self._safe_float(df.iloc[-1][roe_col])
             if latest_roe > 15:
@@ -771,18 +821,18 @@ class StockAnalyzer:
                 self._log(f"    • 资本效率: 一般 (ROE={latest_roe:.1f}%)")
         
         # (3) 毛利率趋势
-        gross_col = next((c for c in df.columns if '毛利率' in c), None)
+        gross_col = self.fin_cols['gross']
         if gross_col and len(df) >= 5:
-            recent_gross = df.tail(5)[gross_col].apply(self._safe_float)
-            if recent_gross.is_monotonic_increasing:
+            recent_gross = self._safe_float_series(df[gross_col].tail(5)).to_numpy()
+            if (np.diff(recent_gross) >= 0).all():
                 signals_positive.append("毛利率连续上升 (定价权增强)")
                 self._log(f"    • 盈利质量: 毛利率提升")
-            elif recent_gross.iloc[-1] < recent_gross.iloc[0] - 5:
+            elif recent_gross[-1] < recent_gross[0] - 5:
                 signals_negative.append("毛利率明显下滑")
                 self._log(f"    • 盈利质量: 毛利率下滑")
         
         # (4) 现金流/净利润
-        cfo_col = next((c for c in df.columns if '经营' in c and '现金' in c and '净' in c), None)
+        cfo_col = self.fin_cols['cfo']
         if cfo_col and profit_col:
             cfo = self._safe_float(df.iloc[-1][cfo_col])
             profit = self._safe_float(df.iloc[-1][profit_col])
@@ -804,7 +854,7 @@ class StockAnalyzer:
         if pe_ttm > 0:
             # 计算增长率 G (优先使用3年CAGR)
             g_rate = 0
-            if 'cagr' in locals() and cagr > 0:
+            if cagr is not None and cagr > 0:
                 g_rate = cagr * 100
             
             if g_rate > 0:
@@ -835,8 +885,7 @@ class StockAnalyzer:
         
         # (1) PEG (短期增长率)
         if pe > 0 and len(annual_df) >= 2 and profit_col:
-            latest_profit = self._safe_float(annual_df.iloc[-1][profit_col])
-            prev_profit = self._safe_float(annual_df.iloc[-2][profit_col])
+            prev_profit, latest_profit = self.annual_values['profit'][-2:].tolist()
             if prev_profit > 0:
                 g = (latest_profit - prev_profit) / prev_profit * 100
                 if g > 0:
@@ -931,7 +980,7 @@ class StockAnalyzer:
                 self._log(f"    • 趋势: 震荡整理")
             
             # (2) RSI(14)
-            rsi = self._calculate_rsi(closes, 14).iloc[-1]
+            rsi = self._calculate_rsi(closes, 14).to_numpy()[-1]
             if rsi < 30:
                 signals_positive.append(f"RSI {rsi:.1f} (超卖)")
                 self._log(f"    • RSI: {rsi:.1f} (超卖区)")
@@ -942,11 +991,12 @@ class StockAnalyzer:
                 self._log(f"    • RSI: {rsi:.1f} (中性)")
             
             # (3) MACD (10,20,8)
-            dif, dea, macd = self._calculate_macd(closes, fast=10, slow=20, signal=8)
-            latest_dif = dif.iloc[-1]
-            latest_dea = dea.iloc[-1]
-            latest_macd = macd.iloc[-1]
-            prev_macd = macd.iloc[-2] if len(macd) > 1 else 0
+            # 指标只取末尾几个值：先转为 ndarray 再按位置取，省去 Series 索引器开销
+            dif, dea, macd = (s.to_numpy() for s in self._calculate_macd(closes, fast=10, slow=20, signal=8))
+            latest_dif = dif[-1]
+            latest_dea = dea[-1]
+            latest_macd = macd[-1]
+            prev_macd = macd[-2] if len(macd) > 1 else 0
             
             if latest_dif > latest_dea and prev_macd < 0 and latest_macd > 0:
                 signals_positive.append("MACD金叉")
@@ -964,10 +1014,10 @@ class StockAnalyzer:
             # (4) KDJ
             highs = self.stock_kline['最高']
             lows = self.stock_kline['最低']
-            k, d, j = self._calculate_kdj(highs, lows, closes)
-            latest_k = k.iloc[-1]
-            latest_d = d.iloc[-1]
-            latest_j = j.iloc[-1]
+            k, d, j = (s.to_numpy() for s in self._calculate_kdj(highs, lows, closes))
+            latest_k = k[-1]
+            latest_d = d[-1]
+            latest_j = j[-1]
             
             if latest_j < 20:
                 signals_positive.append(f"KDJ超卖 (J={latest_j:.1f})")
@@ -975,10 +1025,10 @@ class StockAnalyzer:
             elif latest_j > 80:
                 signals_negative.append(f"KDJ超买 (J={latest_j:.1f})")
                 self._log(f"    • KDJ: J={latest_j:.1f} (超买区)")
-            elif len(k) > 1 and latest_k > latest_d and k.iloc[-2] < d.iloc[-2]:
+            elif len(k) > 1 and latest_k > latest_d and k[-2] < d[-2]:
                 signals_positive.append("KDJ金叉")
                 self._log(f"    • KDJ: 金叉信号 (K={latest_k:.1f}, D={latest_d:.1f})")
-            elif len(k) > 1 and latest_k < latest_d and k.iloc[-2] > d.iloc[-2]:
+            elif len(k) > 1 and latest_k < latest_d and k[-2] > d[-2]:
                 signals_negative.append("KDJ死叉")
                 self._log(f"    • KDJ: 死叉信号 (K={latest_k:.1f}, D={latest_d:.1f})")
             else:
@@ -1029,35 +1079,44 @@ class StockAnalyzer:
 
     def _plot_growth_momentum(self, df, annual_df):
         """生成增量分析图表"""
-        fig, axes = plt.subplots(2, 2, figsize=(14, 10))
+        fig, axes = _growth_figure()
+        # 清掉上一次绘制的内容（含图3的双轴）；只用 fig 的方法作图，不依赖 pyplot 当前画布
+        for ax in fig.axes[4:]:
+            ax.remove()
+        for ax in axes.flat:
+            ax.clear()
         
-        rev_col = next((c for c in df.columns if '营业总收入' in c or '营业收入' in c), None)
-        profit_col = '净利润' if '净利润' in df.columns else None
+        rev_col = self.fin_cols['rev']
+        profit_col = self.fin_cols['profit']
         
         # 图1: 季度营收增速走势
         ax1 = axes[0, 0]
         recent = df.tail(12)
         
-        quarters = []
-        rev_yoys = []
-        
-        for idx, row in recent.iterrows():
-            date = row['截止日期']
-            quarter = f"{date.year}Q{(date.month-1)//3 + 1}"
-            
-            # 找同期
-            yoy_data = df[
-                (df['截止日期'].dt.month == date.month) & 
-                (df['截止日期'].dt.year == date.year - 1)
-            ]
-            
-            if not yoy_data.empty and rev_col:
-                prev_rev = self._safe_float(yoy_data.iloc[0][rev_col])
-                curr_rev = self._safe_float(row[rev_col])
-                if prev_rev > 0:
-                    yoy = (curr_rev - prev_rev) / prev_rev * 100
-                    quarters.append(quarter)
-                    rev_yoys.append(yoy)
+        # 以 年*12+月 编码报告期，每个报告期取第一条记录作为同期；
+        # 最近12期的去年同期位置用 searchsorted 一次查出，同比增速整列计算
+        dates = df['截止日期']
+        period = (dates.dt.year * 12 + dates.dt.month).to_numpy(dtype=float)
+        keys, first_pos = np.unique(period, return_index=True)
+        start = len(df) - len(recent)
+        prev_period = period[start:] - 12
+        idx = np.minimum(np.searchsorted(keys, prev_period), len(keys) - 1)
+        has_prev = keys[idx] == prev_period
+        cur_pos = np.arange(start, len(df))[has_prev]
+        prev_pos = first_pos[idx[has_prev]]
+        recent_dates = recent['截止日期'][has_prev]
+        period_labels = np.array([f"{d.year}Q{(d.month-1)//3 + 1}" for d in recent_dates], dtype=object)
+        
+        def yoy(col):
+            if not col:
+                return [], []
+            vals = self._safe_float_series(df[col]).to_numpy()
+            cur, prev = vals[cur_pos], vals[prev_pos]
+            valid = prev > 0
+            return period_labels[valid].tolist(), ((cur[valid] - prev[valid]) / prev[valid] * 100).tolist()
+        
+        quarters, rev_yoys = yoy(rev_col)
+        profit_quarters, profit_yoys = yoy(profit_col)
         
         if quarters:
             colors = [COLORS['success'] if y > 0 else COLORS['danger'] for y in rev_yoys]
@@ -1068,33 +1127,11 @@ class StockAnalyzer:
             ax1.tick_params(axis='x', rotation=45)
             
             # 添加数值标签
-            for bar, val in zip(bars, rev_yoys):
-                ax1.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 1, 
-                        f'{val:.1f}%', ha='center', va='bottom', fontsize=8)
+            ax1.bar_label(bars, labels=[f'{val:.1f}%' for val in rev_yoys], padding=2, fontsize=8)
         
         # 图2: 季度净利增速走势
         ax2 = axes[0, 1]
         
-        profit_yoys = []
-        profit_quarters = []
-        
-        for idx, row in recent.iterrows():
-            date = row['截止日期']
-            quarter = f"{date.year}Q{(date.month-1)//3 + 1}"
-            
-            yoy_data = df[
-                (df['截止日期'].dt.month == date.month) & 
-                (df['截止日期'].dt.year == date.year - 1)
-            ]
-            
-            if not yoy_data.empty and profit_col:
-                prev_profit = self._safe_float(yoy_data.iloc[0][profit_col])
-                curr_profit = self._safe_float(row[profit_col])
-                if prev_profit > 0:
-                    yoy = (curr_profit - prev_profit) / prev_profit * 100
-                    profit_quarters.append(quarter)
-                    profit_yoys.append(yoy)
-        
         if profit_quarters:
             colors = [COLORS['success'] if y > 0 else COLORS['danger'] for y in profit_yoys]
             bars = ax2.bar(profit_quarters, profit_yoys, color=colors, alpha=0.8)
@@ -1103,17 +1140,15 @@ class StockAnalyzer:
             ax2.set_ylabel('同比增速 %')
             ax2.tick_params(axis='x', rotation=45)
             
-            for bar, val in zip(bars, profit_yoys):
-                ax2.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 1, 
-                        f'{val:.1f}%', ha='center', va='bottom', fontsize=8)
+            ax2.bar_label(bars, labels=[f'{val:.1f}%' for val in profit_yoys], padding=2, fontsize=8)
         
         # 图3: 年度营收净利双轴图
         ax3 = axes[1, 0]
         
         if len(annual_df) >= 3:
             years = annual_df.tail(5)['截止日期'].dt.year.astype(str)
-            revenues = annual_df.tail(5)[rev_col].apply(self._safe_float) / 1e8 if rev_col else []
-            profits = annual_df.tail(5)[profit_col].apply(self._safe_float) / 1e8 if profit_col else []
+            revenues = self.annual_values['rev'][-5:] / 1e8 if rev_col else []
+            profits = self.annual_values['profit'][-5:] / 1e8 if profit_col else []
             
             x = np.arange(len(years))
             width = 0.35
@@ -1178,12 +1213,11 @@ class StockAnalyzer:
         
         ax4.set_title('增量预期信号', fontsize=12, fontweight='bold')
         
-        plt.suptitle(f'{self.stock_name} ({self.stock_code}) - 增量分析', 
+        fig.suptitle(f'{self.stock_name} ({self.stock_code}) - 增量分析', 
                     fontsize=14, fontweight='bold', y=1.02)
-        plt.tight_layout()
-        plt.savefig(f"{self.output_dir}/0_增量分析.png", dpi=300, bbox_inches='tight')
-        plt.close()
-        print(f"  ✓ 生成图表: 0_增量分析.png")
+        fig.tight_layout()
+        fig.savefig(f"{self.output_dir}/0_增量分析.png", dpi=300, bbox_inches='tight')
+        self._echo(f"  ✓ 生成图表: 0_增量分析.png")
 
     # ==================== 公司分析模块 ====================
     def analyze_company(self):
@@ -1239,17 +1273,14 @@ class StockAnalyzer:
         self._log("\n📊 1. 基本面概览")
         self._log("-" * 40)
         
-        rev_col = next((c for c in df.columns if '营业总收入' in c or '营业收入' in c), None)
-        profit_col = '净利润' if '净利润' in df.columns else None
-        deducted_col = next((c for c in df.columns if '扣非' in c and '净利' in c), None)
+        rev_col = self.fin_cols['rev']
+        profit_col = self.fin_cols['profit']
+        deducted_col = self.fin_cols['deducted']
         
         if len(annual_df) >= 3 and rev_col and profit_col:
-            recent_3y = annual_df.tail(3)
-            
-            rev_start = self._safe_float(recent_3y.iloc[0][rev_col])
-            rev_end = self._safe_float(recent_3y.iloc[-1][rev_col])
-            profit_start = self._safe_float(recent_3y.iloc[0][profit_col])
-            profit_end = self._safe_float(recent_3y.iloc[-1][profit_col])
+            values = self.annual_values
+            rev_start, rev_end = values['rev'][-3].item(), values['rev'][-1].item()
+            profit_start, profit_end = values['profit'][-3].item(), values['profit'][-1].item()
             
             self._log(f"  • 最新营收: {self._format_number(rev_end)}")
             self._log(f"  • 最新净利润: {self._format_number(profit_end)}")
@@ -1319,20 +1350,20 @@ class StockAnalyzer:
         self._log("-" * 40)
         
         # 毛利率
-        gross_col = next((c for c in df.columns if '毛利率' in c), None)
+        gross_col = self.fin_cols['gross']
         # 净利率  
-        net_margin_col = next((c for c in df.columns if '净利率' in c or '销售净利率' in c), None)
+        net_margin_col = self.fin_cols['net_margin']
         # ROE
-        roe_col = next((c for c in df.columns if '净资产收益率' in c), None)
+        roe_col = self.fin_cols['roe']
         
         moat_score = 0
         
         if gross_col:
             gross_margin = self._safe_float(latest[gross_col])
             # 计算毛利率稳定性（近5年标准差）
-            recent_5y = df[df['截止日期'].dt.month == 12].tail(5)
+            recent_5y = self.annual_df.tail(5)
             if len(recent_5y) > 1:
-                gross_std = recent_5y[gross_col].apply(self._safe_float).std()
+                gross_std = self._safe_float_series(recent_5y[gross_col]).std()
                 self._log(f"  • 毛利率: {gross_margin:.1f}% (波动: ±{gross_std:.1f}%)")
             else:
                 self._log(f"  • 毛利率: {gross_margin:.1f}%")
@@ -1470,7 +1501,7 @@ class StockAnalyzer:
         safety_score = 100
         
         # 资产负债率
-        debt_col = next((c for c in df.columns if '资产负债率' in c), None)
+        debt_col = self.fin_cols['debt']
         if debt_col:
             debt_ratio = self._safe_float(latest[debt_col])
             self._log(f"  • 资产负债率: {debt_ratio:.1f}%")
@@ -1510,7 +1541,7 @@ class StockAnalyzer:
             # 广义应收款 = 应收 + 票据 + 其他 (可能是坏账的极限)
             broad_receivables = receivables + notes_recv + other_recv
             
-            revenue_col = next((c for c in df.columns if '营业总收入' in c or '营业收入' in c), None)
+            revenue_col = self.fin_cols['rev']
             total_assets = self._safe_float(bs_latest.get('资产总计'))
             
             if revenue_col and broad_receivables > 0:
@@ -1641,9 +1672,9 @@ class StockAnalyzer:
         """计算综合评分"""
         # 稳定性评分 - 基于盈利波动
         if len(annual_df) >= 3:
-            profit_col = '净利润' if '净利润' in annual_df.columns else None
+            profit_col = self.fin_cols['profit']
             if profit_col:
-                profits = annual_df[profit_col].apply(self._safe_float).tail(5)
+                profits = self._safe_float_series(annual_df[profit_col]).tail(5)
                 if len(profits) > 1 and profits.mean() != 0:
                     cv = profits.std() / abs(profits.mean())  # 变异系数
                     if cv < 0.2:
@@ -1665,6 +1696,8 @@ class StockAnalyzer:
             return
             
         try:
+            bt, AkShareData, SmaCross = _backtest_classes()
+            
             # 1. 准备数据
             df = self.stock_kline.copy()
             # 映射列名
@@ -1741,9 +1774,6 @@ class StockAnalyzer:
                 
             # 保存回测图表 - 使用简单的收益曲线代替backtrader的复杂图表
             try:
-                import matplotlib
-                matplotlib.use('Agg')
-                import matplotlib.pyplot as plt
                 plt.ioff()
                 
                 # 生成简单的回测结果图表
@@ -1828,11 +1858,11 @@ class StockAnalyzer:
         self._log("\n📊 1. 核心业绩表现")
         self._log("-" * 40)
         
-        rev_col = next((c for c in df.columns if '营业总收入' in c or '营业收入' in c), None)
-        profit_col = '净利润' if '净利润' in df.columns else None
-        deducted_col = next((c for c in df.columns if '扣非' in c and '净利' in c), None)
-        gross_col = next((c for c in df.columns if '毛利率' in c), None)
-        net_margin_col = next((c for c in df.columns if '净利率' in c), None)
+        rev_col = self.fin_cols['rev']
+        profit_col = self.fin_cols['profit']
+        deducted_col = self.fin_cols['deducted']
+        gross_col = self.fin_cols['gross']
+        net_margin_col = self.fin_cols['net_margin']
         
         if rev_col:
             rev = self._safe_float(latest[rev_col])
@@ -1883,10 +1913,10 @@ class StockAnalyzer:
             self._log("  • 现金流数据缺失，尝试从财务摘要获取...")
             
             # 从财务摘要尝试获取
-            cfo_col = next((c for c in df.columns if '经营' in c and '现金' in c and '净' in c), None)
+            cfo_col = self.fin_cols['cfo']
             if cfo_col:
                 cfo = self._safe_float(latest[cfo_col])
-                profit_col = '净利润' if '净利润' in df.columns else None
+                profit_col = self.fin_cols['profit']
                 if profit_col:
                     net_profit = self._safe_float(latest[profit_col])
                     if net_profit != 0:
@@ -1927,7 +1957,7 @@ class StockAnalyzer:
             self._log(f"    → 「融资依赖型」靠借钱维持，风险较高")
         
         # 净现比
-        profit_col = '净利润' if '净利润' in df.columns else None
+        profit_col = self.fin_cols['profit']
         if profit_col:
             net_profit = self._safe_float(latest[profit_col])
             if net_profit > 0 and cfo != 0:
@@ -1983,8 +2013,8 @@ class StockAnalyzer:
         warnings = []
         
         # 1. 非经常性损益占比
-        profit_col = '净利润' if '净利润' in df.columns else None
-        deducted_col = next((c for c in df.columns if '扣非' in c and '净利' in c), None)
+        profit_col = self.fin_cols['profit']
+        deducted_col = self.fin_cols['deducted']
         
         if profit_col and deducted_col:
             net_profit = self._safe_float(latest[profit_col])
@@ -1999,13 +2029,13 @@ class StockAnalyzer:
         
         # 2. 连续亏损检查
         if profit_col:
-            recent_profits = df.tail(4)[profit_col].apply(self._safe_float)
+            recent_profits = self._safe_float_series(df.tail(4)[profit_col])
             neg_count = (recent_profits < 0).sum()
             if neg_count >= 2:
                 warnings.append(f"🔴 近4期中有{neg_count}期亏损")
         
         # 3. 毛利率大幅下滑
-        gross_col = next((c for c in df.columns if '毛利率' in c), None)
+        gross_col = self.fin_cols['gross']
         if gross_col and len(df) > 1:
             current_gross = self._safe_float(latest[gross_col])
             prev_gross = self._safe_float(df.iloc[-2][gross_col])
@@ -2070,49 +2100,6 @@ class StockAnalyzer:
 
         return df_sq.reset_index()
 
-    def _calculate_ttm_series(self, df, col_name):
-        """计算滚动(TTM)数据序列"""
-        if df is None or col_name not in df.columns:
-            return pd.Series()
-        
-        # 确保按日期排序
-        date_col = '报告日' if '报告日' in df.columns else '截止日期'
-        if date_col not in df.columns:
-            return pd.Series()
-            
-        temp_df = df[[date_col, col_name]].copy().sort_values(date_col)
-        temp_df[col_name] = temp_df[col_name].apply(self._safe_float)
-        ttm_series = {}
-        
-        for idx, row in temp_df.iterrows():
-            curr_date = row[date_col]
-            curr_val = row[col_name]
-            
-            # 如果是年报(12月)，TTM就是当年值
-            if curr_date.month == 12:
-                ttm_series[curr_date] = curr_val
-            else:
-                # 查找上一年年报
-                prev_year_end = pd.Timestamp(year=curr_date.year - 1, month=12, day=31)
-                # 查找上一年同期
-                prev_year_same = pd.Timestamp(year=curr_date.year - 1, month=curr_date.month, day=curr_date.day)
-                # 尝试模糊匹配日期（月末）
-                prev_annual = temp_df[temp_df[date_col].dt.year == curr_date.year - 1]
-                prev_annual = prev_annual[prev_annual[date_col].dt.month == 12]
-                
-                prev_same = temp_df[temp_df[date_col].dt.year == curr_date.year - 1]
-                prev_same = prev_same[prev_same[date_col].dt.month == curr_date.month]
-                
-                if not prev_annual.empty and not prev_same.empty:
-                    val_annual = prev_annual.iloc[0][col_name]
-                    val_same = prev_same.iloc[0][col_name]
-                    ttm_val = curr_val + val_annual - val_same
-                    ttm_series[curr_date] = ttm_val
-                else:
-                    ttm_series[curr_date] = np.nan # 无法计算
-                    
-        return pd.Series(ttm_series).sort_index()
-
     def _prepare_advanced_data(self):
         """准备高级分析所需的数据 (TTM, EVA, 估值)"""
         data = {}
@@ -2160,6 +2147,16 @@ class StockAnalyzer:
             # 找到共同的日期
             common_dates = inc_df['报告日'].unique()
             
+            # 利息和所得税的TTM序列与报告期无关，循环外各算一次
+            # 注意：利息费用在利润表中可能叫"利息费用"或"财务费用"下的利息支出
+            # 这里简化处理，尝试获取
+            int_col = next((c for c in inc_df.columns if '利息费用' in c), None)
+            tax_col = next((c for c in inc_df.columns if '所得税' in c), None)
+            total_profit_col = next((c for c in inc_df.columns if '利润总额' in c), None)
+            ttm_int_series = self._calculate_ttm_series(inc_df, int_col) if int_col else None
+            ttm_tax_series = self._calculate_ttm_series(inc_df, tax_col) if tax_col else None
+            ttm_total_profit_series = self._calculate_ttm_series(inc_df, total_profit_col) if total_profit_col else None
+            
             for date in common_dates:
                 try:
                     # 获取当期(TTM)的利润表数据
@@ -2167,15 +2164,9 @@ class StockAnalyzer:
                     ttm_rd = data['ttm_rd'].get(date, 0)
                     
                     # 获取当期(TTM)的利息和所得税
-                    # 注意：利息费用在利润表中可能叫"利息费用"或"财务费用"下的利息支出
-                    # 这里简化处理，尝试获取
-                    int_col = next((c for c in inc_df.columns if '利息费用' in c), None)
-                    tax_col = next((c for c in inc_df.columns if '所得税' in c), None)
-                    total_profit_col = next((c for c in inc_df.columns if '利润总额' in c), None)
-                    
-                    ttm_int = self._calculate_ttm_series(inc_df, int_col).get(date, 0) if int_col else 0
-                    ttm_tax = self._calculate_ttm_series(inc_df, tax_col).get(date, 0) if tax_col else 0
-                    ttm_total_profit = self._calculate_ttm_series(inc_df, total_profit_col).get(date, 0) if total_profit_col else 0
+                    ttm_int = ttm_int_series.get(date, 0) if int_col else 0
+                    ttm_tax = ttm_tax_series.get(date, 0) if tax_col else 0
+                    ttm_total_profit = ttm_total_profit_series.get(date, 0) if total_profit_col else 0
                     
                     # 计算税率
                     tax_rate = ttm_tax / ttm_total_profit if ttm_total_profit > 0 else 0.15
@@ -2328,9 +2319,9 @@ class StockAnalyzer:
             plt.tight_layout()
             plt.savefig(f"{self.output_dir}/00_营收利润滚动.png")
             plt.close()
-            print(f"  ✓ 生成图表: 00_营收利润滚动.png")
+            self._echo(f"  ✓ 生成图表: 00_营收利润滚动.png")
         except Exception as e:
-            print(f"  ⚠ 生成图表1失败: {e}")
+            self._echo(f"  ⚠ 生成图表1失败: {e}")
 
         # ------------------------------------------------------
         # 图2: 滚动营收/现金流 + 净现比 (含金量指标)
@@ -2380,9 +2371,9 @@ class StockAnalyzer:
             plt.tight_layout()
             plt.savefig(f"{self.output_dir}/01_营收现金流滚动.png")
             plt.close()
-            print(f"  ✓ 生成图表: 01_营收现金流滚动.png")
+            self._echo(f"  ✓ 生成图表: 01_营收现金流滚动.png")
         except Exception as e:
-            print(f"  ⚠ 生成图表2失败: {e}")
+            self._echo(f"  ⚠ 生成图表2失败: {e}")
 
         # ------------------------------------------------------
         # 图3: 滚动现金流净额 + 滚动各项现金流 (5年约20期)
@@ -2423,11 +2414,11 @@ class StockAnalyzer:
                 plt.tight_layout()
                 plt.savefig(f"{self.output_dir}/02_现金流结构滚动.png")
                 plt.close()
-                print(f"  ✓ 生成图表: 02_现金流结构滚动.png")
+                self._echo(f"  ✓ 生成图表: 02_现金流结构滚动.png")
             else:
-                print(f"  ⚠ 生成图表3失败: 数据不足")
+                self._echo(f"  ⚠ 生成图表3失败: 数据不足")
         except Exception as e:
-            print(f"  ⚠ 生成图表3失败: {e}")
+            self._echo(f"  ⚠ 生成图表3失败: {e}")
 
         # ------------------------------------------------------
         # 图4: 股价走势（折线图）+ 季度营收（柱状图）- 10年视角
@@ -2479,12 +2470,12 @@ class StockAnalyzer:
                 plt.tight_layout()
                 plt.savefig(f"{self.output_dir}/03_市值营收滚动.png")
                 plt.close()
-                print(f"  ✓ 生成图表: 03_市值营收滚动.png")
+                self._echo(f"  ✓ 生成图表: 03_市值营收滚动.png")
             else:
-                print(f"  ⚠ 生成图表3失败: 无滚动营收数据")
+                self._echo(f"  ⚠ 生成图表3失败: 无滚动营收数据")
 
         except Exception as e:
-            print(f"  ⚠ 生成图表4失败: {e}")
+            self._echo(f"  ⚠ 生成图表4失败: {e}")
 
         # ------------------------------------------------------
         # 图5: 历史PE/PB/PS + 市值 (高低估曲线) + 分位点
@@ -2565,11 +2556,11 @@ class StockAnalyzer:
                 plt.tight_layout()
                 plt.savefig(f"{self.output_dir}/04_估值分析.png")
                 plt.close()
-                print(f"  ✓ 生成图表: 04_估值分析.png")
+                self._echo(f"  ✓ 生成图表: 04_估值分析.png")
             else:
-                print(f"  ⚠ 生成图表5失败: 无valuation_daily数据")
+                self._echo(f"  ⚠ 生成图表5失败: 无valuation_daily数据")
         except Exception as e:
-            print(f"  ⚠ 生成图表5失败: {e}")
+            self._echo(f"  ⚠ 生成图表5失败: {e}")
 
         # ------------------------------------------------------
         # 图6: 滚动研发投入（折线图）/ 滚动总营收（柱状图）
@@ -2631,9 +2622,9 @@ class StockAnalyzer:
             plt.tight_layout()
             plt.savefig(f"{self.output_dir}/05_研发投入滚动.png")
             plt.close()
-            print(f"  ✓ 生成图表: 05_研发投入滚动.png")
+            self._echo(f"  ✓ 生成图表: 05_研发投入滚动.png")
         except Exception as e:
-            print(f"  ⚠ 生成图表6失败: {e}")
+            self._echo(f"  ⚠ 生成图表6失败: {e}")
 
         # ------------------------------------------------------
         # 图7: 利润率结构分析（毛利率 + 净利率 + 期间费用率）
@@ -2706,9 +2697,9 @@ class StockAnalyzer:
                     plt.tight_layout()
                     plt.savefig(f"{self.output_dir}/06_利润率结构.png")
                     plt.close()
-                    print(f"  ✓ 生成图表: 06_利润率结构.png")
+                    self._echo(f"  ✓ 生成图表: 06_利润率结构.png")
         except Exception as e:
-            print(f"  ⚠ 生成图表7失败: {e}")
+            self._echo(f"  ⚠ 生成图表7失败: {e}")
 
         # ------------------------------------------------------
         # 图8: 滚动EVA + 自由现金流 (FCF)
@@ -2780,9 +2771,9 @@ class StockAnalyzer:
             plt.tight_layout()
             plt.savefig(f"{self.output_dir}/07_EVA与FCF.png")
             plt.close()
-            print(f"  ✓ 生成图表: 07_EVA与FCF.png")
+            self._echo(f"  ✓ 生成图表: 07_EVA与FCF.png")
         except Exception as e:
-            print(f"  ⚠ 生成图表8失败: {e}")
+            self._echo(f"  ⚠ 生成图表8失败: {e}")
 
         # ------------------------------------------------------
         # 图9: 营运资本分析 (应收账款 vs 存货)
@@ -2801,8 +2792,8 @@ class StockAnalyzer:
                     inv_col = next((c for c in bs_df.columns if '存货' in c), None)
                     
                     # 转换为亿元
-                    rec_vals = annual_bs[rec_col].apply(self._safe_float).values / 1e8 if rec_col else np.zeros(len(dates))
-                    inv_vals = annual_bs[inv_col].apply(self._safe_float).values / 1e8 if inv_col else np.zeros(len(dates))
+                    rec_vals = self._safe_float_series(annual_bs[rec_col]).values / 1e8 if rec_col else np.zeros(len(dates))
+                    inv_vals = self._safe_float_series(annual_bs[inv_col]).values / 1e8 if inv_col else np.zeros(len(dates))
                     
                     x = np.arange(len(dates))
                     width = 0.35
@@ -2838,9 +2829,9 @@ class StockAnalyzer:
                     plt.tight_layout()
                     plt.savefig(f"{self.output_dir}/08_营运资本结构.png")
                     plt.close()
-                    print(f"  ✓ 生成图表: 08_营运资本结构.png")
+                    self._echo(f"  ✓ 生成图表: 08_营运资本结构.png")
         except Exception as e:
-            print(f"  ⚠ 生成图表9失败: {e}")
+            self._echo(f"  ⚠ 生成图表9失败: {e}")
 
         # ------------------------------------------------------
         # 图10: ROE杜邦分析拆解
@@ -2929,10 +2920,10 @@ class StockAnalyzer:
                 plt.tight_layout()
                 plt.savefig(f"{self.output_dir}/09_ROE杜邦分析.png")
                 plt.close()
-                print(f"  ✓ 生成图表: 09_ROE杜邦分析.png")
+                self._echo(f"  ✓ 生成图表: 09_ROE杜邦分析.png")
                 
         except Exception as e:
-            print(f"  ⚠ 生成图表09失败: {e}")
+            self._echo(f"  ⚠ 生成图表09失败: {e}")
 
         # ------------------------------------------------------
         # 图11: 技术指标综合图 (MACD + KDJ + RSI)
@@ -3132,9 +3123,9 @@ class StockAnalyzer:
                 plt.tight_layout()
                 plt.savefig(f"{self.output_dir}/10_技术指标.png")
                 plt.close()
-                print(f"  ✓ 生成图表: 10_技术指标.png")
+                self._echo(f"  ✓ 生成图表: 10_技术指标.png")
         except Exception as e:
-            print(f"  ⚠ 生成图表10失败: {e}")
+            self._echo(f"  ⚠ 生成图表10失败: {e}")
 
         # ------------------------------------------------------
         # 图12: DCF估值模型
@@ -3142,7 +3133,7 @@ class StockAnalyzer:
         try:
             self._plot_dcf_valuation(data)
         except Exception as e:
-            print(f"  ⚠ 生成图表12失败: {e}")
+            self._echo(f"  ⚠ 生成图表12失败: {e}")
 
         # ------------------------------------------------------
         # 图19: 股东结构与变化
@@ -3150,7 +3141,7 @@ class StockAnalyzer:
         try:
             self._plot_shareholder_analysis()
         except Exception as e:
-            print(f"  ⚠ 生成图表19失败: {e}")
+            self._echo(f"  ⚠ 生成图表19失败: {e}")
 
         # ------------------------------------------------------
         # 图20: 运营效率分析
@@ -3158,7 +3149,7 @@ class StockAnalyzer:
         try:
             self._plot_operating_efficiency()
         except Exception as e:
-            print(f"  ⚠ 生成图表20失败: {e}")
+            self._echo(f"  ⚠ 生成图表20失败: {e}")
 
         # ------------------------------------------------------
         # 图21: 历史估值通道
@@ -3166,7 +3157,7 @@ class StockAnalyzer:
         try:
             self._plot_valuation_bands(data)
         except Exception as e:
-            print(f"  ⚠ 生成图表21失败: {e}")
+            self._echo(f"  ⚠ 生成图表21失败: {e}")
 
         # ------------------------------------------------------
         # 图22: 行业对标分析
@@ -3174,7 +3165,7 @@ class StockAnalyzer:
         try:
             self._plot_competitor_analysis()
         except Exception as e:
-            print(f"  ⚠ 生成图表22失败: {e}")
+            self._echo(f"  ⚠ 生成图表22失败: {e}")
 
         # ------------------------------------------------------
         # 图16-18: 财务概览相关图表 (独立调用，不依赖行业对标数据)
@@ -3182,7 +3173,7 @@ class StockAnalyzer:
         try:
             self._plot_financial_overview_charts()
         except Exception as e:
-            print(f"  ⚠ 生成财务概览图表失败: {e}")
+            self._echo(f"  ⚠ 生成财务概览图表失败: {e}")
 
         # ------------------------------------------------------
         # 图13: DDM股利折现估值模型
@@ -3190,7 +3181,7 @@ class StockAnalyzer:
         try:
             self._plot_ddm_valuation()
         except Exception as e:
-            print(f"  ⚠ 生成图表13失败: {e}")
+            self._echo(f"  ⚠ 生成图表13失败: {e}")
 
         # ------------------------------------------------------
         # 图14: 股息率走势
@@ -3198,7 +3189,7 @@ class StockAnalyzer:
         try:
             self._plot_dividend_yield_trend()
         except Exception as e:
-            print(f"  ⚠ 生成图表14失败: {e}")
+            self._echo(f"  ⚠ 生成图表14失败: {e}")
 
         # ------------------------------------------------------
         # 图15: 财务费用走势
@@ -3206,12 +3197,12 @@ class StockAnalyzer:
         try:
             self._plot_financial_expense_trend()
         except Exception as e:
-            print(f"  ⚠ 生成图表15失败: {e}")
+            self._echo(f"  ⚠ 生成图表15失败: {e}")
 
     def _plot_shareholder_analysis(self):
         """生成股东分析图表"""
         if not self.shareholder_data or 'latest' not in self.shareholder_data:
-            print("  ⚠ 无法生成股东分析图: 无数据")
+            self._echo("  ⚠ 无法生成股东分析图: 无数据")
             return
 
         df = self.shareholder_data['latest'].copy()
@@ -3302,12 +3293,12 @@ class StockAnalyzer:
         plt.tight_layout(rect=[0, 0.05, 1, 0.96])
         plt.savefig(f'{self.output_dir}/19_股东结构与变化.png', dpi=300, bbox_inches='tight')
         plt.close()
-        print('  ✓ 生成图表: 19_股东结构与变化.png')
+        self._echo('  ✓ 生成图表: 19_股东结构与变化.png')
 
     def _plot_operating_efficiency(self):
         """生成运营效率分析图表 (存货周转率 & 应收账款周转率)"""
         if self.income_statement is None or self.balance_sheet is None:
-            print("  ⚠ 无法生成运营效率图: 缺少利润表或资产负债表数据")
+            self._echo("  ⚠ 无法生成运营效率图: 缺少利润表或资产负债表数据")
             return
 
         # 数据准备
@@ -3317,7 +3308,7 @@ class StockAnalyzer:
         # 找到公共年份
         common_years = sorted(list(set(inc['报告日'].dt.year) & set(bs['报告日'].dt.year)))
         if len(common_years) < 2:
-            print("  ⚠ 运营效率分析: 年报数据不足两年")
+            self._echo("  ⚠ 运营效率分析: 年报数据不足两年")
             return
         
         inc = inc[inc['报告日'].dt.year.isin(common_years)].set_index('报告日')
@@ -3330,7 +3321,7 @@ class StockAnalyzer:
         ar_col = next((c for c in bs.columns if '应收账款' in c), None)
 
         if not all([cogs_col, rev_col, inv_col, ar_col]):
-            print("  ⚠ 运营效率分析: 缺少必要的财务列(成本/收入/存货/应收)")
+            self._echo("  ⚠ 运营效率分析: 缺少必要的财务列(成本/收入/存货/应收)")
             return
 
         results = []
@@ -3357,7 +3348,7 @@ class StockAnalyzer:
             })
 
         if not results:
-            print("  ⚠ 无法计算运营效率指标")
+            self._echo("  ⚠ 无法计算运营效率指标")
             return
             
         df = pd.DataFrame(results).set_index('year')
@@ -3394,12 +3385,12 @@ class StockAnalyzer:
         plt.tight_layout(rect=[0, 0, 1, 0.96])
         plt.savefig(f'{self.output_dir}/20_运营效率分析.png', dpi=300, bbox_inches='tight')
         plt.close()
-        print('  ✓ 生成图表: 20_运营效率分析.png')
+        self._echo('  ✓ 生成图表: 20_运营效率分析.png')
 
     def _plot_valuation_bands(self, data):
         """生成历史估值通道图 (PE/PB Bands)"""
         if 'valuation_daily' not in data or data['valuation_daily'].empty:
-            print("  ⚠ 无法生成估值通道图: 缺少日度估值数据")
+            self._echo("  ⚠ 无法生成估值通道图: 缺少日度估值数据")
             return
         
         val_df = data['valuation_daily'].copy().tail(365 * 5) # 最近5年
@@ -3485,7 +3476,7 @@ class StockAnalyzer:
         plt.tight_layout(rect=[0, 0, 1, 0.96])
         plt.savefig(f"{self.output_dir}/21_历史估值通道.png", dpi=300, bbox_inches='tight')
         plt.close()
-        print('  ✓ 生成图表: 21_历史估值通道.png')
+        self._echo('  ✓ 生成图表: 21_历史估值通道.png')
 
     def _plot_competitor_analysis(self):
         """生成行业对标分析雷达图"""
@@ -3500,9 +3491,9 @@ class StockAnalyzer:
                     df_comp = df_comp[df_comp['代码'] != self.stock_code]
                     # 取前4个 (按成交额排序)
                     competitor_codes = df_comp.head(4)['代码'].astype(str).tolist()
-                    print(f"  自动匹配同行业对比公司: {competitor_codes}")
+                    self._echo(f"  自动匹配同行业对比公司: {competitor_codes}")
         except Exception as e:
-            print(f"  ⚠ 自动获取竞对失败: {e}")
+            self._echo(f"  ⚠ 自动获取竞对失败: {e}")
 
         # 如果获取失败或为空，保留默认作为兜底
         if not competitor_codes:
@@ -3570,10 +3561,10 @@ class StockAnalyzer:
                     'PE(TTM)': pe, 'PB': pb, '营收CAGR(3Y)': cagr, '净利率': net_margin, 'ROE': roe
                 }
             except Exception as e:
-                print(f"  ⚠ 获取对手 {code} 数据失败: {e}")
+                self._echo(f"  ⚠ 获取对手 {code} 数据失败: {e}")
                 return None
 
-        print("\n  正在获取竞争对手数据...")
+        self._echo("\n  正在获取竞争对手数据...")
         # 获取主公司数据
         main_stock_data = get_stock_metrics(self.stock_code)
         if main_stock_data:
@@ -3588,7 +3579,7 @@ class StockAnalyzer:
                     all_data.append(result)
 
         if len(all_data) < 2:
-            print("  ⚠ 无法生成行业对标图: 有效数据不足2家")
+            self._echo("  ⚠ 无法生成行业对标图: 有效数据不足2家")
             return
 
         # 数据归一化处理
@@ -3630,7 +3621,7 @@ class StockAnalyzer:
         plt.tight_layout()
         plt.savefig(f"{self.output_dir}/22_行业对标分析.png", dpi=300, bbox_inches='tight')
         plt.close()
-        print('  ✓ 生成图表: 22_行业对标分析.png')
+        self._echo('  ✓ 生成图表: 22_行业对标分析.png')
 
     def _plot_financial_overview_charts(self):
         """生成财务概览相关图表 (图16: 销售费用, 图17: 供应商/客户集中度, 图18: 财务状况一览)"""
@@ -3639,13 +3630,13 @@ class StockAnalyzer:
         try:
             self._plot_sales_expense_trend()
         except Exception as e:
-            print(f"  ⚠ 生成图表16失败: {e}")
+            self._echo(f"  ⚠ 生成图表16失败: {e}")
 
         # 图17: 供应商/客户集中度
         try:
             self._plot_supplier_customer_concentration()
         except Exception as e:
-            print(f"  ⚠ 生成图表17失败: {e}")
+            self._echo(f"  ⚠ 生成图表17失败: {e}")
 
         # 图18: 财务状况一览（资产/负债拆解）
         try:
@@ -3724,17 +3715,17 @@ class StockAnalyzer:
                 plt.tight_layout()
                 plt.savefig(f"{self.output_dir}/18_财务状况一览.png")
                 plt.close()
-                print(f"  ✓ 生成图表: 18_财务状况一览.png")
+                self._echo(f"  ✓ 生成图表: 18_财务状况一览.png")
             else:
-                print("  ⚠ 财务状况一览: 无资产负债表数据")
+                self._echo("  ⚠ 财务状况一览: 无资产负债表数据")
         except Exception as e:
-            print(f"  ⚠ 生成图表18失败: {e}")
+            self._echo(f"  ⚠ 生成图表18失败: {e}")
 
     def _plot_dcf_valuation(self, data):
         """DCF现金流折现估值模型"""
         # 获取必要数据
         if data['ttm_ocf'].empty or self.total_shares == 0:
-            print(f"  ⚠ DCF估值: 数据不足")
+            self._echo(f"  ⚠ DCF估值: 数据不足")
             return
         
         # 获取最新TTM经营现金流
@@ -3906,7 +3897,7 @@ class StockAnalyzer:
         plt.tight_layout()
         plt.savefig(f"{self.output_dir}/11_DCF估值.png")
         plt.close()
-        print(f"  ✓ 生成图表: 11_DCF估值.png")
+        self._echo(f"  ✓ 生成图表: 11_DCF估值.png")
         
         # 保存估值数据
         self.report_data['valuation']['dcf_per_share'] = round(per_share_value, 2)
@@ -3915,11 +3906,11 @@ class StockAnalyzer:
     def _plot_ddm_valuation(self):
         """DDM股利折现估值模型 (适用于稳定分红公司)"""
         if self.dividend_data is None or len(self.dividend_data) == 0:
-            print(f"  ⚠ DDM估值: 无分红数据")
+            self._echo(f"  ⚠ DDM估值: 无分红数据")
             return
         
         if self.total_shares == 0:
-            print(f"  ⚠ DDM估值: 无总股本数据")
+            self._echo(f"  ⚠ DDM估值: 无总股本数据")
             return
         
         # 获取历史分红数据
@@ -3947,18 +3938,18 @@ class StockAnalyzer:
             per10_col = next((c for c in div_df.columns if ('每10股' in str(c) and ('派' in str(c) or '分红' in str(c) or '股利' in str(c)))), None)
 
         if per10_col is not None:
-            div_df['每股分红'] = div_df[per10_col].apply(self._safe_float) / 10
+            div_df['每股分红'] = self._safe_float_series(div_df[per10_col]) / 10
             per_share_col = '每股分红'
         else:
             per_share_col = next((c for c in div_df.columns if ('每股' in str(c) and ('分红' in str(c) or '派息' in str(c) or '股利' in str(c)))), None)
             if per_share_col is None:
-                print(f"  ⚠ DDM估值: 无法识别现金分红列")
+                self._echo(f"  ⚠ DDM估值: 无法识别现金分红列")
                 return
 
-        div_df['dps'] = div_df[per_share_col].apply(self._safe_float)
+        div_df['dps'] = self._safe_float_series(div_df[per_share_col])
         div_df = div_df[div_df['dps'] > 0]
         if div_df.empty:
-            print(f"  ⚠ DDM估值: 无有效现金分红记录")
+            self._echo(f"  ⚠ DDM估值: 无有效现金分红记录")
             return
 
         # 3) 汇总为“年度每股分红”（同一年多次分红要合并，否则会把单次派息当全年）
@@ -3979,7 +3970,7 @@ class StockAnalyzer:
 
         annual_dps_used = annual_dps_used[annual_dps_used > 0]
         if len(annual_dps_used) < 2:
-            print(f"  ⚠ DDM估值: 年度分红数据不足")
+            self._echo(f"  ⚠ DDM估值: 年度分红数据不足")
             return
 
         # 4) D0 取最近一个完整年度的年度每股分红
@@ -4140,7 +4131,7 @@ class StockAnalyzer:
         plt.tight_layout()
         plt.savefig(f"{self.output_dir}/12_DDM估值.png")
         plt.close()
-        print(f"  ✓ 生成图表: 12_DDM估值.png")
+        self._echo(f"  ✓ 生成图表: 12_DDM估值.png")
         
         # 保存估值数据
         self.report_data['valuation']['ddm_gordon'] = round(ddm_value, 2)
@@ -4152,10 +4143,10 @@ class StockAnalyzer:
         """14_股息率走势图"""
         try:
             if self.dividend_data is None or len(self.dividend_data) == 0:
-                print(f"  ⚠ 股息率走势: 无分红数据")
+                self._echo(f"  ⚠ 股息率走势: 无分红数据")
                 return
             if self.stock_kline is None or len(self.stock_kline) == 0:
-                print(f"  ⚠ 股息率走势: 无K线数据")
+                self._echo(f"  ⚠ 股息率走势: 无K线数据")
                 return
             
             div_df = self.dividend_data.copy()
@@ -4167,7 +4158,7 @@ class StockAnalyzer:
                     date_col = c
                     break
             if date_col is None:
-                print(f"  ⚠ 股息率走势: 无法识别日期列")
+                self._echo(f"  ⚠ 股息率走势: 无法识别日期列")
                 return
             
             div_df[date_col] = pd.to_datetime(div_df[date_col], errors='coerce')
@@ -4179,13 +4170,13 @@ class StockAnalyzer:
                 per10_col = next((c for c in div_df.columns if '每10股' in str(c) and '派' in str(c)), None)
             
             if per10_col is not None:
-                div_df['dps'] = div_df[per10_col].apply(self._safe_float) / 10
+                div_df['dps'] = self._safe_float_series(div_df[per10_col]) / 10
             else:
                 per_share_col = next((c for c in div_df.columns if '每股' in str(c) and ('分红' in str(c) or '派息' in str(c))), None)
                 if per_share_col:
-                    div_df['dps'] = div_df[per_share_col].apply(self._safe_float)
+                    div_df['dps'] = self._safe_float_series(div_df[per_share_col])
                 else:
-                    print(f"  ⚠ 股息率走势: 无法识别分红列")
+                    self._echo(f"  ⚠ 股息率走势: 无法识别分红列")
                     return
             
             div_df = div_df[div_df['dps'] > 0]
@@ -4201,7 +4192,7 @@ class StockAnalyzer:
             # 合并计算股息率
             common_years = annual_dps.index.intersection(year_end_prices.index)
             if len(common_years) < 2:
-                print(f"  ⚠ 股息率走势: 数据年份不足")
+                self._echo(f"  ⚠ 股息率走势: 数据年份不足")
                 return
             
             dividend_yields = []
@@ -4215,7 +4206,7 @@ class StockAnalyzer:
                     years_list.append(year)
             
             if len(years_list) < 2:
-                print(f"  ⚠ 股息率走势: 计算结果不足")
+                self._echo(f"  ⚠ 股息率走势: 计算结果不足")
                 return
             
             fig, ax = plt.subplots(figsize=(12, 6))
@@ -4237,23 +4228,23 @@ class StockAnalyzer:
             plt.tight_layout()
             plt.savefig(f"{self.output_dir}/14_股息率走势.png")
             plt.close()
-            print(f"  ✓ 生成图表: 14_股息率走势.png")
+            self._echo(f"  ✓ 生成图表: 14_股息率走势.png")
         except Exception as e:
-            print(f"  ⚠ 股息率走势失败: {e}")
+            self._echo(f"  ⚠ 股息率走势失败: {e}")
 
     def _plot_financial_expense_trend(self):
         """15_财务费用走势图"""
         try:
             inc_df = self.income_statement
             if inc_df is None or len(inc_df) == 0:
-                print(f"  ⚠ 财务费用走势: 无利润表数据")
+                self._echo(f"  ⚠ 财务费用走势: 无利润表数据")
                 return
             
             fin_col = next((c for c in inc_df.columns if '财务费用' in c), None)
             rev_col = next((c for c in inc_df.columns if '营业总收入' in c or '营业收入' in c), None)
             
             if fin_col is None:
-                print(f"  ⚠ 财务费用走势: 无法识别财务费用列")
+                self._echo(f"  ⚠ 财务费用走势: 无法识别财务费用列")
                 return
             
             # 取年报数据
@@ -4262,11 +4253,11 @@ class StockAnalyzer:
             annual = inc_df[inc_df['报告日'].dt.month == 12].sort_values('报告日').tail(8)
             
             if len(annual) < 2:
-                print(f"  ⚠ 财务费用走势: 年报数据不足")
+                self._echo(f"  ⚠ 财务费用走势: 年报数据不足")
                 return
             
             years = annual['报告日'].dt.year.tolist()
-            fin_exp = annual[fin_col].apply(self._safe_float).values / 1e8
+            fin_exp = self._safe_float_series(annual[fin_col]).values / 1e8
             
             fig, ax1 = plt.subplots(figsize=(12, 6))
             
@@ -4278,7 +4269,7 @@ class StockAnalyzer:
             
             # 如果有营收，计算财务费用率
             if rev_col:
-                rev = annual[rev_col].apply(self._safe_float).values / 1e8
+                rev = self._safe_float_series(annual[rev_col]).values / 1e8
                 fin_rate = np.where(rev > 0, fin_exp / rev * 100, 0)
                 ax2 = ax1.twinx()
                 ax2.plot(years, fin_rate, color='blue', marker='s', linewidth=2, label='财务费用率')
@@ -4300,23 +4291,23 @@ class StockAnalyzer:
             plt.tight_layout()
             plt.savefig(f"{self.output_dir}/15_财务费用走势.png")
             plt.close()
-            print(f"  ✓ 生成图表: 15_财务费用走势.png")
+            self._echo(f"  ✓ 生成图表: 15_财务费用走势.png")
         except Exception as e:
-            print(f"  ⚠ 财务费用走势失败: {e}")
+            self._echo(f"  ⚠ 财务费用走势失败: {e}")
 
     def _plot_sales_expense_trend(self):
         """16_销售费用走势图"""
         try:
             inc_df = self.income_statement
             if inc_df is None or len(inc_df) == 0:
-                print(f"  ⚠ 销售费用走势: 无利润表数据")
+                self._echo(f"  ⚠ 销售费用走势: 无利润表数据")
                 return
             
             sale_col = next((c for c in inc_df.columns if '销售费用' in c), None)
             rev_col = next((c for c in inc_df.columns if '营业总收入' in c or '营业收入' in c), None)
             
             if sale_col is None:
-                print(f"  ⚠ 销售费用走势: 无法识别销售费用列")
+                self._echo(f"  ⚠ 销售费用走势: 无法识别销售费用列")
                 return
             
             # 取年报数据
@@ -4325,11 +4316,11 @@ class StockAnalyzer:
             annual = inc_df[inc_df['报告日'].dt.month == 12].sort_values('报告日').tail(8)
             
             if len(annual) < 2:
-                print(f"  ⚠ 销售费用走势: 年报数据不足")
+                self._echo(f"  ⚠ 销售费用走势: 年报数据不足")
                 return
             
             years = annual['报告日'].dt.year.tolist()
-            sale_exp = annual[sale_col].apply(self._safe_float).values / 1e8
+            sale_exp = self._safe_float_series(annual[sale_col]).values / 1e8
             
             fig, ax1 = plt.subplots(figsize=(12, 6))
             
@@ -4345,7 +4336,7 @@ class StockAnalyzer:
             
             # 如果有营收，计算销售费用率
             if rev_col:
-                rev = annual[rev_col].apply(self._safe_float).values / 1e8
+                rev = self._safe_float_series(annual[rev_col]).values / 1e8
                 sale_rate = np.where(rev > 0, sale_exp / rev * 100, 0)
                 ax2 = ax1.twinx()
                 ax2.plot(years, sale_rate, color='purple', marker='o', linewidth=2, label='销售费用率')
@@ -4364,9 +4355,9 @@ class StockAnalyzer:
             plt.tight_layout()
             plt.savefig(f"{self.output_dir}/16_销售费用走势.png")
             plt.close()
-            print(f"  ✓ 生成图表: 16_销售费用走势.png")
+            self._echo(f"  ✓ 生成图表: 16_销售费用走势.png")
         except Exception as e:
-            print(f"  ⚠ 销售费用走势失败: {e}")
+            self._echo(f"  ⚠ 销售费用走势失败: {e}")
 
     def _plot_supplier_customer_concentration(self):
         """17_供应商客户集中度图"""
@@ -4383,7 +4374,7 @@ class StockAnalyzer:
             
             if (customer_df is None or len(customer_df) == 0) and (supplier_df is None or len(supplier_df) == 0):
                 # 如果获取不到，尝试从年报数据构造提示
-                print(f"  ⚠ 供应商客户集中度: 无法获取数据 (需年报披露)")
+                self._echo(f"  ⚠ 供应商客户集中度: 无法获取数据 (需年报披露)")
                 return
             
             fig, axes = plt.subplots(1, 2, figsize=(14, 6))
@@ -4403,7 +4394,7 @@ class StockAnalyzer:
                     if '报告期' in customer_df.columns:
                         customer_df['year'] = customer_df['报告期'].dt.year
                         yearly = customer_df.groupby('year')[ratio_col].apply(
-                            lambda x: x.apply(self._safe_float).head(5).sum()
+                            lambda x: self._safe_float_series(x).head(5).sum()
                         ).tail(5)
                         ax1.bar(yearly.index.astype(str), yearly.values, color='#3498db', alpha=0.7)
                         ax1.set_ylabel('前五大客户占比 (%)')
@@ -4412,7 +4403,7 @@ class StockAnalyzer:
                                         ha='center', fontsize=9)
                     else:
                         # 只取最新一批
-                        vals = customer_df[ratio_col].apply(self._safe_float).head(5)
+                        vals = self._safe_float_series(customer_df[ratio_col]).head(5)
                         ax1.bar(range(1, len(vals)+1), vals.values, color='#3498db', alpha=0.7)
                         ax1.set_xlabel('客户排名')
                         ax1.set_ylabel('占比 (%)')
@@ -4433,7 +4424,7 @@ class StockAnalyzer:
                     if '报告期' in supplier_df.columns:
                         supplier_df['year'] = supplier_df['报告期'].dt.year
                         yearly = supplier_df.groupby('year')[ratio_col].apply(
-                            lambda x: x.apply(self._safe_float).head(5).sum()
+                            lambda x: self._safe_float_series(x).head(5).sum()
                         ).tail(5)
                         ax2.bar(yearly.index.astype(str), yearly.values, color='#e67e22', alpha=0.7)
                         ax2.set_ylabel('前五大供应商占比 (%)')
@@ -4441,7 +4432,7 @@ class StockAnalyzer:
                             ax2.annotate(f'{y:.1f}%', xy=(x, y), xytext=(0, 3), textcoords='offset points',
                                         ha='center', fontsize=9)
                     else:
-                        vals = supplier_df[ratio_col].apply(self._safe_float).head(5)
+                        vals = self._safe_float_series(supplier_df[ratio_col]).head(5)
                         ax2.bar(range(1, len(vals)+1), vals.values, color='#e67e22', alpha=0.7)
                         ax2.set_xlabel('供应商排名')
                         ax2.set_ylabel('占比 (%)')
@@ -4454,9 +4445,9 @@ class StockAnalyzer:
             plt.tight_layout()
             plt.savefig(f"{self.output_dir}/17_供应商客户集中度.png")
             plt.close()
-            print(f"  ✓ 生成图表: 17_供应商客户集中度.png")
+            self._echo(f"  ✓ 生成图表: 17_供应商客户集中度.png")
         except Exception as e:
-            print(f"  ⚠ 供应商客户集中度失败: {e}")
+            self._echo(f"  ⚠ 供应商客户集中度失败: {e}")
 
     def _plot_financial_report(self, df):
         """生成财报解读相关图表"""
@@ -4604,8 +4595,8 @@ class StockAnalyzer:
         fig, ax1 = plt.subplots(figsize=(12, 6))
         
         years = annual_df['截止日期'].dt.year.astype(str)
-        revenues = annual_df[rev_col].apply(self._safe_float) / 1e8
-        profits = annual_df['净利润'].apply(self._safe_float) / 1e8
+        revenues = self._safe_float_series(annual_df[rev_col]) / 1e8
+        profits = self._safe_float_series(annual_df['净利润']) / 1e8
         
         # 营收柱状图
         bars = ax1.bar(years, revenues, color=COLORS['revenue'], alpha=0.8, label='营业收入')
@@ -4642,7 +4633,7 @@ class StockAnalyzer:
         plt.tight_layout()
         plt.savefig(f"{self.output_dir}/F1_营收利润趋势.png", dpi=300, bbox_inches='tight')
         plt.close()
-        print(f"  ✓ 生成图表: F1_营收利润趋势.png")
+        self._echo(f"  ✓ 生成图表: F1_营收利润趋势.png")
     
     def _plot_margin_trend(self, df):
         """毛利率净利率趋势图"""
@@ -4657,8 +4648,8 @@ class StockAnalyzer:
         fig, ax = plt.subplots(figsize=(12, 6))
         
         dates = recent['截止日期'].dt.strftime('%Y-%m')
-        gross_margins = recent[gross_col].apply(self._safe_float)
-        net_margins = recent[net_col].apply(self._safe_float)
+        gross_margins = self._safe_float_series(recent[gross_col])
+        net_margins = self._safe_float_series(recent[net_col])
         
         ax.plot(dates, gross_margins, marker='o', linewidth=2, markersize=6, 
                color=COLORS['primary'], label='毛利率')
@@ -4676,7 +4667,7 @@ class StockAnalyzer:
         plt.tight_layout()
         plt.savefig(f"{self.output_dir}/F2_利润率趋势.png", dpi=300, bbox_inches='tight')
         plt.close()
-        print(f"  ✓ 生成图表: F2_利润率趋势.png")
+        self._echo(f"  ✓ 生成图表: F2_利润率趋势.png")
     
     def _plot_score_radar(self):
         """综合评分雷达图"""
@@ -4715,7 +4706,7 @@ class StockAnalyzer:
         plt.tight_layout()
         plt.savefig(f"{self.output_dir}/F3_综合评分.png", dpi=300, bbox_inches='tight')
         plt.close()
-        print(f"  ✓ 生成图表: F3_综合评分.png")
+        self._echo(f"  ✓ 生成图表: F3_综合评分.png")
     
     def _plot_dupont_analysis(self, df):
         """ROE杜邦分析图"""
@@ -4774,7 +4765,7 @@ class StockAnalyzer:
                     plt.tight_layout()
                     plt.savefig(f"{self.output_dir}/F4_杜邦分析.png", dpi=300, bbox_inches='tight')
                     plt.close()
-                    print(f"  ✓ 生成图表: F4_杜邦分析.png")
+                    self._echo(f"  ✓ 生成图表: F4_杜邦分析.png")
     
     def _plot_cash_flow_structure(self):
         """现金流结构图"""
@@ -4793,9 +4784,9 @@ class StockAnalyzer:
         cfi_col = next((c for c in recent.columns if '投资' in c and '净额' in c), None)
         cff_col = next((c for c in recent.columns if '筹资' in c and '净额' in c), None)
         
-        cfo = recent[cfo_col].apply(self._safe_float) / 1e8 if cfo_col else pd.Series([0]*len(recent))
-        cfi = recent[cfi_col].apply(self._safe_float) / 1e8 if cfi_col else pd.Series([0]*len(recent))
-        cff = recent[cff_col].apply(self._safe_float) / 1e8 if cff_col else pd.Series([0]*len(recent))
+        cfo = self._safe_float_series(recent[cfo_col]) / 1e8 if cfo_col else pd.Series([0]*len(recent))
+        cfi = self._safe_float_series(recent[cfi_col]) / 1e8 if cfi_col else pd.Series([0]*len(recent))
+        cff = self._safe_float_series(recent[cff_col]) / 1e8 if cff_col else pd.Series([0]*len(recent))
         
         x = np.arange(len(dates))
         width = 0.25
@@ -4815,7 +4806,7 @@ class StockAnalyzer:
         plt.tight_layout()
         plt.savefig(f"{self.output_dir}/F5_现金流结构.png", dpi=300, bbox_inches='tight')
         plt.close()
-        print(f"  ✓ 生成图表: F5_现金流结构.png")
+        self._echo(f"  ✓ 生成图表: F5_现金流结构.png")
     
     def _plot_working_capital(self):
         """营运资本趋势图（应收+存货）"""
@@ -4827,8 +4818,8 @@ class StockAnalyzer:
         fig, ax = plt.subplots(figsize=(12, 6))
         
         dates = recent['报告日'].dt.strftime('%Y-%m')
-        receivables = recent['应收账款'].apply(self._safe_float) / 1e8
-        inventory = recent['存货'].apply(self._safe_float) / 1e8
+        receivables = self._safe_float_series(recent['应收账款']) / 1e8
+        inventory = self._safe_float_series(recent['存货']) / 1e8
         
         ax.bar(dates, receivables, label='应收账款', color=COLORS['warning'], alpha=0.8)
         ax.bar(dates, inventory, bottom=receivables, label='存货', color=COLORS['info'], alpha=0.8)
@@ -4843,7 +4834,7 @@ class StockAnalyzer:
         plt.tight_layout()
         plt.savefig(f"{self.output_dir}/F6_营运资本.png", dpi=300, bbox_inches='tight')
         plt.close()
-        print(f"  ✓ 生成图表: F6_营运资本.png")
+        self._echo(f"  ✓ 生成图表: F6_营运资本.png")
     
     # ==================== Dashboard合并图表 ====================
     def _generate_dashboard_charts(self):
@@ -4869,15 +4860,15 @@ class StockAnalyzer:
             
             # === 子图1: 营收与净利润趋势 ===
             ax1 = axes[0, 0]
-            annual_df = fin_df[fin_df['截止日期'].dt.month == 12].tail(6)
+            annual_df = self.annual_df.tail(6)
             if len(annual_df) >= 2:
                 rev_col = next((c for c in annual_df.columns if '营业总收入' in c), None)
                 profit_col = '净利润' if '净利润' in annual_df.columns else None
                 
                 if rev_col and profit_col:
                     years = annual_df['截止日期'].dt.year.astype(str)
-                    rev = annual_df[rev_col].apply(self._safe_float) / 1e8
-                    profit = annual_df[profit_col].apply(self._safe_float) / 1e8
+                    rev = self._safe_float_series(annual_df[rev_col]) / 1e8
+                    profit = self._safe_float_series(annual_df[profit_col]) / 1e8
                     
                     x = np.arange(len(years))
                     width = 0.35
@@ -4896,11 +4887,11 @@ class StockAnalyzer:
             net_col = next((c for c in fin_df.columns if '净利率' in c or '销售净利率' in c), None)
             
             if gross_col and net_col:
-                recent = fin_df[fin_df['截止日期'].dt.month == 12].tail(6)
+                recent = self.annual_df.tail(6)
                 if len(recent) >= 2:
                     years = recent['截止日期'].dt.year.astype(str)
-                    gross = recent[gross_col].apply(self._safe_float)
-                    net = recent[net_col].apply(self._safe_float)
+                    gross = self._safe_float_series(recent[gross_col])
+                    net = self._safe_float_series(recent[net_col])
                     
                     ax2.plot(years, gross, 'o-', color='brown', linewidth=2, markersize=6, label='毛利率')
                     ax2.plot(years, net, 's-', color='blue', linewidth=2, markersize=6, label='净利率')
@@ -4919,9 +4910,9 @@ class StockAnalyzer:
                 
                 if cfo_col:
                     dates = recent_cf['报告日'].dt.strftime('%Y-%m') if '报告日' in recent_cf.columns else recent_cf.index.astype(str)
-                    cfo = recent_cf[cfo_col].apply(self._safe_float) / 1e8 if cfo_col else [0]*len(recent_cf)
-                    cfi = recent_cf[cfi_col].apply(self._safe_float) / 1e8 if cfi_col else [0]*len(recent_cf)
-                    cff = recent_cf[cff_col].apply(self._safe_float) / 1e8 if cff_col else [0]*len(recent_cf)
+                    cfo = self._safe_float_series(recent_cf[cfo_col]) / 1e8 if cfo_col else [0]*len(recent_cf)
+                    cfi = self._safe_float_series(recent_cf[cfi_col]) / 1e8 if cfi_col else [0]*len(recent_cf)
+                    cff = self._safe_float_series(recent_cf[cff_col]) / 1e8 if cff_col else [0]*len(recent_cf)
                     
                     x = np.arange(len(dates))
                     width = 0.25
@@ -4940,10 +4931,10 @@ class StockAnalyzer:
             ax4 = axes[1, 1]
             roe_col = next((c for c in fin_df.columns if 'ROE' in c or '净资产收益率' in c), None)
             if roe_col:
-                annual = fin_df[fin_df['截止日期'].dt.month == 12].tail(6)
+                annual = self.annual_df.tail(6)
                 if len(annual) >= 2:
                     years = annual['截止日期'].dt.year.astype(str)
-                    roe = annual[roe_col].apply(self._safe_float)
+                    roe = self._safe_float_series(annual[roe_col])
                     
                     colors = ['green' if v >= 15 else 'orange' if v >= 10 else 'red' for v in roe]
                     ax4.bar(years, roe, color=colors, alpha=0.8)
@@ -4957,10 +4948,10 @@ class StockAnalyzer:
             plt.tight_layout(rect=[0, 0, 1, 0.96])
             plt.savefig(f"{self.output_dir}/D1_基本面Dashboard.png", dpi=200, bbox_inches='tight')
             plt.close()
-            print(f"  ✓ 生成合并图表: D1_基本面Dashboard.png")
+            self._echo(f"  ✓ 生成合并图表: D1_基本面Dashboard.png")
         except Exception as e:
             plt.close()
-            print(f"  ⚠ 基本面Dashboard生成失败: {e}")
+            self._echo(f"  ⚠ 基本面Dashboard生成失败: {e}")
     
     def _generate_valuation_dashboard(self):
         """估值分析Dashboard (2x2): PE/PB历史、DCF、DDM、股息率"""
@@ -5015,9 +5006,9 @@ class StockAnalyzer:
             if fin_df is not None:
                 profit_col = '净利润' if '净利润' in fin_df.columns else None
                 if profit_col:
-                    annual = fin_df[fin_df['截止日期'].dt.month == 12].tail(5)
+                    annual = self.annual_df.tail(5)
                     if len(annual) >= 1:
-                        profits = annual[profit_col].apply(self._safe_float) / 1e8
+                        profits = self._safe_float_series(annual[profit_col]) / 1e8
                         years = annual['截止日期'].dt.year.astype(str).tolist()
                         
                         # 添加当前市值作为对比
@@ -5053,7 +5044,7 @@ class StockAnalyzer:
                         div_df[date_col] = pd.to_datetime(div_df[date_col], errors='coerce')
                         div_df = div_df.dropna(subset=[date_col])
                         div_df['year'] = div_df[date_col].dt.year
-                        div_df['dps'] = div_df[per10_col].apply(self._safe_float) / 10
+                        div_df['dps'] = self._safe_float_series(div_df[per10_col]) / 10
                         
                         annual_dps = div_df.groupby('year')['dps'].sum().tail(6)
                         
@@ -5083,10 +5074,10 @@ class StockAnalyzer:
             plt.tight_layout(rect=[0, 0, 1, 0.96])
             plt.savefig(f"{self.output_dir}/D2_估值Dashboard.png", dpi=200, bbox_inches='tight')
             plt.close()
-            print(f"  ✓ 生成合并图表: D2_估值Dashboard.png")
+            self._echo(f"  ✓ 生成合并图表: D2_估值Dashboard.png")
         except Exception as e:
             plt.close()
-            print(f"  ⚠ 估值Dashboard生成失败: {e}")
+            self._echo(f"  ⚠ 估值Dashboard生成失败: {e}")
     
     def _generate_expense_dashboard(self):
         """费用结构Dashboard (2x2): 销售、管理、研发、财务费用"""
@@ -5109,13 +5100,13 @@ class StockAnalyzer:
             
             years = annual['报告日'].dt.year.astype(str)
             rev_col = next((c for c in annual.columns if '营业总收入' in c or '营业收入' in c), None)
-            rev = annual[rev_col].apply(self._safe_float) / 1e8 if rev_col else None
+            rev = self._safe_float_series(annual[rev_col]) / 1e8 if rev_col else None
             
             # 辅助绘图函数
             def plot_expense(ax, col_name, title, bar_color, line_color, line_style):
                 col = next((c for c in annual.columns if col_name in c), None)
                 if col:
-                    exp = annual[col].apply(self._safe_float) / 1e8
+                    exp = self._safe_float_series(annual[col]) / 1e8
                     
                     # 绘制柱状图
                     if col_name == '财务费用':
@@ -5162,10 +5153,10 @@ class StockAnalyzer:
             plt.subplots_adjust(top=0.92)
             plt.savefig(f"{self.output_dir}/D3_费用Dashboard.png", dpi=200, bbox_inches='tight')
             plt.close()
-            print(f"  ✓ 生成合并图表: D3_费用Dashboard.png")
+            self._echo(f"  ✓ 生成合并图表: D3_费用Dashboard.png")
         except Exception as e:
             plt.close()
-            print(f"  ⚠ 费用Dashboard生成失败: {e}")
+            self._echo(f"  ⚠ 费用Dashboard生成失败: {e}")
     
     def analyze_trade_signals(self):
         """分析交易信号 (汇总)"""
@@ -5199,6 +5190,8 @@ class StockAnalyzer:
         self._log("\n" + "="*70)
         self._log("  📋 投资分析总结报告")
         self._log("="*70)
+        # 子进程模式下 analysis_runner 据此推进进度，立即写出
+        self.flush_log()
         
         # ------------------ 第一部分：基本信息 ------------------
         self._log(f"\n{'─'*70}")
@@ -5257,13 +5250,14 @@ class StockAnalyzer:
         if self.financial_data is not None and len(self.financial_data) > 0:
             latest = self.financial_data.iloc[-1]
             
-            rev_col = next((c for c in self.financial_data.columns if '营业总收入' in c or '营业收入' in c), None)
-            profit_col = '净利润' if '净利润' in self.financial_data.columns else None
-            gross_col = next((c for c in self.financial_data.columns if '毛利率' in c), None)
-            net_margin_col = next((c for c in self.financial_data.columns if '净利率' in c), None)
-            roe_col = next((c for c in self.financial_data.columns if '净资产收益率' in c), None)
-            debt_col = next((c for c in self.financial_data.columns if '资产负债率' in c), None)
-            cfo_col = next((c for c in self.financial_data.columns if '经营' in c and '现金' in c), None)
+            fin_cols = self.fin_cols
+            rev_col = fin_cols['rev']
+            profit_col = fin_cols['profit']
+            gross_col = fin_cols['gross']
+            net_margin_col = fin_cols['net_margin']
+            roe_col = fin_cols['roe']
+            debt_col = fin_cols['debt']
+            cfo_col = fin_cols['cfo_loose']
             
             rev = self._safe_float(latest[rev_col]) / 1e8 if rev_col else 0
             profit = self._safe_float(latest[profit_col]) / 1e8 if profit_col else 0
@@ -5319,17 +5313,14 @@ class StockAnalyzer:
         
         # 从年报计算CAGR并展示
         if self.financial_data is not None and len(self.financial_data) >= 4:
-            annual_df = self.financial_data[self.financial_data['截止日期'].dt.month == 12]
+            annual_df = self.annual_df
             if len(annual_df) >= 4:
                 try:
-                    rev_col = next((c for c in self.financial_data.columns if '营业总收入' in c or '营业收入' in c), None)
-                    profit_col = '净利润' if '净利润' in self.financial_data.columns else None
+                    values = self.annual_values
                     
-                    if rev_col and profit_col:
-                        latest_rev = self._safe_float(annual_df.iloc[-1][rev_col])
-                        start_rev = self._safe_float(annual_df.iloc[-4][rev_col])
-                        latest_profit = self._safe_float(annual_df.iloc[-1][profit_col])
-                        start_profit = self._safe_float(annual_df.iloc[-4][profit_col])
+                    if values['rev'] is not None and values['profit'] is not None:
+                        latest_rev, start_rev = values['rev'][-1].item(), values['rev'][-4].item()
+                        latest_profit, start_profit = values['profit'][-1].item(), values['profit'][-4].item()
                         
                         if start_rev > 0 and latest_rev > 0:
                             rev_cagr = (latest_rev / start_rev) ** (1/3) - 1
@@ -5385,13 +5376,12 @@ class StockAnalyzer:
         
         # PEG分析
         if pe > 0 and self.financial_data is not None and len(self.financial_data) >= 4:
-            annual_df = self.financial_data[self.financial_data['截止日期'].dt.month == 12]
+            annual_df = self.annual_df
             if len(annual_df) >= 4:
                 try:
-                    profit_col = '净利润' if '净利润' in self.financial_data.columns else None
-                    if profit_col:
-                        latest_profit = self._safe_float(annual_df.iloc[-1][profit_col])
-                        start_profit = self._safe_float(annual_df.iloc[-4][profit_col])
+                    profits = self.annual_values['profit']
+                    if profits is not None:
+                        latest_profit, start_profit = profits[-1].item(), profits[-4].item()
                         if start_profit > 0 and latest_profit > 0:
                             profit_cagr = (latest_profit / start_profit) ** (1/3) - 1
                             if profit_cagr > 0:
@@ -5508,7 +5498,7 @@ class StockAnalyzer:
         report_path = f"{self.output_dir}/分析报告.txt"
         with open(report_path, 'w', encoding='utf-8') as f:
             f.write('\n'.join(self.report_lines))
-        print(f"  ✓ 文字报告已保存: {report_path}")
+        self._echo(f"  ✓ 文字报告已保存: {report_path}")
     
     def _save_structured_data(self, avg_score):
         """保存结构化数据（JSON格式）- 完整版"""
@@ -5574,17 +5564,26 @@ class StockAnalyzer:
             }
 
             # 年度趋势数据
-            annual_df = self.financial_data[self.financial_data['截止日期'].dt.month == 12].tail(6)
-            annual_trend = []
-            for _, row in annual_df.iterrows():
-                annual_trend.append({
-                    'year': int(row['截止日期'].year),
-                    'revenue_yi': round(self._safe_float(row[rev_col]) / 1e8, 2) if rev_col else None,
-                    'net_profit_yi': round(self._safe_float(row[profit_col]) / 1e8, 2) if profit_col else None,
-                    'gross_margin_pct': round(self._safe_float(row[gross_col]), 2) if gross_col else None,
-                    'roe_pct': round(self._safe_float(row[roe_col]), 2) if roe_col else None,
-                })
-            data['annual_trend'] = annual_trend
+            # 年度关键指标数组取最近 6 年，缺失的列整列为 None
+            values = self.annual_values
+            n = min(len(self.annual_df), 6)
+            years = self.annual_df['截止日期'].dt.year.tolist()[len(self.annual_df) - n:]
+
+            def tail_list(key, scale=1):
+                arr = values[key]
+                return (arr[len(arr) - n:] / scale).tolist() if arr is not None else [None] * n
+
+            data['annual_trend'] = [
+                {
+                    'year': int(year),
+                    'revenue_yi': round(rev, 2) if rev is not None else None,
+                    'net_profit_yi': round(profit, 2) if profit is not None else None,
+                    'gross_margin_pct': round(gross, 2) if gross is not None else None,
+                    'roe_pct': round(roe, 2) if roe is not None else None,
+                }
+                for year, rev, profit, gross, roe in zip(
+                    years, tail_list('rev', 1e8), tail_list('profit', 1e8), tail_list('gross'), tail_list('roe'))
+            ]
 
         # 兜底：使用财务指标接口/baostock
         if isinstance(getattr(self, 'financial_indicators', None), dict):
@@ -5678,47 +5677,51 @@ class StockAnalyzer:
         # 技术指标
         if self.stock_kline is not None and len(self.stock_kline) >= 120:
             closes = self.stock_kline['收盘']
-            ma5 = closes.rolling(5).mean().iloc[-1]
-            ma20 = closes.rolling(20).mean().iloc[-1]
-            ma60 = closes.rolling(60).mean().iloc[-1]
-            ma120 = closes.rolling(120).mean().iloc[-1]
+            # 只需最新值：均线直接取末尾窗口求均值，指标结果转为 ndarray 后按位置取
+            close_values = closes.to_numpy(dtype=np.float64)
+            ma5 = close_values[-5:].mean()
+            ma20 = close_values[-20:].mean()
+            ma60 = close_values[-60:].mean()
+            ma120 = close_values[-120:].mean()
             
-            rsi = self._calculate_rsi(closes, 14).iloc[-1]
-            dif, dea, macd = self._calculate_macd(closes, fast=10, slow=20, signal=8)
-            k, d, j = self._calculate_kdj(self.stock_kline['最高'], self.stock_kline['最低'], closes)
+            rsi = self._calculate_rsi(closes, 14).to_numpy()[-1]
+            dif, dea, macd = (s.to_numpy() for s in self._calculate_macd(closes, fast=10, slow=20, signal=8))
+            k, d, j = (s.to_numpy() for s in self._calculate_kdj(self.stock_kline['最高'], self.stock_kline['最低'], closes))
             
             data['technical'] = {
-                'latest_price': round(closes.iloc[-1], 2),
+                'latest_price': round(close_values[-1], 2),
                 'ma5': round(ma5, 2),
                 'ma20': round(ma20, 2),
                 'ma60': round(ma60, 2),
                 'ma120': round(ma120, 2),
                 'rsi14': round(rsi, 1),
                 'macd': {
-                    'dif': round(dif.iloc[-1], 3),
-                    'dea': round(dea.iloc[-1], 3),
-                    'histogram': round(macd.iloc[-1], 3),
+                    'dif': round(dif[-1], 3),
+                    'dea': round(dea[-1], 3),
+                    'histogram': round(macd[-1], 3),
                 },
                 'kdj': {
-                    'k': round(k.iloc[-1], 1),
-                    'd': round(d.iloc[-1], 1),
-                    'j': round(j.iloc[-1], 1),
+                    'k': round(k[-1], 1),
+                    'd': round(d[-1], 1),
+                    'j': round(j[-1], 1),
                 },
-                'trend': 'bullish' if closes.iloc[-1] > ma60 else 'bearish',
+                'trend': 'bullish' if close_values[-1] > ma60 else 'bearish',
             }
 
             # 添加K线历史数据 (OHLCV) - 用于前端交互式图表
             # 限制最近 500 个交易日
             kline_history = []
             recent_kline = self.stock_kline.tail(500)
-            for _, row in recent_kline.iterrows():
+            for date_val, open_, high, low, close, volume in zip(
+                    recent_kline['日期'], recent_kline['开盘'], recent_kline['最高'],
+                    recent_kline['最低'], recent_kline['收盘'], recent_kline['成交量']):
                 kline_history.append({
-                    'date': row['日期'].strftime('%Y-%m-%d') if hasattr(row['日期'], 'strftime') else str(row['日期']),
-                    'open': round(row['开盘'], 2),
-                    'high': round(row['最高'], 2),
-                    'low': round(row['最低'], 2),
-                    'close': round(row['收盘'], 2),
-                    'volume': int(row['成交量']),
+                    'date': date_val.strftime('%Y-%m-%d') if hasattr(date_val, 'strftime') else str(date_val),
+                    'open': round(open_, 2),
+                    'high': round(high, 2),
+                    'low': round(low, 2),
+                    'close': round(close, 2),
+                    'volume': int(volume),
                 })
             data['kline_history'] = kline_history
 
@@ -5786,7 +5789,7 @@ class StockAnalyzer:
                 div_df[date_col] = pd.to_datetime(div_df[date_col], errors='coerce')
                 div_df = div_df.dropna(subset=[date_col])
                 div_df['year'] = div_df[date_col].dt.year
-                div_df['dps'] = div_df[per10_col].apply(self._safe_float) / 10
+                div_df['dps'] = self._safe_float_series(div_df[per10_col]) / 10
                 
                 annual_dps = div_df.groupby('year')['dps'].sum().tail(5)
                 
@@ -5834,7 +5837,7 @@ class StockAnalyzer:
         json_path = f"{self.output_dir}/analysis_data.json"
         with open(json_path, 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=2, default=str)
-        print(f"  ✓ 结构化数据已保存: {json_path}")
+        self._echo(f"  ✓ 结构化数据已保存: {json_path}")
 
 
 class FuturesAnalyzer:
@@ -6029,8 +6032,7 @@ class FuturesAnalyzer:
     def _resolve_name(self, query):
         """解析输入名称到标准中文名"""
         if query in FUTURES_MAPPING: return query
-        for k, v in FUTURES_MAPPING.items():
-            if v['symbol'] == query.upper(): return k
+        if query.upper() in FUTURES_BY_SYMBOL: return FUTURES_BY_SYMBOL[query.upper()]
         for k in FUTURES_MAPPING.keys():
             if query in k: return k
         return query
@@ -6251,54 +6253,82 @@ def main():
         code = sys.argv[1]
     
     start_time = time.time()
-    
+    run_analysis(code)
+    total_time = time.time() - start_time
+    print(f"\\n⏱️ 总耗时: {total_time:.1f}s")
+
+
+def run_analysis(code, progress_cb=None):
+    """运行完整分析（供命令行与 server.py 进程内调用）
+
+    progress_cb(progress, message) 在每个阶段开始时回调；
+    A股模式返回报告文件夹路径，期货模式返回 None
+    """
+    def report(progress, message):
+        if progress_cb is not None:
+            progress_cb(progress, message)
+
     # 1. 判断是否为期货 (检查是否在映射表中 或 包含字母)
     is_futures = False
     
     # 检查中文名
     if code in FUTURES_MAPPING: is_futures = True
     # 检查代码 (字母开头通常是期货，如 RB, AU; 数字开头是股票)
-    elif code[0].isalpha() or code.upper() in [v['symbol'] for v in FUTURES_MAPPING.values()]: is_futures = True
+    elif code[0].isalpha() or code.upper() in FUTURES_BY_SYMBOL: is_futures = True
     
     if is_futures:
         # ----- 期货模式 -----
         print(f"\\n🚀 启动期货分析模式: {code}")
+        report(20, '正在获取期货数据...')
         try:
             analyzer = FuturesAnalyzer(code)
             analyzer.fetch_all_data()
+            report(50, '正在进行期货分析...')
             analyzer.analyze()
+            report(80, '正在生成期货报告...')
             analyzer.plot_analysis()
         except Exception as e:
             print(f"\\n❌ 期货分析出错: {e}")
             import traceback; traceback.print_exc()
+        return None
             
-    else:
-        # ----- A股模式 -----
-        print(f"\\n🚀 启动A股分析模式: {code}")
-        try:
-            analyzer = StockAnalyzer(code)
-            analyzer.fetch_data()
-            
-            def safe_step(label, func):
+    # ----- A股模式 -----
+    print(f"\\n🚀 启动A股分析模式: {code}")
+    report(20, '正在获取数据...')
+    analyzer = None
+    try:
+        analyzer = StockAnalyzer(code)
+        analyzer.fetch_data()
+        
+        def safe_step(label, func):
+            try:
                 try:
                     func()
-                except Exception as e:
-                    print(f"\n⚠️ {label} 阶段失败: {e}")
-                    import traceback
-                    traceback.print_exc()
-            
-            # 分析阶段
-            safe_step("增量分析", analyzer.analyze_growth_momentum)
-            safe_step("公司深度分析", analyzer.analyze_company)
-            safe_step("财报解读", analyzer.analyze_financial_report)
-            safe_step("回测", analyzer.run_backtest)
-            safe_step("汇总输出", analyzer.generate_summary)
-        except Exception as e:
-            print(f"\\n❌ A股分析出错: {e}")
-            import traceback; traceback.print_exc()
-    
-    total_time = time.time() - start_time
-    print(f"\\n⏱️ 总耗时: {total_time:.1f}s")
+                finally:
+                    # 本阶段缓冲的报告文本一次写出
+                    analyzer.flush_log()
+            except Exception as e:
+                print(f"\n⚠️ {label} 阶段失败: {e}")
+                import traceback
+                traceback.print_exc()
+        
+        # 分析阶段
+        steps = (
+            ("增量分析", analyzer.analyze_growth_momentum, 35, '正在进行增量分析...'),
+            ("公司深度分析", analyzer.analyze_company, 50, '正在进行公司分析...'),
+            ("财报解读", analyzer.analyze_financial_report, 65, '正在解读财报...'),
+            ("回测", analyzer.run_backtest, 75, '正在运行量化回测...'),
+            ("汇总输出", analyzer.generate_summary, 90, '正在生成总结报告...'),
+        )
+        for label, func, progress, message in steps:
+            report(progress, message)
+            safe_step(label, func)
+    except Exception as e:
+        if analyzer is not None:
+            analyzer.flush_log()
+        print(f"\\n❌ A股分析出错: {e}")
+        import traceback; traceback.print_exc()
+    return analyzer.output_dir if analyzer is not None else None
 
 
 if __name__ == "__main__":
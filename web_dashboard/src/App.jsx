@@ -7,7 +7,7 @@ import AnalysisRadar from './components/AnalysisRadar'
 import IndustryPeersTable from './components/IndustryPeersTable'
 import IndustryComparison from './components/IndustryComparison'
 import AIReport from './components/AIReport'
-import { fetchReports as apiFetchReports, fetchReportDetails as apiFetchReportDetails, fetchReportSummary as apiFetchReportSummary, startAnalysis as apiStartAnalysis, getAnalysisStatus as apiGetAnalysisStatus, deleteReport as apiDeleteReport } from './api'
+import { fetchReports as apiFetchReports, fetchReportDetails as apiFetchReportDetails, fetchReportSummary as apiFetchReportSummary, fetchReportData as apiFetchReportData, startAnalysis as apiStartAnalysis, getAnalysisStatus as apiGetAnalysisStatus, deleteReport as apiDeleteReport } from './api'
 
 // ==================== 性能优化工具 ====================
 // 配置 axios 默认超时和重试
@@ -225,8 +225,20 @@ function App() {
       })
       
       setSelectedReport(fullReport)
-      setCache(cacheKey, fullReport)
       setShowAnalyzer(false)
+      
+      // 摘要接口不含完整数据（K线、评分等，体积大），先渲染摘要，再后台加载并合并
+      if (summaryData && summaryData.full_data === null) {
+        apiFetchReportData(report.id)
+          .then((dataRes) => {
+            const withFullData = { ...fullReport, summaryData: { ...summaryData, full_data: dataRes.data } }
+            setCache(cacheKey, withFullData)
+            setSelectedReport(prev => (prev?.id === report.id ? withFullData : prev))
+          })
+          .catch((err) => console.error('loadReportDetails full data error:', err))
+      } else {
+        setCache(cacheKey, fullReport)
+      }
     } catch (err) {
       console.error('loadReportDetails error:', err)
       setError(`加载报告失败: ${err.response?.data?.error || err.message}`)
@@ -26,6 +26,7 @@ export const api = axios.create({
 export const fetchReports = (config = {}) => api.get('/reports', config)
 export const fetchReportDetails = (reportId, config = {}) => api.get(`/reports/${reportId}`, config)
 export const fetchReportSummary = (reportId, config = {}) => api.get(`/reports/${reportId}/summary`, config)
+export const fetchReportData = (reportId, config = {}) => api.get(`/reports/${reportId}/data`, config)
 export const startAnalysis = (code, config = {}) => api.post('/analyze', { code }, config)
 export const getAnalysisStatus = (taskId, config = {}) => api.get(`/analyze/${taskId}`, config)
 export const deleteReport = (reportId, config = {}) => api.delete(`/reports/${reportId}`, config)